@@ -0,0 +1,145 @@
+import asyncio
+from typing import (
+    Any,
+    Callable,
+    Generic,
+    Sequence,
+    TypeVar,
+)
+
+from starlette.requests import Request
+
+from .executor import (
+    ClientDisconnectedError,
+    ExecutorBusyError,
+    InferenceExecutor,
+    wait_for_disconnect,
+)
+
+I = TypeVar("I")  # noqa: E741
+R = TypeVar("R")
+
+
+class MicroBatcher(Generic[I, R]):
+    """Coalesces items submitted by concurrent requests into batched calls.
+
+    Items are collected for up to `max_wait` seconds (counted from the first item)
+    or until `max_batch` items are collected, then batch function is called once in
+    inference executor and results are returned to the waiting requests.
+
+    Batch function gets list of items and must return sequence of results of the
+    same length. Result may be an exception instance, then it is raised (or returned
+    by `submit_many`) only for its item.
+    """
+
+    def __init__(
+        self,
+        batch_func: Callable[[list[I]], Any],
+        executor: InferenceExecutor,
+        max_batch: int = 16,
+        max_wait: float = 0.005,
+    ) -> None:
+        """Initialize class instance."""
+        self.batch_func = batch_func
+        self.executor = executor
+        self.max_batch = max(1, max_batch)
+        self.max_wait = max(0.0, max_wait)
+
+        self._queue: list[tuple[I, asyncio.Future]] = []
+        self._timer: asyncio.TimerHandle | None = None
+        self._tasks: set[asyncio.Task] = set()
+
+    def __repr__(self) -> str:
+        return (
+            f"<{self.__class__.__name__} max_batch={self.max_batch} "
+            f"max_wait={self.max_wait * 1000:.1f}ms queued={len(self._queue)}>"
+        )
+
+    async def submit(self, item: I, request: Request | None = None) -> R:
+        """Submit single item and wait for its result."""
+        [result] = await self.submit_many([item], request=request)
+        if isinstance(result, BaseException):
+            raise result
+        return result
+
+    async def submit_many(
+        self,
+        items: Sequence[I],
+        request: Request | None = None,
+    ) -> list[R | BaseException]:
+        """Submit several items and wait for all results (errors are returned per item).
+
+        Args:
+            items (Sequence[I]): Items to process.
+            request (Request | None): Request to watch for client disconnect. Items of
+                disconnected client are dropped from queue if batch is not started yet.
+
+        Raises:
+            ExecutorBusyError: Inference executor is busy.
+            ClientDisconnectedError: Client disconnected before results are ready.
+        """
+        if not items:
+            return []
+
+        if self.executor.is_busy:
+            # Fail fast instead of waiting for batch that will be rejected
+            raise ExecutorBusyError(f"Executor is busy ({self.executor.pending} calls pending)")
+
+        loop = asyncio.get_running_loop()
+        futures = [loop.create_future() for _ in items]
+        for item, future in zip(items, futures):
+            self._queue.append((item, future))
+
+        if len(self._queue) >= self.max_batch:
+            self._flush()
+        elif self._timer is None:
+            self._timer = loop.call_later(self.max_wait, self._flush)
+
+        results = asyncio.gather(*futures, return_exceptions=True)
+        if request is None:
+            return await results
+
+        watcher = asyncio.ensure_future(wait_for_disconnect(request))
+        try:
+            await asyncio.wait((results, watcher), return_when=asyncio.FIRST_COMPLETED)
+        finally:
+            watcher.cancel()
+
+        if not results.done():
+            # Cancelled items are skipped if their batch is not started yet
+            for future in futures:
+                future.cancel()
+            raise ClientDisconnectedError("Client disconnected")
+
+        return results.result()
+
+    def _flush(self) -> None:
+        """Start batches of all queued items."""
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+
+        queue = [(item, future) for item, future in self._queue if not future.done()]
+        self._queue = []
+        for start in range(0, len(queue), self.max_batch):
+            task = asyncio.ensure_future(self._run_batch(queue[start : start + self.max_batch]))
+            # Reference is kept until task is done, otherwise it may be garbage collected
+            self._tasks.add(task)
+            task.add_done_callback(self._tasks.discard)
+
+    async def _run_batch(self, batch: list[tuple[I, asyncio.Future]]) -> None:
+        items = [item for item, _ in batch]
+        try:
+            results: Any = await self.executor.run(self.batch_func, items)
+            if len(results) != len(items):
+                raise RuntimeError(f"Batch function returned {len(results)} != {len(items)}")
+        except Exception as e:
+            results = [e] * len(items)
+
+        for (_, future), result in zip(batch, results):
+            if future.done():
+                continue  # cancelled by disconnected client
+            if isinstance(result, BaseException):
+                future.set_exception(result)
+            else:
+                future.set_result(result)
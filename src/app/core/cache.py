@@ -0,0 +1,120 @@
+import threading
+import time
+from collections import OrderedDict
+from typing import (
+    Any,
+    Callable,
+    Generic,
+    Hashable,
+    TypeVar,
+)
+
+V = TypeVar("V")
+
+
+class LRUCache(Generic[V]):
+    """Thread-safe in-memory LRU cache with optional time-to-live of entries.
+
+    Cache holds at most `max_entries` values and, when `sizeof` function is passed,
+    at most `max_bytes` of them. Least recently used values are evicted first.
+    Values older than `ttl` seconds are treated as missing. Hits, misses and
+    evictions are counted for monitoring.
+    """
+
+    def __init__(
+        self,
+        max_entries: int = 256,
+        max_bytes: int | None = None,
+        ttl: float | None = None,
+        sizeof: Callable[[V], int] | None = None,
+    ) -> None:
+        """Initialize class instance."""
+        self.max_entries = max(0, max_entries)
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self.sizeof = sizeof
+
+        self._data: OrderedDict[Hashable, tuple[float, int, V]] = OrderedDict()
+        self._lock = threading.Lock()
+        self._nbytes = 0
+
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+    @property
+    def nbytes(self) -> int:
+        """Total size of cached values in bytes (0 if `sizeof` is not set)."""
+        return self._nbytes
+
+    def __repr__(self) -> str:
+        return f"<{self.__class__.__name__} {self.stats()}>"
+
+    def get(self, key: Hashable) -> V | None:
+        """Get value by key (None if missing or expired)."""
+        with self._lock:
+            entry = self._data.get(key)
+            now = time.monotonic()
+            if entry is not None and self.ttl is not None and now - entry[0] > self.ttl:
+                self._pop(key)
+                self.evictions += 1
+                entry = None
+
+            if entry is None:
+                self.misses += 1
+                return None
+
+            self._data.move_to_end(key)
+            self.hits += 1
+            return entry[2]
+
+    def set(self, key: Hashable, value: V) -> None:
+        """Save value by key, evicting least recently used values above size limits."""
+        size = self.sizeof(value) if self.sizeof is not None else 0
+        if not self.max_entries or (self.max_bytes is not None and size > self.max_bytes):
+            return
+
+        with self._lock:
+            self._pop(key)
+            self._data[key] = (time.monotonic(), size, value)
+            self._nbytes += size
+            while len(self._data) > self.max_entries or (
+                self.max_bytes is not None and self._nbytes > self.max_bytes
+            ):
+                self._pop(next(iter(self._data)))
+                self.evictions += 1
+
+    def remove_if(self, predicate: Callable[[Hashable], bool]) -> int:
+        """Remove values which keys match predicate, return number of removed values."""
+        with self._lock:
+            keys = [key for key in self._data if predicate(key)]
+            for key in keys:
+                self._pop(key)
+            return len(keys)
+
+    def clear(self) -> None:
+        """Remove all values (counters are kept)."""
+        with self._lock:
+            self._data.clear()
+            self._nbytes = 0
+
+    def stats(self) -> dict[str, Any]:
+        """Get cache size and hit/miss counters."""
+        requests = self.hits + self.misses
+        return {
+            "entries": len(self._data),
+            "max_entries": self.max_entries,
+            "mb": round(self._nbytes / 2**20, 2),
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "hit_ratio": round(self.hits / requests, 4) if requests else 0.0,
+        }
+
+    def _pop(self, key: Hashable) -> None:
+        entry = self._data.pop(key, None)
+        if entry is not None:
+            self._nbytes -= entry[1]
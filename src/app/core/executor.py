@@ -0,0 +1,170 @@
+import asyncio
+import threading
+from concurrent.futures import (
+    Future,
+    ThreadPoolExecutor,
+)
+from functools import partial
+from typing import (
+    Any,
+    Callable,
+    Sequence,
+    TypeVar,
+)
+
+from starlette.requests import Request
+
+T = TypeVar("T")
+
+# How often request is checked for client disconnect while waiting for result, seconds
+DISCONNECT_POLL_INTERVAL = 0.1
+
+
+class ExecutorBusyError(RuntimeError):
+    """Raised when executor queue is full."""
+
+
+class ClientDisconnectedError(RuntimeError):
+    """Raised when client disconnected before result is ready."""
+
+
+class InferenceExecutor:
+    """Bounded thread pool running blocking ML inference off the event loop.
+
+    At most `workers` calls run at once and others wait for a free worker. New calls
+    are rejected immediately with `ExecutorBusyError` when `workers + max_queue` calls
+    are already pending, so clients get a fast response instead of waiting behind
+    a long queue.
+    """
+
+    def __init__(self, workers: int = 1, max_queue: int = 8) -> None:
+        """Initialize class instance."""
+        self.workers = max(1, workers)
+        self.max_queue = max(0, max_queue)
+        self.pool = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="inference")
+
+        self._lock = threading.Lock()
+        self._pending = 0
+
+    def __repr__(self) -> str:
+        return (
+            f"<{self.__class__.__name__} workers={self.workers} "
+            f"max_queue={self.max_queue} pending={self._pending}>"
+        )
+
+    @property
+    def pending(self) -> int:
+        """Number of running and queued calls."""
+        return self._pending
+
+    @property
+    def is_busy(self) -> bool:
+        """Check if new call would be rejected."""
+        return self._pending >= self.workers + self.max_queue
+
+    async def run(
+        self,
+        func: Callable[..., T],
+        *args: Any,
+        request: Request | None = None,
+        **kwargs: Any,
+    ) -> T:
+        """Run blocking function in executor and wait for its result.
+
+        Args:
+            func (Callable): Blocking function.
+            *args (Any): Positional arguments of function.
+            request (Request | None): Request to watch for client disconnect. Queued call
+                is cancelled when client disconnects (running call can't be interrupted,
+                but its result is dropped).
+            **kwargs (Any): Keyword arguments of function.
+
+        Raises:
+            ExecutorBusyError: Queue is full.
+            ClientDisconnectedError: Client disconnected before result is ready.
+        """
+        [result] = await self._run_all([partial(func, *args, **kwargs)], request)
+        if isinstance(result, BaseException):
+            raise result
+        return result
+
+    async def map(
+        self,
+        func: Callable[..., T],
+        items: Sequence[Any],
+        request: Request | None = None,
+        **kwargs: Any,
+    ) -> list[T | BaseException]:
+        """Run blocking function for every item concurrently and wait for all results.
+
+        All calls are admitted together (if executor is not busy), so a request is
+        either processed completely or rejected. Error of a single call is returned
+        in place of its result and does not affect other calls.
+
+        Args:
+            func (Callable): Blocking function, item is passed as first argument.
+            items (Sequence[Any]): Items to process.
+            request (Request | None): Request to watch for client disconnect.
+            **kwargs (Any): Keyword arguments of function.
+
+        Raises:
+            ExecutorBusyError: Queue is full.
+            ClientDisconnectedError: Client disconnected before results are ready.
+        """
+        return await self._run_all([partial(func, item, **kwargs) for item in items], request)
+
+    def shutdown(self) -> None:
+        self.pool.shutdown(wait=False, cancel_futures=True)
+
+    async def _run_all(
+        self,
+        calls: list[Callable[[], T]],
+        request: Request | None,
+    ) -> list[T | BaseException]:
+        with self._lock:
+            if self.is_busy:
+                raise ExecutorBusyError(f"Executor is busy ({self._pending} calls pending)")
+            self._pending += len(calls)
+
+        futures: list[Future] = []
+        try:
+            for call in calls:
+                futures.append(self.pool.submit(call))
+                futures[-1].add_done_callback(self._release)
+        except BaseException:
+            for future in futures:
+                future.cancel()
+            for _ in range(len(calls) - len(futures)):
+                self._release()
+            raise
+
+        results = asyncio.gather(
+            *(asyncio.wrap_future(future) for future in futures),
+            return_exceptions=True,
+        )
+        if request is None:
+            return await results
+
+        watcher = asyncio.ensure_future(wait_for_disconnect(request))
+        try:
+            await asyncio.wait((results, watcher), return_when=asyncio.FIRST_COMPLETED)
+        finally:
+            watcher.cancel()
+
+        if not results.done():
+            # Queued calls are cancelled, running ones finish and their results are dropped
+            for future in futures:
+                future.cancel()
+            raise ClientDisconnectedError("Client disconnected")
+
+        return results.result()
+
+    def _release(self, future: Future | None = None) -> None:
+        with self._lock:
+            self._pending -= 1
+
+
+async def wait_for_disconnect(request: Request) -> None:
+    """Wait until client of request disconnects."""
+    while not await request.is_disconnected():
+        await asyncio.sleep(DISCONNECT_POLL_INTERVAL)
@@ -57,14 +57,16 @@ def init_fastapi_app(with_routes: bool = True) -> FastAPI:
 def register_routes(app: FastAPI) -> None:
     """Attach application routers to the provided FastAPI app.
 
-    Currently registers the index router; extend this as new routers are added.
+    Registers index, admin and health routers; extend this as new routers are added.
 
     Args:
         app: The FastAPI application to modify.
     """
+    from app.views.admin import router as admin_router
+    from app.views.health import router as health_router
     from app.views.index import router as index_router
 
-    for router in (index_router,):
+    for router in (index_router, admin_router, health_router):
         app.include_router(router)
 
 
@@ -0,0 +1,494 @@
+import threading
+import time
+from pathlib import Path
+from typing import (
+    Any,
+    Callable,
+    Iterable,
+)
+
+import pandas as pd
+
+from app.image_processing.face_embeddings import read_embeddings_files
+from app.image_processing.gallery import (
+    FaceGallery,
+    create_gallery_store,
+    get_gallery_filename,
+    read_gallery_store,
+)
+from app.image_processing.images_manifest import ImagesManifest
+from app.image_processing.resources import (
+    DEFAULT_EMBEDDING_EXT,
+    IMAGES_MANIFEST_FILENAME,
+    DeepfaceSettings,
+    EventSettings,
+)
+from app.image_processing.sharding import (
+    ShardedGallery,
+    ShardPool,
+)
+from app.storages import (
+    S3Client,
+    S3DirSync,
+    S3Object,
+)
+
+from .logging import Logger
+from .utils import get_memory_usage
+
+SearchGallery = FaceGallery | ShardedGallery
+
+
+class EventGallery:
+    """Gallery of a single event built from its embeddings prefix in S3.
+
+    Embeddings prefix is synced with local directory incrementally (only new and
+    changed files are downloaded). Prebuilt gallery file (see
+    scripts/prepare_embeddings.py) is used when it exists in embeddings prefix,
+    otherwise separate embedding files are used: changes of them are applied to
+    current gallery without loading all files again.
+
+    Gallery is loaded on first use (or at startup if preloaded) and may be unloaded
+    after `idle_ttl` seconds without searches or to fit memory budget. Synced files
+    are kept on disk, so gallery loaded again within `listing_ttl` seconds after last
+    sync is built from local files without S3 requests.
+
+    Images manifest (see scripts/upload_to_s3.py) is synced together with gallery,
+    found faces which images are not in manifest are skipped. All faces are returned
+    if there is no manifest in embeddings prefix.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        event: EventSettings,
+        bucket_name: str,
+        deepface: DeepfaceSettings,
+        s3_client: S3Client,
+        logger: Logger,
+        local_dir: str | Path,
+        shard_pool: ShardPool | None = None,
+        on_update: Callable[[str], Any] | None = None,
+        listing_ttl: float = 0,
+    ) -> None:
+        """Initialize class instance."""
+        self.name = name
+        self.event = event
+        self.deepface = deepface
+        self.logger = logger
+        self.local_dir = Path(local_dir)
+        self.shard_pool = shard_pool
+        self.on_update = on_update
+        self.listing_ttl = listing_ttl
+
+        self.sync = S3DirSync(
+            s3_client=s3_client,
+            bucket_name=bucket_name,
+            s3_prefix=event.embeddings,
+            local_dir=self.local_dir,
+        )
+        # Manifest is synced to its own directory, so syncs don't remove files of each other
+        self.images_sync = S3DirSync(
+            s3_client=s3_client,
+            bucket_name=bucket_name,
+            s3_prefix=event.embeddings,
+            local_dir=self.local_dir / "images",
+        )
+        self.gallery: SearchGallery | None = None
+        self.images: ImagesManifest | None = None
+        self.last_used = 0.0
+
+        # Objects of embeddings prefix listed by last sync and when they were listed
+        self._listing: tuple[float, list[S3Object]] | None = None
+
+        # Image filenames of faces read from every embedding file (by its relative path),
+        # so faces of changed and deleted files are removed from gallery on update
+        self._file_images: dict[str, frozenset[str]] = {}
+
+        # Only one gallery of event is built at a time (first use, syncs and reloads)
+        self._lock = threading.Lock()
+
+    def __repr__(self) -> str:
+        return f"<{self.__class__.__name__} {self.name} {self.gallery!r}>"
+
+    @property
+    def is_loaded(self) -> bool:
+        return self.gallery is not None
+
+    @property
+    def nbytes(self) -> int:
+        """Size of loaded gallery in bytes (0 if not loaded)."""
+        gallery = self.gallery
+        return gallery.nbytes if gallery is not None else 0
+
+    def has_images(self, filename: str) -> bool:
+        """Check if original and resized images of found face are uploaded."""
+        images = self.images
+        return images is None or filename in images
+
+    def get(self) -> SearchGallery:
+        """Get gallery for search, loading it on first use."""
+        self.last_used = time.monotonic()
+        gallery = self.gallery
+        if gallery is None:
+            self.load(only_missing=True)
+            gallery = self.gallery
+
+        if gallery is None:
+            raise RuntimeError(f"Gallery '{self.name}' is not loaded")
+
+        return gallery
+
+    def load(self, full: bool = False, only_missing: bool = False) -> bool:
+        """Load or update gallery.
+
+        New gallery is built aside and then swapped in with a single assignment, so
+        requests in progress keep searching in the gallery they started with.
+
+        Args:
+            full (bool): Build new gallery from all files instead of updating current one.
+            only_missing (bool): Do nothing if gallery is already loaded (e.g. by
+                concurrent request).
+
+        Returns:
+            bool: True if gallery was replaced.
+        """
+        with self._lock:
+            previous = self.gallery
+            if only_missing and previous is not None:
+                return False
+
+            started = time.perf_counter()
+            memory_before = get_memory_usage()
+
+            current = previous.gallery if isinstance(previous, ShardedGallery) else previous
+            # Unloaded gallery is loaded again from local files if they are synced recently,
+            # while reload of loaded gallery always checks S3 for changes
+            built = self._build(None if full else current, reuse_listing=previous is None)
+            if built is None:
+                self.logger.info("Embeddings gallery is up to date", gallery=self.name)
+                return False
+
+            gallery = built if self.shard_pool is None else ShardedGallery(built, self.shard_pool)
+            self.gallery = gallery
+            if previous is None:
+                self.last_used = time.monotonic()  # idle time is counted from loading
+
+            if self.on_update is not None:
+                self.on_update(self.name)
+
+            self.logger.info(
+                f"Loaded embeddings gallery: {gallery!r}",
+                gallery=self.name,
+                elapsed=round(time.perf_counter() - started, 3),
+                faces=len(gallery),
+                previous_faces=len(previous) if previous is not None else None,
+                gallery_mb=round(gallery.nbytes / 2**20, 1),
+                memory_before_mb=round(memory_before / 2**20, 1),
+                memory_after_mb=round(get_memory_usage() / 2**20, 1),
+            )
+            return True
+
+    def unload(self) -> bool:
+        """Drop loaded gallery (memory is freed when searches in progress finish).
+
+        Synced files are kept in local directory, so next load downloads only changes.
+        """
+        with self._lock:
+            if self.gallery is None:
+                return False
+
+            nbytes = self.gallery.nbytes
+            self.gallery = None
+            self.images = None
+
+        if self.on_update is not None:
+            self.on_update(self.name)
+
+        self.logger.info(
+            "Unloaded embeddings gallery",
+            gallery=self.name,
+            gallery_mb=round(nbytes / 2**20, 1),
+        )
+        return True
+
+    def is_idle(self, now: float | None = None) -> bool:
+        """Check if loaded gallery was not used for `idle_ttl` seconds."""
+        if self.gallery is None or not self.event.idle_ttl:
+            return False
+
+        now = time.monotonic() if now is None else now
+        return now - self.last_used > self.event.idle_ttl
+
+    def stats(self) -> dict[str, Any]:
+        """Get gallery size and usage."""
+        gallery = self.gallery
+        return {
+            "loaded": gallery is not None,
+            "faces": len(gallery) if gallery is not None else None,
+            "mb": round(self.nbytes / 2**20, 1),
+            "idle": round(time.monotonic() - self.last_used, 1) if self.last_used else None,
+        }
+
+    def _build(
+        self,
+        current: FaceGallery | None,
+        reuse_listing: bool = False,
+    ) -> FaceGallery | None:
+        """Build new gallery from synced embeddings (None if current gallery is up to date)."""
+        self.local_dir.mkdir(parents=True, exist_ok=True)
+
+        objects = self._list_objects(reuse_listing)
+        self._sync_images_manifest(objects)
+
+        gallery_filename = get_gallery_filename(
+            model_name=self.deepface.model_name,
+            detector_backend=self.deepface.detector_backend,
+        )
+        gallery_objects = [obj for obj in objects if Path(obj.key).name == gallery_filename]
+        if gallery_objects:
+            return self._sync_gallery_file(gallery_objects, current)
+
+        self.logger.warning(
+            "Prebuilt gallery not found, loading separate embedding files",
+            gallery=self.name,
+        )
+        return self._sync_embedding_files(
+            [obj for obj in objects if obj.key.endswith(DEFAULT_EMBEDDING_EXT)],
+            current,
+        )
+
+    def _list_objects(self, reuse_listing: bool) -> list[S3Object]:
+        """List embeddings prefix (or reuse listing of recent sync)."""
+        now = time.monotonic()
+        if reuse_listing and self._listing is not None:
+            listed_at, objects = self._listing
+            if now - listed_at < self.listing_ttl:
+                self.logger.info("Loading gallery from local files", gallery=self.name)
+                return objects
+
+        try:
+            objects = self.sync.list_objects()
+        except Exception as e:
+            raise RuntimeError(f"Failed to list embeddings files: {e}")
+
+        self._listing = (now, objects)
+        return objects
+
+    def _sync_images_manifest(self, objects: list[S3Object]) -> None:
+        """Download images manifest if changed and load it (previous one is kept on errors)."""
+        objects = [obj for obj in objects if Path(obj.key).name == IMAGES_MANIFEST_FILENAME]
+        try:
+            result = self.images_sync.sync(objects)
+            if result.stats.failed:
+                raise RuntimeError(f"Failed to download images manifest: {result.stats.errors}")
+
+            if not objects:
+                self.images = None
+            elif self.images is None or result.has_changes:
+                self.images = ImagesManifest.read(self.images_sync.get_local_path(objects[0].key))
+                self.logger.info(f"Loaded images manifest: {self.images!r}", gallery=self.name)
+        except Exception as e:
+            self.logger.exception("Failed to sync images manifest", e, gallery=self.name)
+
+    def _sync_gallery_file(
+        self,
+        objects: list[S3Object],
+        current: FaceGallery | None,
+    ) -> FaceGallery | None:
+        """Download prebuilt gallery file if changed and open it as memory-mapped store.
+
+        Returns None if current gallery is already loaded from the same file.
+        """
+        result = self.sync.sync(objects)
+        if result.stats.failed:
+            raise RuntimeError(f"Failed to download gallery file: {result.stats.errors}")
+
+        if current is not None and current.metadata is not None and not result.has_changes:
+            return None
+
+        local_path = self.sync.get_local_path(objects[0].key)
+        self.logger.info(f"Downloaded gallery: {local_path}", gallery=self.name)
+
+        store_dir = create_gallery_store(local_path, self.local_dir)
+        self.logger.info(f"Opening gallery store: {store_dir}", gallery=self.name)
+
+        return read_gallery_store(
+            store_dir,
+            model_name=self.deepface.model_name,
+            detector_backend=self.deepface.detector_backend,
+            distance_metric=self.deepface.distance_metric,
+            index_settings=self.deepface.index,
+        )
+
+    def _sync_embedding_files(
+        self,
+        objects: list[S3Object],
+        current: FaceGallery | None,
+    ) -> FaceGallery | None:
+        """Download new and changed embedding files and apply them to current gallery.
+
+        Returns None if nothing changed since last sync.
+        """
+        if not objects:
+            raise ValueError("No embedding files found")
+
+        result = self.sync.sync(objects)
+        self.logger.info(
+            "Synced embedding files",
+            gallery=self.name,
+            added=len(result.added),
+            changed=len(result.changed),
+            removed=len(result.removed),
+            unchanged=result.unchanged,
+            transfer=str(result.stats),
+        )
+        if result.stats.failed:
+            self.logger.warning(
+                f"Failed to download {result.stats.failed} embedding files",
+                gallery=self.name,
+                errors=dict(list(result.stats.errors.items())[:10]),
+            )
+
+        if current is None or current.metadata is not None:
+            # Nothing to update incrementally (first load or switch from prebuilt gallery)
+            self._file_images = {}
+            paths = sorted(self.local_dir.rglob(f"*{DEFAULT_EMBEDDING_EXT}"))
+            return FaceGallery.from_frame(
+                self._read_embedding_files(paths),
+                distance_metric=self.deepface.distance_metric,
+                index_settings=self.deepface.index,
+            )
+
+        if not result.has_changes:
+            return None
+
+        # Faces of changed files are removed and added again
+        removed_filenames: set[str] = set()
+        for path in result.added + result.changed + result.removed:
+            removed_filenames |= self._file_images.pop(self._get_file_key(path), frozenset())
+
+        return current.updated(
+            added=self._read_embedding_files(result.added + result.changed),
+            removed_filenames=removed_filenames,
+        )
+
+    def _read_embedding_files(self, paths: list[Path]) -> pd.DataFrame:
+        """Read embedding files remembering image filenames of every file."""
+        frames = []
+        for path in paths:
+            frame = read_embeddings_files([path])
+            filenames = frame["filename"] if "filename" in frame else []
+            self._file_images[self._get_file_key(path)] = frozenset(filenames)
+            frames.append(frame)
+
+        return pd.concat(frames, ignore_index=True) if frames else pd.DataFrame()
+
+    def _get_file_key(self, path: Path) -> str:
+        return path.relative_to(self.local_dir).as_posix()
+
+
+class GalleryRegistry:
+    """Named galleries of events served by a single process.
+
+    All galleries are searched with the same loaded models, every gallery has its
+    own index, local files and load/unload policy.
+    """
+
+    def __init__(self, galleries: Iterable[EventGallery], max_bytes: int | None = None) -> None:
+        """Initialize class instance.
+
+        Least recently used galleries are unloaded when total size of loaded galleries
+        exceeds `max_bytes` (None is unlimited).
+        """
+        self.galleries = {gallery.name: gallery for gallery in galleries}
+        self.max_bytes = max_bytes
+
+    def __contains__(self, name: str) -> bool:
+        return name in self.galleries
+
+    def __getitem__(self, name: str) -> EventGallery:
+        return self.galleries[name]
+
+    def __repr__(self) -> str:
+        return f"<{self.__class__.__name__} {list(self.galleries)}>"
+
+    @property
+    def nbytes(self) -> int:
+        """Total size of loaded galleries in bytes."""
+        return sum(gallery.nbytes for gallery in self.galleries.values())
+
+    def get_gallery(self, name: str) -> SearchGallery:
+        """Get gallery of event for search (loaded on first use).
+
+        Raises:
+            KeyError: Unknown gallery.
+        """
+        event_gallery = self.galleries[name]
+        self.unload_idle()
+        gallery = event_gallery.get()
+        self.unload_over_budget(keep=name)
+        return gallery
+
+    def preload(self) -> None:
+        """Load galleries configured to be loaded at startup."""
+        for gallery in self.galleries.values():
+            if gallery.event.preload:
+                gallery.load()
+                self.unload_over_budget(keep=gallery.name)
+
+    def reload(self, name: str | None = None, full: bool = False) -> dict[str, bool]:
+        """Update loaded galleries (or one of them) from S3.
+
+        Not loaded galleries are skipped, they get latest files on first use anyway.
+
+        Returns:
+            dict[str, bool]: Whether gallery was replaced, by name of reloaded gallery.
+
+        Raises:
+            KeyError: Unknown gallery.
+        """
+        galleries = [self.galleries[name]] if name is not None else self.galleries.values()
+        return {gallery.name: gallery.load(full=full) for gallery in galleries if gallery.is_loaded}
+
+    def unload_idle(self) -> list[str]:
+        """Unload galleries not used longer than their `idle_ttl`."""
+        now = time.monotonic()
+        return [
+            gallery.name
+            for gallery in self.galleries.values()
+            if gallery.is_idle(now) and gallery.unload()
+        ]
+
+    def unload_over_budget(self, keep: str | None = None) -> list[str]:
+        """Unload least recently used galleries until loaded ones fit memory budget.
+
+        Args:
+            keep (str | None): Gallery which is never unloaded (e.g. just requested one).
+
+        Returns:
+            list[str]: Names of unloaded galleries.
+        """
+        if self.max_bytes is None:
+            return []
+
+        unloaded = []
+        loaded = sorted(
+            (gallery for gallery in self.galleries.values() if gallery.is_loaded),
+            key=lambda gallery: gallery.last_used,
+        )
+        for gallery in loaded:
+            if self.nbytes <= self.max_bytes:
+                break
+            if gallery.name != keep and gallery.unload():
+                unloaded.append(gallery.name)
+
+        return unloaded
+
+    def stats(self) -> dict[str, Any]:
+        """Get memory usage of all galleries."""
+        return {
+            "mb": round(self.nbytes / 2**20, 1),
+            "max_mb": round(self.max_bytes / 2**20, 1) if self.max_bytes is not None else None,
+            "galleries": {name: gallery.stats() for name, gallery in self.galleries.items()},
+        }
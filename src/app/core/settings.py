@@ -27,10 +27,22 @@ class UISettings(LowercaseKeyMixin, BaseModel):
     branding_text: str | None = None
 
 
+class AdminSettings(LowercaseKeyMixin, BaseModel):
+    token: str | None = None  # admin endpoints are disabled without token
+
+
+class CacheSettings(LowercaseKeyMixin, BaseModel):
+    max_entries: int = 256  # cache of upload results is disabled when 0
+    max_mb: int = 128
+    ttl: int = 600  # seconds
+
+
 class Settings(BaseModel):
     """App settings."""
 
     ui: UISettings
+    admin: AdminSettings
+    cache: CacheSettings
     s3: S3Settings
     proxy: ProxySettings
     images: ImagesSettings
@@ -41,6 +53,8 @@ class Settings(BaseModel):
     def from_config(cls, config: Mapping) -> "Settings":
         return cls(
             ui=config.get("ui", {}),
+            admin=config.get("admin", {}),
+            cache=config.get("cache", {}),
             s3=config["s3"],
             proxy=config["proxy"],
             images=config["images"],
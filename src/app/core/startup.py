@@ -0,0 +1,89 @@
+import asyncio
+import time
+from contextlib import suppress
+from typing import (
+    Awaitable,
+    Callable,
+)
+
+from .logging import Logger
+from .utils import measure_time
+
+StartupPhase = Callable[[], Awaitable[None]]
+
+
+class Startup:
+    """Startup phases of application running concurrently in background.
+
+    Server accepts requests (e.g. liveness probes) while phases are running and reports
+    readiness only when all of them are finished. Failed phase doesn't stop others,
+    but application never becomes ready.
+    """
+
+    def __init__(self, logger: Logger) -> None:
+        """Initialize class instance."""
+        self.logger = logger
+        self.statuses: dict[str, str] = {}
+        self.timings: dict[str, float] = {}
+        self.task: asyncio.Task | None = None
+
+    def __repr__(self) -> str:
+        return f"<{self.__class__.__name__} {self.statuses}>"
+
+    @property
+    def is_ready(self) -> bool:
+        """Check if all phases are finished successfully."""
+        return (
+            self.task is not None
+            and self.task.done()
+            and all(status == "done" for status in self.statuses.values())
+        )
+
+    @property
+    def is_failed(self) -> bool:
+        """Check if any phase failed."""
+        return "failed" in self.statuses.values()
+
+    def start(self, phases: dict[str, StartupPhase]) -> None:
+        """Run phases concurrently in background task."""
+        self.statuses = {name: "pending" for name in phases}
+        self.task = asyncio.create_task(self.run(phases))
+
+    async def run(self, phases: dict[str, StartupPhase]) -> None:
+        started = time.perf_counter()
+        await asyncio.gather(*(self._run_phase(name, phase) for name, phase in phases.items()))
+        self.logger.info(
+            "Startup finished",
+            ready=not self.is_failed,
+            statuses=self.statuses,
+            timings=self.timings,
+            elapsed=round(time.perf_counter() - started, 4),
+        )
+
+    async def stop(self) -> None:
+        """Cancel unfinished phases (blocking calls in threads still run to the end)."""
+        if self.task is not None and not self.task.done():
+            self.task.cancel()
+            with suppress(asyncio.CancelledError):
+                await self.task
+
+    def stats(self) -> dict:
+        return {
+            "ready": self.is_ready,
+            "phases": {
+                name: {"status": status, "elapsed": self.timings.get(name)}
+                for name, status in self.statuses.items()
+            },
+        }
+
+    async def _run_phase(self, name: str, phase: StartupPhase) -> None:
+        self.statuses[name] = "running"
+        try:
+            with measure_time(self.timings, name):
+                await phase()
+        except Exception as e:
+            self.statuses[name] = "failed"
+            self.logger.exception("Startup phase failed", e, phase=name)
+        else:
+            self.statuses[name] = "done"
+            self.logger.info("Startup phase finished", phase=name, elapsed=self.timings[name])
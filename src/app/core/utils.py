@@ -1,5 +1,14 @@
-from contextlib import suppress
-from typing import Any
+import os
+import resource
+import time
+from contextlib import (
+    contextmanager,
+    suppress,
+)
+from typing import (
+    Any,
+    Iterator,
+)
 
 import pydantic
 
@@ -14,6 +23,23 @@ def get_version() -> str | None:
     return None
 
 
+def get_memory_usage() -> int:
+    """Get resident memory size of current process in bytes (peak size if current is unknown)."""
+    with suppress(Exception), open("/proc/self/statm", "r") as f:
+        return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+
+
+@contextmanager
+def measure_time(timings: dict[str, float], name: str) -> Iterator[None]:
+    """Save elapsed time of the block (in seconds) to timings dict under name."""
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        timings[name] = round(time.perf_counter() - started, 4)
+
+
 def make_list(value: Any) -> list:
     """Convert value to list if not already."""
     return [value] if not isinstance(value, list) else value
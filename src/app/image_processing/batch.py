@@ -1,3 +1,12 @@
+import json
+import multiprocessing
+from collections import deque
+from concurrent.futures import (
+    Executor,
+    Future,
+    ProcessPoolExecutor,
+    ThreadPoolExecutor,
+)
 from pathlib import Path
 from typing import (
     Any,
@@ -6,6 +15,60 @@ from typing import (
 
 from .resources import IMAGE_EXTENSIONS
 
+EXECUTORS = ("process", "thread")
+
+# How many tasks per worker may be submitted to the pool ahead of reporting
+QUEUE_SIZE_PER_WORKER = 2
+
+
+class BatchManifest:
+    """Append-only JSON lines journal of processed files.
+
+    Every processed file is recorded with its status, so an interrupted batch can be
+    started again and continue where it stopped: files recorded as successfully
+    processed are skipped, failed ones are retried.
+    """
+
+    def __init__(self, path: str | Path) -> None:
+        """Initialize class instance."""
+        self.path = Path(path)
+        self.done: set[str] = set()
+
+        line = ""
+        if self.path.exists():
+            with open(self.path, "r") as f:
+                for line in f:
+                    try:
+                        record = json.loads(line)
+                    except ValueError:
+                        continue  # partially written line of interrupted run
+
+                    if record.get("status") == "ok":
+                        self.done.add(record["key"])
+                    else:
+                        self.done.discard(record["key"])
+
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._file = open(self.path, "a")
+        if line and not line.endswith("\n"):
+            # Records are never appended to partially written line
+            self._file.write("\n")
+
+    def __contains__(self, key: str) -> bool:
+        return key in self.done
+
+    def record(self, key: str, status: str, detail: Any = None) -> None:
+        """Record processing result of a single file."""
+        if status == "ok":
+            self.done.add(key)
+
+        record = {"key": key, "status": status, "detail": detail}
+        self._file.write(json.dumps(record, ensure_ascii=False, default=repr) + "\n")
+        self._file.flush()
+
+    def close(self) -> None:
+        self._file.close()
+
 
 def batch_processing(
     processing_func: Callable,
@@ -14,6 +77,11 @@ def batch_processing(
     display_progress: bool = True,
     raise_errors: bool = False,
     allowed_extensions: set[str] = IMAGE_EXTENSIONS,
+    workers: int = 1,
+    executor: str = "process",
+    initializer: Callable | None = None,
+    initargs: tuple = (),
+    manifest_path: str | Path | None = None,
     **processing_func_kwargs: Any,
 ) -> int:
     """Apply a processing function to all images in a source directory.
@@ -34,6 +102,15 @@ def batch_processing(
             errors or continue with next file. Defaults to False.
         allowed_extensions (set[str], optional): Set of allowed file extensions
             to process. Defaults to IMAGE_EXTENSIONS.
+        workers (int, optional): Number of parallel workers. Files are processed
+            one by one in current process when 1. Defaults to 1.
+        executor (str, optional): Pool used by parallel workers: "process" (function
+            and its kwargs must be picklable) or "thread". Defaults to "process".
+        initializer (Callable | None, optional): Function called once in every worker
+            before processing (e.g. to load models). Defaults to None.
+        initargs (tuple, optional): Arguments of initializer. Defaults to ().
+        manifest_path (str | Path | None, optional): Path to manifest file used to
+            resume interrupted processing (see BatchManifest). Defaults to None.
         **processing_func_kwargs (Any): Additional keyword arguments to pass to
             the processing function.
 
@@ -49,21 +126,27 @@ def batch_processing(
         ...     resize_image,
         ...     "input_images/",
         ...     "output_images/",
+        ...     workers=8,
         ...     size=(200, 200)
         ... )
     """
     if not callable(processing_func):
         raise ValueError("processing_func must be a callable function")
 
+    if executor not in EXECUTORS:
+        raise ValueError(f"Unknown executor '{executor}'. Choose from: {', '.join(EXECUTORS)}")
+
     src_dir = Path(src_dir)
     dst_dir = Path(dst_dir) if dst_dir else None
 
     if not src_dir.exists() or not src_dir.is_dir():
         raise ValueError(f"Source directory '{src_dir}' does not exist or is not a directory.")
 
-    processed = 0
+    manifest = BatchManifest(manifest_path) if manifest_path else None
+    func_name = getattr(processing_func, "__name__", repr(processing_func))
 
-    for src_path in src_dir.rglob("*"):
+    tasks: list[tuple[Path, Path | None]] = []
+    for src_path in sorted(src_dir.rglob("*")):
         if allowed_extensions and src_path.suffix.lower() not in allowed_extensions:
             if display_progress:
                 print(f"Skipping {src_path}")  # noqa
@@ -72,28 +155,121 @@ def batch_processing(
         relative_path = src_path.relative_to(src_dir)
         dst_path = (dst_dir / relative_path) if dst_dir else None
 
-        try:
-            if dst_path is None:
-                result = processing_func(src_path, **processing_func_kwargs)
-            else:
-                result = processing_func(src_path, dst_path, **processing_func_kwargs)
-
-            processed += 1
+        if manifest is not None and get_task_key(src_path, dst_path) in manifest:
             if display_progress:
-                result_repr = f": {result!r}" if result is not None else ""
-                print(f"{processing_func.__name__} {src_path} -> {dst_path}{result_repr}")  # noqa
-        except KeyboardInterrupt:
-            if display_progress:
-                print("Process interrupted by user.")  # noqa
-            raise
+                print(f"Already processed {src_path}")  # noqa
+            continue
+
+        tasks.append((src_path, dst_path))
+
+    processed = 0
+    total = len(tasks)
+
+    def report(number: int, src_path: Path, dst_path: Path | None, future: Future) -> None:
+        nonlocal processed
+
+        key = get_task_key(src_path, dst_path)
+        try:
+            result = future.result()
         except Exception as e:
+            if manifest is not None:
+                manifest.record(key, "error", str(e))
             if display_progress:
-                print(f"Error processing {src_path}: {e}")  # noqa
-
+                print(f"[{number}/{total}] Error processing {src_path}: {e}")  # noqa
             if raise_errors:
                 raise e
+            return
+
+        processed += 1
+        if manifest is not None:
+            manifest.record(key, "ok", result)
+        if display_progress:
+            result_repr = f": {result!r}" if result is not None else ""
+            print(f"[{number}/{total}] {func_name} {src_path} -> {dst_path}{result_repr}")  # noqa
+
+    pool: Executor
+    if workers > 1 and executor == "process":
+        # Spawned (not forked) processes, because ML libraries don't survive fork
+        pool = ProcessPoolExecutor(
+            max_workers=workers,
+            mp_context=multiprocessing.get_context("spawn"),
+            initializer=initializer,
+            initargs=initargs,
+        )
+    elif workers > 1:
+        pool = ThreadPoolExecutor(max_workers=workers, initializer=initializer, initargs=initargs)
+    else:
+        if initializer is not None:
+            initializer(*initargs)
+        pool = _CurrentThreadExecutor()
+
+    # Bounded window of pending tasks: results are reported in order of files,
+    # while workers keep processing next files
+    pending: deque[tuple[int, Path, Path | None, Future]] = deque()
+    max_pending = workers * QUEUE_SIZE_PER_WORKER if workers > 1 else 1
+
+    try:
+        for number, (src_path, dst_path) in enumerate(tasks, start=1):
+            future = pool.submit(
+                process_file,
+                processing_func,
+                src_path,
+                dst_path,
+                processing_func_kwargs,
+            )
+            pending.append((number, src_path, dst_path, future))
+
+            while len(pending) >= max_pending:
+                report(*pending.popleft())
+
+        while pending:
+            report(*pending.popleft())
+    except KeyboardInterrupt:
+        if display_progress:
+            print("Process interrupted by user.")  # noqa
+        raise
+    finally:
+        pool.shutdown(wait=True, cancel_futures=True)
+        if manifest is not None:
+            manifest.close()
 
     if display_progress:
         print(f"Total images processed: {processed}")  # noqa
 
     return processed
+
+
+def process_file(
+    processing_func: Callable,
+    src_path: Path,
+    dst_path: Path | None,
+    processing_func_kwargs: dict,
+) -> Any:
+    """Call processing function for a single file (runs inside worker)."""
+    if dst_path is None:
+        return processing_func(src_path, **processing_func_kwargs)
+    return processing_func(src_path, dst_path, **processing_func_kwargs)
+
+
+def get_task_key(src_path: Path, dst_path: Path | None) -> str:
+    """Get key identifying a single file processing in manifest.
+
+    Key includes size and modification time of source file, so changed files
+    are processed again.
+    """
+    stat = src_path.stat()
+    return f"{src_path} -> {dst_path} ({stat.st_size}, {stat.st_mtime_ns})"
+
+
+class _CurrentThreadExecutor(Executor):
+    """Executor that runs submitted function immediately in current thread."""
+
+    def submit(self, fn: Callable, /, *args: Any, **kwargs: Any) -> Future:
+        future: Future = Future()
+        try:
+            future.set_result(fn(*args, **kwargs))
+        except KeyboardInterrupt:
+            raise
+        except Exception as e:
+            future.set_exception(e)
+        return future
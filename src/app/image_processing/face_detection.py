@@ -1,71 +1,109 @@
 from pathlib import Path
+from typing import Sequence
 
 import numpy as np
-from deepface import DeepFace
 
+from .face_embeddings import (
+    build_models,
+    forward_batch,
+    prepare_face,
+)
+from .gallery import FaceGallery
 from .resources import (
     Face,
-    FaceEmbedding,
+    ScaledImage,
     SimilarFace,
 )
+from .sharding import ShardedGallery
 from .utils import (
     get_image_content,
     get_image_content_from_bytes,
 )
 
+# Size of blank image used to warm up models
+WARM_UP_IMAGE_SIZE = 224
+
 
 def get_faces(
-    image: str | Path | bytes,
+    image: str | Path | bytes | np.ndarray | ScaledImage,
     detector_backend: str,
     min_face_size: int = 100,
 ) -> list[Face]:
     """Detect and extract faces from an image file.
 
     Args:
-        image_path (str | Path): Path to the image file.
+        image (str | Path | bytes | np.ndarray | ScaledImage): Path to the image file,
+            its content, already decoded image (BGR) or image downscaled for detection.
+            Facial areas of downscaled image are mapped back to original image.
         detector_backend (str, optional): Face detection backend to use.
             Defaults to DEFAULT_DETECTOR_BACKEND.
-        min_face_size (int, optional): Minimum size (in pixels) for detected faces.
-            Faces smaller than this will be ignored. Defaults to 100.
+        min_face_size (int, optional): Minimum size (in pixels of original image) for
+            detected faces. Faces smaller than this will be ignored. Defaults to 100.
 
     Returns:
         list[Face]: List of detected faces with details.
     """
     image_bytes: np.ndarray
+    scale = 1.0
 
-    if isinstance(image, bytes):
+    if isinstance(image, ScaledImage):
+        image_bytes, scale = image
+    elif isinstance(image, bytes):
         image_bytes = get_image_content_from_bytes(image)
     elif isinstance(image, (str, Path)):
         image_bytes = get_image_content(image)
+    elif isinstance(image, np.ndarray):
+        image_bytes = image
     else:
-        raise TypeError("image_path must be str, Path, or bytes")
+        raise TypeError("image must be str, Path, bytes, np.ndarray or ScaledImage")
+
+    from deepface import DeepFace
 
     target_faces = DeepFace.extract_faces(
         image_bytes,
         enforce_detection=False,
         detector_backend=detector_backend,
     )
-    return [
-        Face(**f)
-        for f in target_faces
-        if f["confidence"]
-        and f["facial_area"]["w"] > min_face_size
-        and f["facial_area"]["h"] > min_face_size
-    ]  # type:ignore
+
+    faces = []
+    for f in target_faces:
+        facial_area = scale_facial_area(f["facial_area"], scale) if scale != 1 else f["facial_area"]
+        if (
+            f["confidence"]
+            and facial_area["w"] > min_face_size
+            and facial_area["h"] > min_face_size
+        ):
+            faces.append(Face(face=f["face"], facial_area=facial_area, confidence=f["confidence"]))
+
+    return faces
+
+
+def scale_facial_area(facial_area: dict, scale: float) -> dict:
+    """Map facial area (box and eyes coordinates) of downscaled image to original image."""
+    return {
+        key: (
+            round(value * scale)
+            if isinstance(value, (int, float, np.number))
+            else tuple(round(v * scale) for v in value) if value is not None else None
+        )
+        for key, value in facial_area.items()
+    }
 
 
 def find_similar_faces(
     faces: list[Face],
-    embeddings: list[FaceEmbedding],
+    gallery: FaceGallery,
     model_name: str,
+    max_results: int | None = None,
 ) -> list[SimilarFace]:
-    """Find similar faces from a list of face embeddings.
+    """Find similar faces in a gallery of known face embeddings.
 
     Args:
         faces (list[Face]): List of Face objects to find similarities for.
-        embeddings (list[FaceEmbedding]): List of known face embeddings to compare against.
-        model_name (str, optional): Name of the face recognition model to use.
-            Defaults to DEFAULT_MODEL_NAME.
+        gallery (FaceGallery): Packed gallery of known face embeddings to compare against.
+        model_name (str): Name of the face recognition model to use.
+        max_results (int | None, optional): Maximum number of matches per face.
+            None keeps all matches within threshold. Defaults to None.
 
     Returns:
         list[SimilarFace]: Sorted list of similar faces found.
@@ -73,20 +111,133 @@ def find_similar_faces(
     if not faces:
         raise ValueError("Faces list is empty")
 
-    if not embeddings:
-        raise ValueError("Embeddings list is empty")
-
-    results = DeepFace.recognition.find_batched(
-        [e.model_dump() for e in embeddings],
-        source_objs=[f.model_dump() for f in faces],
+    return search_similar_faces(
+        query_embeddings=represent_faces(faces, model_name),
+        gallery=gallery,
         model_name=model_name,
+        max_results=max_results,
     )
 
-    similar_faces = set()
-    for face_results in results:
-        for data in face_results:
-            # Convert numpy types to native Python types
-            converted_data = {k: v.item() if hasattr(v, "item") else v for k, v in data.items()}
-            similar_faces.add(SimilarFace(**converted_data))
 
-    return sorted(similar_faces, key=lambda sf: sf.distance)
+def search_similar_faces(
+    query_embeddings: np.ndarray,
+    gallery: FaceGallery | ShardedGallery | Sequence[FaceGallery],
+    model_name: str,
+    max_results: int | None = None,
+) -> list[SimilarFace]:
+    """Find similar faces in a gallery for already computed query embeddings.
+
+    Args:
+        query_embeddings (np.ndarray): Query embeddings matrix of shape (M, D).
+        gallery (FaceGallery | ShardedGallery | Sequence[FaceGallery]): Packed gallery
+            of known face embeddings to compare against (optionally searched by worker
+            processes), or several gallery shards searched with the same query
+            embeddings (matches of shards are merged by distance).
+        model_name (str): Name of the face recognition model used for embeddings.
+        max_results (int | None, optional): Maximum number of matches per face.
+            None keeps all matches within threshold. Defaults to None.
+
+    Returns:
+        list[SimilarFace]: Sorted list of similar faces found.
+    """
+    if not len(query_embeddings):
+        raise ValueError("Faces list is empty")
+
+    shards = list(gallery) if isinstance(gallery, Sequence) else [gallery]
+    shards = [shard for shard in shards if len(shard)]
+    if not shards:
+        raise ValueError("Embeddings list is empty")
+
+    distance_metrics = {shard.distance_metric for shard in shards}
+    if len(distance_metrics) > 1:
+        raise ValueError(f"Gallery shards have different distance metrics: {distance_metrics}")
+
+    from deepface.modules.verification import find_threshold
+
+    threshold = find_threshold(model_name, shards[0].distance_metric)
+    shard_ids, indices, distances = _search_shards(shards, query_embeddings, threshold, max_results)
+
+    if len(shards) == 1:
+        keys = shards[0].columns.file_keys(indices)
+    else:
+        keys = np.array(
+            [
+                f"{shards[s].columns.filename(i)}\0{shards[s].columns.model_name(i)}"
+                for s, i in zip(shard_ids, indices)
+            ],
+        )
+
+    # First match of a file wins (in order of faces, then distances),
+    # same as adding results to a set of SimilarFace objects
+    _, first = np.unique(keys, return_index=True)
+    first = np.sort(first)
+    first = first[np.argsort(distances[first], kind="stable")]
+
+    return [
+        shards[shard_ids[i]].get_similar_face(indices[i], threshold, distances[i]) for i in first
+    ]
+
+
+def _search_shards(
+    shards: list[FaceGallery | ShardedGallery],
+    queries: np.ndarray,
+    threshold: float,
+    top_k: int | None,
+) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """Search all shards and merge matches of every query by distance.
+
+    Returns:
+        tuple[np.ndarray, np.ndarray, np.ndarray]: Shard, row index and distance of
+            every match, grouped by query in order of queries.
+    """
+    results = [shard.search(queries, threshold=threshold, top_k=top_k) for shard in shards]
+
+    shard_ids, indices, distances = [], [], []
+    for query in range(len(queries)):
+        query_shards = np.concatenate(
+            [np.full(len(result[query][0]), s, dtype=np.int64) for s, result in enumerate(results)],
+        )
+        query_indices = np.concatenate([result[query][0] for result in results])
+        query_distances = np.concatenate([result[query][1] for result in results])
+
+        # Shards are already sorted, stable sort keeps shard order for equal distances
+        order = np.argsort(query_distances, kind="stable")[:top_k]
+        shard_ids.append(query_shards[order])
+        indices.append(query_indices[order])
+        distances.append(query_distances[order])
+
+    return np.concatenate(shard_ids), np.concatenate(indices), np.concatenate(distances)
+
+
+def represent_faces(faces: list[Face], model_name: str) -> np.ndarray:
+    """Get embeddings matrix for already detected and aligned faces.
+
+    All faces are passed to recognition model in a single batch. Faces are prepared
+    same way as `DeepFace.represent` does for detected faces.
+    """
+    if not faces:
+        raise ValueError("Faces list is empty")
+
+    from deepface import DeepFace
+
+    model = DeepFace.build_model(model_name, "facial_recognition")
+    batch = np.concatenate([prepare_face(face.face, model.input_shape) for face in faces])
+    return forward_batch(model, batch).astype(np.float32)
+
+
+def warm_up_models(model_name: str, detector_backend: str) -> None:
+    """Build models and run them once on a blank image.
+
+    First call of a model initializes its runtime (e.g. TensorFlow graph), which can
+    take longer than building it, so it is done before the first request.
+    """
+    from deepface import DeepFace
+
+    build_models(model_name, detector_backend)
+
+    image = np.zeros((WARM_UP_IMAGE_SIZE, WARM_UP_IMAGE_SIZE, 3), dtype=np.uint8)
+    get_faces(image, detector_backend)
+
+    model = DeepFace.build_model(model_name, "facial_recognition")
+    face = np.zeros((WARM_UP_IMAGE_SIZE, WARM_UP_IMAGE_SIZE, 3), dtype=np.float32)
+    forward_batch(model, prepare_face(face, model.input_shape))
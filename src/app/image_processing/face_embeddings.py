@@ -1,13 +1,33 @@
+from collections import deque
+from concurrent.futures import (
+    Future,
+    ThreadPoolExecutor,
+)
 from pathlib import Path
-from typing import Any
+from typing import (
+    Any,
+    Iterable,
+    Iterator,
+)
 
+import numpy as np
 import pandas as pd
-from deepface import DeepFace
 
 from .resources import (
     DEFAULT_EMBEDDING_EXT,
     FaceEmbedding,
 )
+from .utils import get_image_content
+
+
+def build_models(model_name: str, detector_backend: str) -> None:
+    """Load recognition and detection models (e.g. once per batch processing worker)."""
+    # deepface imports TensorFlow (takes seconds), so it is imported on first use and
+    # importing app doesn't wait for it
+    from deepface import DeepFace
+
+    DeepFace.build_model(model_name, "facial_recognition")
+    DeepFace.build_model(detector_backend, "face_detector")
 
 
 def get_embeddings(
@@ -17,6 +37,8 @@ def get_embeddings(
     min_face_size: int = 20,
 ) -> list[FaceEmbedding]:
     """Get list of embeddings from image file."""
+    from deepface import DeepFace
+
     filename = Path(image_path).name
     faces = DeepFace.represent(
         str(image_path),
@@ -48,25 +70,245 @@ def create_embeddings_file(
     **kwargs: Any,
 ) -> int:
     """Get image embeddings and save them to parquet file."""
-    embedding_path = Path(embedding_path)
-    if embedding_ext:
-        embedding_path = embedding_path.with_suffix(embedding_ext)
-
+    embedding_path = get_embedding_path(embedding_path, embedding_ext)
     if skip_existing and embedding_path.exists():
         return -1  # skip existing
 
-    if not embedding_path.parent.exists():
-        embedding_path.parent.mkdir(parents=True, exist_ok=True)
-
     embeddings = get_embeddings(
         image_path=image_path,
         model_name=model_name,
         detector_backend=detector_backend,
         **kwargs,
     )
+    return write_embeddings_file(embeddings, embedding_path)
+
+
+def create_embeddings_files(
+    paths: Iterable[tuple[str | Path, str | Path]],
+    model_name: str,
+    detector_backend: str,
+    embedding_ext: str = DEFAULT_EMBEDDING_EXT,
+    skip_existing: bool = True,
+    **kwargs: Any,
+) -> Iterator[tuple[Path, int | Exception]]:
+    """Get embeddings of many images with batched inference and save them to parquet files.
+
+    Produces same files as `create_embeddings_file` called for every image.
+
+    Args:
+        paths (Iterable[tuple[str | Path, str | Path]]): Pairs of image and embedding paths.
+        model_name (str): Face recognition model name.
+        detector_backend (str): Face detector backend name.
+        embedding_ext (str): Extension of embedding files.
+        skip_existing (bool): Skip images which embedding file already exists.
+        **kwargs (Any): Additional keyword arguments of `get_embeddings_batched`.
+
+    Yields:
+        tuple[Path, int | Exception]: Image path and number of saved faces (-1 if skipped)
+            or processing error. Skipped images may be reported ahead of order of `paths`.
+    """
+    targets: dict[Path, Path] = {}
+    skipped: list[Path] = []
+
+    def iter_images() -> Iterator[Path]:
+        for image_path, embedding_path in paths:
+            image_path = Path(image_path)
+            embedding_path = get_embedding_path(embedding_path, embedding_ext)
+            if skip_existing and embedding_path.exists():
+                skipped.append(image_path)
+                continue
+
+            targets[image_path] = embedding_path
+            yield image_path
+
+    results = get_embeddings_batched(iter_images(), model_name, detector_backend, **kwargs)
+    for image_path, embeddings in results:
+        while skipped:
+            yield skipped.pop(0), -1
+
+        embedding_path = targets.pop(image_path)
+        if isinstance(embeddings, Exception):
+            yield image_path, embeddings
+            continue
+
+        try:
+            yield image_path, write_embeddings_file(embeddings, embedding_path)
+        except Exception as e:
+            yield image_path, e
+
+    while skipped:
+        yield skipped.pop(0), -1
+
+
+def get_embeddings_batched(
+    image_paths: Iterable[str | Path],
+    model_name: str,
+    detector_backend: str,
+    min_face_size: int = 20,
+    batch_size: int = 32,
+    decode_workers: int = 4,
+) -> Iterator[tuple[Path, list[FaceEmbedding] | Exception]]:
+    """Get embeddings of many images running recognition model on batches of faces.
+
+    Pipeline has three stages: images are decoded in a thread pool, faces are detected
+    image by image, and aligned face crops of several images are collected into batches
+    of `batch_size` faces for a single recognition model call. Face crops are prepared
+    same way as `DeepFace.represent` does, so embeddings match `get_embeddings`.
+
+    Args:
+        image_paths (Iterable[str | Path]): Paths of images.
+        model_name (str): Face recognition model name.
+        detector_backend (str): Face detector backend name.
+        min_face_size (int): Faces with smaller width or height are ignored.
+        batch_size (int): Number of faces in one recognition model call.
+        decode_workers (int): Number of threads decoding images.
+
+    Yields:
+        tuple[Path, list[FaceEmbedding] | Exception]: Image path and its embeddings
+            or processing error, in order of `image_paths`.
+    """
+    from deepface import DeepFace
+
+    model = DeepFace.build_model(model_name, "facial_recognition")
+    target_size = model.input_shape
+
+    paths = iter(image_paths)
+    decoding: deque[tuple[Path, Future]] = deque()
+    waiting: deque[_PendingImage] = deque()
+    batch: list[tuple[_PendingImage, int, np.ndarray]] = []
+
+    def submit_next() -> None:
+        if (path := next(paths, None)) is not None:
+            decoding.append((Path(path), decode_pool.submit(get_image_content, path)))
+
+    def run_batch() -> None:
+        try:
+            embeddings = forward_batch(model, np.concatenate([crop for _, _, crop in batch]))
+        except Exception as e:
+            for image, _, _ in batch:
+                image.error = e
+        else:
+            for (image, position, _), embedding in zip(batch, embeddings):
+                image.embeddings[position] = embedding.tolist()
+        batch.clear()
+
+    with ThreadPoolExecutor(max_workers=decode_workers) as decode_pool:
+        for _ in range(2 * decode_workers):
+            submit_next()
+
+        while decoding:
+            path, future = decoding.popleft()
+            submit_next()
+
+            image = _PendingImage(path)
+            waiting.append(image)
+            try:
+                if (content := future.result()) is None:
+                    raise ValueError(f"Failed to read image {path}")
+
+                faces = DeepFace.extract_faces(
+                    content,
+                    detector_backend=detector_backend,
+                    enforce_detection=False,
+                )
+            except Exception as e:
+                image.error = e
+                faces = []
+
+            for face in faces:
+                if (
+                    face["confidence"]
+                    and face["facial_area"]["w"] > min_face_size
+                    and face["facial_area"]["h"] > min_face_size
+                ):
+                    image.faces.append(face)
+                    image.embeddings.append(None)
+                    crop = prepare_face(face["face"], target_size)
+                    batch.append((image, len(image.faces) - 1, crop))
+
+            if len(batch) >= batch_size:
+                run_batch()
+
+            while waiting and waiting[0].is_ready:
+                yield waiting.popleft().result(model_name)
+
+        if batch:
+            run_batch()
+
+        while waiting:
+            yield waiting.popleft().result(model_name)
+
+
+def prepare_face(face: np.ndarray, target_size: tuple[int, int]) -> np.ndarray:
+    """Prepare face crop for recognition model (same as DeepFace.represent does)."""
+    from deepface.modules import preprocessing
+
+    face = face[:, :, ::-1]
+    face = preprocessing.resize_image(img=face, target_size=(target_size[1], target_size[0]))
+    return np.asarray(preprocessing.normalize_input(img=face, normalization="base"))
+
+
+def forward_batch(model: Any, batch: np.ndarray) -> np.ndarray:
+    """Get embeddings of batch of prepared faces with a single model call."""
+    embeddings = np.asarray(model.forward(batch))
+    if embeddings.ndim == 2 and embeddings.shape[0] == batch.shape[0]:
+        return embeddings
+
+    if batch.shape[0] == 1:
+        return embeddings.reshape(1, -1)
+
+    # Model does not support batches, fallback to one call per face
+    return np.array([model.forward(batch[i : i + 1]) for i in range(batch.shape[0])])
+
+
+class _PendingImage:
+    """Image waiting until embeddings of all its faces are computed."""
+
+    __slots__ = ("path", "faces", "embeddings", "error")
+
+    def __init__(self, path: Path) -> None:
+        """Initialize class instance."""
+        self.path = path
+        self.faces: list[dict] = []
+        self.embeddings: list[list[float] | None] = []
+        self.error: Exception | None = None
+
+    @property
+    def is_ready(self) -> bool:
+        return self.error is not None or all(e is not None for e in self.embeddings)
+
+    def result(self, model_name: str) -> tuple[Path, list[FaceEmbedding] | Exception]:
+        if self.error is not None:
+            return self.path, self.error
+
+        return self.path, [
+            FaceEmbedding(
+                filename=self.path.name,
+                model_name=model_name,
+                facial_area=face["facial_area"],
+                face_confidence=face["confidence"],
+                embedding=embedding,  # type:ignore
+            )
+            for face, embedding in zip(self.faces, self.embeddings)
+        ]
+
+
+def get_embedding_path(embedding_path: str | Path, embedding_ext: str) -> Path:
+    """Get path of embedding file with proper extension."""
+    embedding_path = Path(embedding_path)
+    if embedding_ext:
+        embedding_path = embedding_path.with_suffix(embedding_ext)
+    return embedding_path
+
+
+def write_embeddings_file(embeddings: list[FaceEmbedding], embedding_path: Path) -> int:
+    """Save embeddings to parquet file (nothing is saved if there are no embeddings)."""
     if not embeddings:
         return 0
 
+    if not embedding_path.parent.exists():
+        embedding_path.parent.mkdir(parents=True, exist_ok=True)
+
     df = pd.DataFrame([emb.model_dump() for emb in embeddings])
     df.to_parquet(embedding_path, index=False, engine="fastparquet")
     return len(embeddings)
@@ -84,15 +326,40 @@ def read_embeddings_file(path: str | Path) -> list[FaceEmbedding]:
 def read_embeddings_dir(
     path: str | Path,
     embedding_ext: str = DEFAULT_EMBEDDING_EXT,
+    recursive: bool = False,
 ) -> list[FaceEmbedding]:
     """Read list of embeddings from all parquet files in directory."""
+    df = read_embeddings_frame(path, embedding_ext=embedding_ext, recursive=recursive)
+    return [
+        FaceEmbedding(**row)  # type:ignore
+        for row in df.to_dict(orient="records")
+    ]
+
+
+def read_embeddings_frame(
+    path: str | Path,
+    embedding_ext: str = DEFAULT_EMBEDDING_EXT,
+    recursive: bool = False,
+) -> pd.DataFrame:
+    """Read embeddings from all parquet files in directory into single data frame.
+
+    Unlike `read_embeddings_dir` no model is created per face, so this is the
+    preferred way to load embeddings for a gallery.
+    """
     directory = Path(path)
     if not directory.is_dir():
         raise ValueError(f"Path is not a directory: {path}")
 
-    embeddings = []
-    for emb_file in directory.glob(f"*.{embedding_ext.lstrip('.')}"):
-        emb = read_embeddings_file(emb_file)
-        embeddings.extend(emb)
+    pattern = f"*.{embedding_ext.lstrip('.')}"
+    return read_embeddings_files(
+        directory.rglob(pattern) if recursive else directory.glob(pattern),
+    )
+
+
+def read_embeddings_files(paths: Iterable[str | Path]) -> pd.DataFrame:
+    """Read embeddings from parquet files into single data frame."""
+    frames = [pd.read_parquet(path, engine="fastparquet") for path in paths]
+    if not frames:
+        return pd.DataFrame()
 
-    return embeddings
+    return pd.concat(frames, ignore_index=True)
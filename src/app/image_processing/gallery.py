@@ -0,0 +1,815 @@
+import os
+import shutil
+import time
+import uuid
+from pathlib import Path
+from typing import (
+    Collection,
+    Sequence,
+)
+
+import numpy as np
+import pandas as pd
+
+from .indexes import (
+    ExactIndex,
+    FaceIndex,
+    Int8Index,
+    get_index_class,
+    quantize_matrix,
+)
+from .resources import (
+    DEFAULT_GALLERY_EXT,
+    FaceEmbedding,
+    GalleryMetadata,
+    IndexSettings,
+    SimilarFace,
+    get_gallery_fingerprint,
+)
+
+DISTANCE_METRICS = ("cosine", "euclidean", "euclidean_l2")
+GALLERY_VERSION = 2
+
+STORE_EMBEDDINGS_FILE = "embeddings.npy"
+STORE_NORMALIZED_FILE = "normalized.npy"
+STORE_COLUMNS_FILE = "columns.npz"
+STORE_METADATA_FILE = "metadata.json"
+
+# Facial area is packed into fixed-width int row: x, y, w, h, left eye x/y, right eye x/y
+FACIAL_AREA_BOX = ("x", "y", "w", "h")
+FACIAL_AREA_EYES = ("left_eye", "right_eye")
+FACIAL_AREA_WIDTH = len(FACIAL_AREA_BOX) + 2 * len(FACIAL_AREA_EYES)
+MISSING_COORDINATE = np.iinfo(np.int32).min
+
+
+class FaceColumns:
+    """Compact columnar metadata of gallery faces (parallel to embeddings matrix rows).
+
+    Filenames and model names are interned (unique values + int32 codes per face),
+    facial areas are packed into fixed-width int32 array. Python objects are created
+    only when a single face is requested.
+    """
+
+    __slots__ = (
+        "filenames",
+        "filename_codes",
+        "model_names",
+        "model_name_codes",
+        "facial_areas",
+        "face_confidences",
+    )
+
+    def __init__(
+        self,
+        filenames: np.ndarray,
+        filename_codes: np.ndarray,
+        model_names: np.ndarray,
+        model_name_codes: np.ndarray,
+        facial_areas: np.ndarray,
+        face_confidences: np.ndarray,
+    ) -> None:
+        """Initialize class instance."""
+        self.filenames = np.asarray(filenames, dtype=str)
+        self.filename_codes = np.asarray(filename_codes, dtype=np.int32)
+        self.model_names = np.asarray(model_names, dtype=str)
+        self.model_name_codes = np.asarray(model_name_codes, dtype=np.int32)
+        self.facial_areas = np.asarray(facial_areas, dtype=np.int32).reshape(-1, FACIAL_AREA_WIDTH)
+        self.face_confidences = np.asarray(face_confidences, dtype=np.float64)
+
+        size = len(self.filename_codes)
+        for name in ("model_name_codes", "facial_areas", "face_confidences"):
+            if len(getattr(self, name)) != size:
+                raise ValueError(f"Length of {name} ({len(getattr(self, name))}) != {size}")
+
+    def __len__(self) -> int:
+        return len(self.filename_codes)
+
+    @classmethod
+    def from_lists(
+        cls,
+        filenames: Sequence[str],
+        model_names: Sequence[str],
+        facial_areas: Sequence[dict],
+        face_confidences: Sequence[float],
+    ) -> "FaceColumns":
+        """Build compact columns from per-face Python values."""
+        unique_filenames, filename_codes = intern_strings(filenames)
+        unique_model_names, model_name_codes = intern_strings(model_names)
+        return cls(
+            filenames=unique_filenames,
+            filename_codes=filename_codes,
+            model_names=unique_model_names,
+            model_name_codes=model_name_codes,
+            facial_areas=np.array(
+                [encode_facial_area(a) for a in facial_areas],
+                dtype=np.int32,
+            ).reshape(-1, FACIAL_AREA_WIDTH),
+            face_confidences=np.asarray(face_confidences, dtype=np.float64),
+        )
+
+    @classmethod
+    def from_arrays(cls, arrays: dict[str, np.ndarray] | np.lib.npyio.NpzFile) -> "FaceColumns":
+        """Build columns from arrays saved with `to_arrays`."""
+        return cls(**{name: arrays[name] for name in cls.__slots__})
+
+    def to_arrays(self) -> dict[str, np.ndarray]:
+        """Get columns as dict of arrays (for saving)."""
+        return {name: getattr(self, name) for name in self.__slots__}
+
+    @property
+    def nbytes(self) -> int:
+        return sum(getattr(self, name).nbytes for name in self.__slots__)
+
+    def take(self, indices: np.ndarray) -> "FaceColumns":
+        """Get columns of selected faces (unused strings are kept in lookup tables)."""
+        return self.__class__(
+            filenames=self.filenames,
+            filename_codes=self.filename_codes[indices],
+            model_names=self.model_names,
+            model_name_codes=self.model_name_codes[indices],
+            facial_areas=self.facial_areas[indices],
+            face_confidences=self.face_confidences[indices],
+        )
+
+    def concatenate(self, other: "FaceColumns") -> "FaceColumns":
+        """Get columns of faces of both instances (strings are interned again)."""
+        filenames, filename_codes = intern_strings(
+            np.concatenate(
+                [self.filenames[self.filename_codes], other.filenames[other.filename_codes]],
+            ),
+        )
+        model_names, model_name_codes = intern_strings(
+            np.concatenate(
+                [
+                    self.model_names[self.model_name_codes],
+                    other.model_names[other.model_name_codes],
+                ],
+            ),
+        )
+        return self.__class__(
+            filenames=filenames,
+            filename_codes=filename_codes,
+            model_names=model_names,
+            model_name_codes=model_name_codes,
+            facial_areas=np.concatenate([self.facial_areas, other.facial_areas]),
+            face_confidences=np.concatenate([self.face_confidences, other.face_confidences]),
+        )
+
+    def file_keys(self, indices: np.ndarray) -> np.ndarray:
+        """Get int key identifying (filename, model_name) pair of every face."""
+        filename_codes = self.filename_codes[indices].astype(np.int64)
+        keys: np.ndarray = filename_codes * len(self.model_names) + self.model_name_codes[indices]
+        return keys
+
+    def filename(self, index: int) -> str:
+        return str(self.filenames[self.filename_codes[index]])
+
+    def model_name(self, index: int) -> str:
+        return str(self.model_names[self.model_name_codes[index]])
+
+    def facial_area(self, index: int) -> dict:
+        return decode_facial_area(self.facial_areas[index])
+
+    def face_confidence(self, index: int) -> float:
+        return float(self.face_confidences[index])
+
+
+class FaceGallery:
+    """Search-ready collection of known face embeddings.
+
+    All embeddings are packed once into a contiguous float32 matrix together with a
+    pre-normalized copy (used by cosine and euclidean_l2 metrics) and parallel metadata
+    arrays, so that a query is answered with a single matrix multiplication instead of
+    rebuilding per-face dicts on every request. Optional approximate index narrows
+    down the rows compared with each query.
+
+    With int8 index quantized matrix replaces pre-normalized copy: it is not built,
+    and only embeddings rows of candidates are read (and normalized) to compute exact
+    distances, so memory-mapped embeddings stay mostly on disk.
+    """
+
+    def __init__(
+        self,
+        embeddings: np.ndarray,
+        columns: FaceColumns,
+        distance_metric: str = "cosine",
+        index_settings: IndexSettings | None = None,
+        normalized: np.ndarray | None = None,
+        norms: np.ndarray | None = None,
+        index: FaceIndex | None = None,
+    ) -> None:
+        """Initialize class instance.
+
+        Precomputed `normalized` matrix and `norms` may be passed (e.g. memory-mapped
+        from gallery store) to avoid computing and holding a private copy, same for
+        already built `index` of search matrix.
+        """
+        if distance_metric not in DISTANCE_METRICS:
+            raise ValueError(
+                f"Unknown distance metric '{distance_metric}'. "
+                f"Supported metrics are: {', '.join(DISTANCE_METRICS)}",
+            )
+
+        matrix = np.ascontiguousarray(embeddings, dtype=np.float32)
+        if matrix.ndim != 2:
+            raise ValueError(f"Embeddings matrix must be 2-dimensional, got {matrix.ndim}")
+
+        size = matrix.shape[0]
+        if len(columns) != size:
+            raise ValueError(f"Length of columns ({len(columns)}) != embeddings ({size})")
+
+        self.distance_metric = distance_metric
+        self.embeddings = matrix
+        self.columns = columns
+
+        self.norms = np.linalg.norm(matrix, axis=1) if norms is None else norms
+        self.squared_norms = np.square(self.norms)
+
+        self.index_settings = index_settings or IndexSettings()
+        index_cls = get_index_class(self.index_settings.backend) if index is None else type(index)
+
+        # Pre-normalized matrix is needed only if it is searched in
+        self.normalized: np.ndarray | None = None
+        if distance_metric != "euclidean" and not issubclass(index_cls, Int8Index):
+            if normalized is None:
+                normalized = matrix / np.maximum(self.norms, np.finfo(np.float32).tiny)[:, None]
+            self.normalized = np.ascontiguousarray(normalized, dtype=np.float32)
+
+        self.metadata: GalleryMetadata | None = None
+        # Store directory if matrices are memory-mapped from gallery store
+        self.store_dir: Path | None = None
+        # Unique id of this gallery instance: every loaded or updated gallery gets new one,
+        # so anything derived from search results may be bound to it
+        self.revision = uuid.uuid4().hex
+        if index is None:
+            if not size:
+                index = ExactIndex(matrix, self.index_settings)
+            elif issubclass(index_cls, Int8Index):
+                row_norms = None if distance_metric == "euclidean" else self.norms
+                index = Int8Index(matrix, self.index_settings, norms=row_norms)
+            else:
+                index = index_cls(self.search_matrix, self.index_settings)
+        self.index: FaceIndex = index
+
+    def __len__(self) -> int:
+        return int(self.embeddings.shape[0])
+
+    def __repr__(self) -> str:
+        return f"<{self.__class__.__name__} ({len(self)} faces, {self.index!r})>"
+
+    @property
+    def nbytes(self) -> int:
+        """Size of gallery and index arrays in bytes (memory-mapped arrays included)."""
+        arrays = (self.embeddings, self.normalized, self.norms, self.squared_norms)
+        return (
+            sum(array.nbytes for array in arrays if array is not None)
+            + self.columns.nbytes
+            + self.index.nbytes
+        )
+
+    @classmethod
+    def from_embeddings(
+        cls,
+        embeddings: list[FaceEmbedding],
+        distance_metric: str = "cosine",
+        index_settings: IndexSettings | None = None,
+    ) -> "FaceGallery":
+        """Pack list of face embeddings into a gallery."""
+        if not embeddings:
+            matrix = np.empty((0, 0), dtype=np.float32)
+        else:
+            matrix = np.array([e.embedding for e in embeddings], dtype=np.float32)
+
+        return cls(
+            embeddings=matrix,
+            columns=FaceColumns.from_lists(
+                filenames=[e.filename for e in embeddings],
+                model_names=[e.model_name for e in embeddings],
+                facial_areas=[e.facial_area for e in embeddings],
+                face_confidences=[e.face_confidence for e in embeddings],
+            ),
+            distance_metric=distance_metric,
+            index_settings=index_settings,
+        )
+
+    @classmethod
+    def from_frame(
+        cls,
+        df: pd.DataFrame,
+        distance_metric: str = "cosine",
+        index_settings: IndexSettings | None = None,
+    ) -> "FaceGallery":
+        """Pack data frame of face embeddings (as stored in parquet files) into a gallery."""
+        if df.empty:
+            return cls.from_embeddings([], distance_metric, index_settings)
+
+        return cls(
+            embeddings=np.array(df["embedding"].tolist(), dtype=np.float32),
+            columns=FaceColumns.from_lists(
+                filenames=df["filename"].tolist(),
+                model_names=df["model_name"].tolist(),
+                facial_areas=df["facial_area"].tolist(),
+                face_confidences=df["face_confidence"].tolist(),
+            ),
+            distance_metric=distance_metric,
+            index_settings=index_settings,
+        )
+
+    def updated(
+        self,
+        added: pd.DataFrame,
+        removed_filenames: Collection[str] = (),
+    ) -> "FaceGallery":
+        """Get new gallery with faces of some images removed and new faces added.
+
+        Gallery itself is not changed, so searches running on it are not affected.
+        Index of new gallery is built again.
+
+        Args:
+            added (pd.DataFrame): Face embeddings to add (as stored in parquet files).
+            removed_filenames (Collection[str]): Filenames of images which faces are
+                removed (e.g. deleted or changed images), compared with extension.
+
+        Returns:
+            FaceGallery: Updated gallery.
+        """
+        keep = np.ones(len(self), dtype=bool)
+        if removed_filenames and len(self):
+            removed_codes = np.isin(self.columns.filenames, list(removed_filenames))
+            keep = ~removed_codes[self.columns.filename_codes]
+
+        rows = np.flatnonzero(keep)
+        embeddings = self.embeddings[rows]
+        columns = self.columns.take(rows)
+        normalized = self.normalized[rows] if self.normalized is not None else None
+        norms = self.norms[rows]
+
+        if not added.empty:
+            new = self.from_frame(added, self.distance_metric, IndexSettings(backend="exact"))
+            dimension = new.embeddings.shape[1]
+            if len(rows) and embeddings.shape[1] != dimension:
+                raise ValueError(
+                    f"Dimension of added embeddings ({dimension}) "
+                    f"!= gallery dimension ({embeddings.shape[1]})",
+                )
+
+            embeddings = np.concatenate([embeddings.reshape(-1, dimension), new.embeddings])
+            if normalized is not None:
+                normalized = np.concatenate(
+                    [normalized.reshape(-1, dimension), new.search_matrix],
+                )
+            columns = columns.concatenate(new.columns)
+            norms = np.concatenate([norms, new.norms])
+
+        return self.__class__(
+            embeddings=embeddings,
+            columns=columns,
+            distance_metric=self.distance_metric,
+            index_settings=self.index_settings,
+            normalized=normalized,
+            norms=norms,
+        )
+
+    @property
+    def search_matrix(self) -> np.ndarray:
+        """Matrix in which L2 order matches gallery distance metric.
+
+        Without pre-normalized matrix (see int8 index) it is normalized on every access.
+        """
+        return self.get_search_rows()
+
+    def get_search_rows(self, rows: np.ndarray | None = None) -> np.ndarray:
+        """Get rows of search matrix (all rows if None)."""
+        if self.distance_metric == "euclidean":
+            return self.embeddings if rows is None else self.embeddings[rows]
+
+        if self.normalized is not None:
+            return self.normalized if rows is None else self.normalized[rows]
+
+        matrix = self.embeddings if rows is None else self.embeddings[rows]
+        norms = self.norms if rows is None else self.norms[rows]
+        return np.asarray(matrix / np.maximum(norms, np.finfo(np.float32).tiny)[:, None])
+
+    def distances(self, queries: np.ndarray, rows: np.ndarray | None = None) -> np.ndarray:
+        """Compute distances between query embeddings and gallery faces.
+
+        Args:
+            queries (np.ndarray): Query embeddings matrix of shape (M, D).
+            rows (np.ndarray | None): Indices of gallery faces to compare with.
+                None compares with every gallery face.
+
+        Returns:
+            np.ndarray: Distances matrix of shape (M, N) or (M, len(rows)).
+        """
+        queries = self._prepare_queries(queries)
+        if self.distance_metric != "euclidean":
+            queries = self._normalize_queries(queries)
+
+        matrix = self.get_search_rows(rows)
+        squared_norms = self.squared_norms if rows is None else self.squared_norms[rows]
+        return compute_distances(queries, matrix, self.distance_metric, squared_norms)
+
+    def search(
+        self,
+        queries: np.ndarray,
+        threshold: float,
+        top_k: int | None = None,
+    ) -> list[tuple[np.ndarray, np.ndarray]]:
+        """Find gallery faces within threshold for each query embedding.
+
+        Args:
+            queries (np.ndarray): Query embeddings matrix of shape (M, D).
+            threshold (float): Maximum distance for a face to be considered similar.
+            top_k (int | None): Keep only K closest faces per query. None keeps all.
+
+        Returns:
+            list[tuple[np.ndarray, np.ndarray]]: Pair of (indices, distances) for every
+                query, sorted by distance in ascending order.
+        """
+        queries = self._prepare_queries(queries)
+        index_queries = queries
+        if self.distance_metric != "euclidean":
+            index_queries = self._normalize_queries(queries)
+
+        candidates = self.index.candidates(index_queries, top_k=top_k)
+        if candidates is None:
+            rows = [(np.arange(len(self)), distances) for distances in self.distances(queries)]
+        else:
+            rows = [
+                (query_rows, self.distances(query[None, :], query_rows)[0])
+                for query, query_rows in zip(queries, candidates)
+            ]
+
+        results = []
+        for row_indices, row in rows:
+            order = select_matches(row, threshold, top_k)
+            results.append((row_indices[order], row[order]))
+
+        return results
+
+    def get_similar_face(self, index: int, threshold: float, distance: float) -> SimilarFace:
+        """Build result model for gallery face by its index."""
+        return SimilarFace(
+            filename=self.columns.filename(index),
+            model_name=self.columns.model_name(index),
+            facial_area=self.columns.facial_area(index),
+            face_confidence=self.columns.face_confidence(index),
+            threshold=threshold,
+            distance=float(distance),
+        )
+
+    def _prepare_queries(self, queries: np.ndarray) -> np.ndarray:
+        """Convert query embeddings to float32 matrix of gallery dimension."""
+        queries = np.atleast_2d(np.asarray(queries, dtype=np.float32))
+        if queries.shape[1] != self.embeddings.shape[1]:
+            raise ValueError(
+                f"Query dimension {queries.shape[1]} does not match "
+                f"gallery dimension {self.embeddings.shape[1]}",
+            )
+        return queries
+
+    @staticmethod
+    def _normalize_queries(queries: np.ndarray) -> np.ndarray:
+        norms = np.linalg.norm(queries, axis=1, keepdims=True)
+        return np.asarray(queries / np.maximum(norms, np.finfo(np.float32).tiny))
+
+
+def compute_distances(
+    queries: np.ndarray,
+    matrix: np.ndarray,
+    distance_metric: str,
+    squared_norms: np.ndarray | None = None,
+) -> np.ndarray:
+    """Compute distances between query embeddings and rows of gallery search matrix.
+
+    Args:
+        queries (np.ndarray): Query embeddings matrix of shape (M, D), normalized
+            unless metric is "euclidean".
+        matrix (np.ndarray): Gallery search matrix of shape (N, D) (see
+            `FaceGallery.search_matrix`).
+        distance_metric (str): Distance metric.
+        squared_norms (np.ndarray | None): Squared norms of matrix rows, required
+            by "euclidean" metric.
+
+    Returns:
+        np.ndarray: Distances matrix of shape (M, N).
+    """
+    if distance_metric == "euclidean":
+        if squared_norms is None:
+            raise ValueError("Squared norms are required by euclidean metric")
+
+        squared = (
+            np.square(queries).sum(axis=1, keepdims=True)
+            + squared_norms[None, :]
+            - 2 * (queries @ matrix.T)
+        )
+        return np.asarray(np.sqrt(np.maximum(squared, 0)))
+
+    similarity: np.ndarray = queries @ matrix.T
+    if distance_metric == "euclidean_l2":
+        return np.asarray(np.sqrt(np.maximum(2 - 2 * similarity, 0)))
+
+    return np.asarray(1 - similarity)
+
+
+def select_matches(distances: np.ndarray, threshold: float, top_k: int | None) -> np.ndarray:
+    """Get positions of distances within threshold (K closest), sorted by distance."""
+    matched = np.flatnonzero(distances <= threshold)
+    if top_k is not None and len(matched) > top_k:
+        closest = np.argpartition(distances[matched], top_k - 1)[:top_k]
+        matched = np.sort(matched[closest])
+
+    return matched[np.argsort(distances[matched], kind="stable")]
+
+
+def get_gallery_filename(model_name: str, detector_backend: str) -> str:
+    """Get name of prebuilt gallery file for model/detector pair."""
+    fingerprint = get_gallery_fingerprint(model_name, detector_backend, GALLERY_VERSION)
+    return f"gallery-v{GALLERY_VERSION}-{fingerprint}{DEFAULT_GALLERY_EXT}"
+
+
+def create_gallery_file(
+    gallery: FaceGallery,
+    gallery_path: str | Path,
+    model_name: str,
+    detector_backend: str,
+) -> GalleryMetadata:
+    """Save gallery as a single prebuilt file (packed embeddings matrix and metadata).
+
+    Args:
+        gallery (FaceGallery): Gallery to save.
+        gallery_path (str | Path): Path of the file to write.
+        model_name (str): Recognition model that produced gallery embeddings.
+        detector_backend (str): Detector backend that produced gallery faces.
+
+    Returns:
+        GalleryMetadata: Metadata stored in the file.
+    """
+    if unexpected := set(gallery.columns.model_names.tolist()) - {model_name}:
+        raise ValueError(f"Gallery contains embeddings of other models: {', '.join(unexpected)}")
+
+    metadata = GalleryMetadata(
+        version=GALLERY_VERSION,
+        model_name=model_name,
+        detector_backend=detector_backend,
+        faces=len(gallery),
+        dimension=gallery.embeddings.shape[1],
+        created_at=time.time(),
+    )
+
+    gallery_path = Path(gallery_path)
+    gallery_path.parent.mkdir(parents=True, exist_ok=True)
+
+    # Write to temporary file first, so readers never see partially written gallery
+    tmp_path = gallery_path.with_name(f".{gallery_path.name}.tmp")
+    with open(tmp_path, "wb") as f:
+        np.savez(
+            f,
+            metadata=np.array(metadata.model_dump_json()),
+            embeddings=gallery.embeddings,
+            **gallery.columns.to_arrays(),  # type:ignore
+        )
+    tmp_path.replace(gallery_path)
+
+    return metadata
+
+
+def read_gallery_file(
+    path: str | Path,
+    model_name: str | None = None,
+    detector_backend: str | None = None,
+    distance_metric: str = "cosine",
+    index_settings: IndexSettings | None = None,
+) -> FaceGallery:
+    """Read prebuilt gallery file into memory.
+
+    Args:
+        path (str | Path): Path to gallery file.
+        model_name (str | None): Expected recognition model (not checked if None).
+        detector_backend (str | None): Expected detector backend (not checked if None).
+        distance_metric (str): Distance metric of loaded gallery.
+        index_settings (IndexSettings | None): Index settings of loaded gallery.
+
+    Returns:
+        FaceGallery: Loaded gallery with `metadata` attribute set.
+    """
+    with np.load(path, allow_pickle=False) as data:
+        metadata = GalleryMetadata.model_validate_json(str(data["metadata"]))
+        _check_metadata(metadata, path, model_name, detector_backend)
+
+        gallery = FaceGallery(
+            embeddings=data["embeddings"],
+            columns=FaceColumns.from_arrays(data),
+            distance_metric=distance_metric,
+            index_settings=index_settings,
+        )
+
+    gallery.metadata = metadata
+    return gallery
+
+
+def create_gallery_store(gallery_path: str | Path, stores_dir: str | Path) -> Path:
+    """Unpack prebuilt gallery file into memory-mappable store directory.
+
+    Store contains raw and pre-normalized embeddings matrices as separate `.npy` files
+    (so they can be opened with `np.memmap`), a columnar sidecar with per-face metadata
+    and gallery metadata. Store directory name depends on gallery build time, so an
+    existing store is reused and concurrent workers never write into the same directory.
+
+    Args:
+        gallery_path (str | Path): Path to prebuilt gallery file.
+        stores_dir (str | Path): Directory where store directories are created.
+
+    Returns:
+        Path: Path to store directory.
+    """
+    gallery_path = Path(gallery_path)
+    with np.load(gallery_path, allow_pickle=False) as data:
+        metadata = GalleryMetadata.model_validate_json(str(data["metadata"]))
+        _check_metadata(metadata, gallery_path)
+
+        store_dir = Path(stores_dir) / f"{gallery_path.stem}-{int(metadata.created_at * 1000)}"
+        if store_dir.exists():
+            return store_dir
+
+        embeddings = data["embeddings"]
+        norms = np.linalg.norm(embeddings, axis=1)
+        normalized = embeddings / np.maximum(norms, np.finfo(np.float32).tiny)[:, None]
+
+        tmp_dir = store_dir.with_name(f".{store_dir.name}.{os.getpid()}.tmp")
+        tmp_dir.mkdir(parents=True, exist_ok=True)
+        np.save(tmp_dir / STORE_EMBEDDINGS_FILE, embeddings)
+        np.save(tmp_dir / STORE_NORMALIZED_FILE, normalized.astype(np.float32))
+        np.savez(
+            tmp_dir / STORE_COLUMNS_FILE,
+            norms=norms,
+            **FaceColumns.from_arrays(data).to_arrays(),  # type:ignore
+        )
+        (tmp_dir / STORE_METADATA_FILE).write_text(metadata.model_dump_json())
+
+    try:
+        tmp_dir.rename(store_dir)
+    except OSError:
+        # Store was created by another process in the meantime
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+
+    # Previous stores of the same gallery are not needed anymore. Processes that still
+    # have them mapped keep access to the data until they unmap it.
+    for old_dir in store_dir.parent.glob(f"{gallery_path.stem}-*"):
+        if old_dir != store_dir:
+            shutil.rmtree(old_dir, ignore_errors=True)
+
+    return store_dir
+
+
+def read_gallery_store(
+    store_dir: str | Path,
+    model_name: str | None = None,
+    detector_backend: str | None = None,
+    distance_metric: str = "cosine",
+    index_settings: IndexSettings | None = None,
+) -> FaceGallery:
+    """Open gallery store with embeddings matrices memory-mapped in read-only mode.
+
+    Mapped matrices are backed by page cache, so all processes that open the same store
+    share one copy of embeddings and search runs directly on mapped buffers.
+
+    Args:
+        store_dir (str | Path): Path to store directory (see `create_gallery_store`).
+        model_name (str | None): Expected recognition model (not checked if None).
+        detector_backend (str | None): Expected detector backend (not checked if None).
+        distance_metric (str): Distance metric of loaded gallery.
+        index_settings (IndexSettings | None): Index settings of loaded gallery.
+
+    Returns:
+        FaceGallery: Loaded gallery with `metadata` attribute set.
+    """
+    store_dir = Path(store_dir)
+    metadata = GalleryMetadata.model_validate_json((store_dir / STORE_METADATA_FILE).read_text())
+    _check_metadata(metadata, store_dir, model_name, detector_backend)
+
+    index_settings = index_settings or IndexSettings()
+    quantized = issubclass(get_index_class(index_settings.backend), Int8Index)
+
+    embeddings = np.load(store_dir / STORE_EMBEDDINGS_FILE, mmap_mode="r")
+    normalized = None
+    if distance_metric != "euclidean" and not quantized:
+        normalized = np.load(store_dir / STORE_NORMALIZED_FILE, mmap_mode="r")
+
+    with np.load(store_dir / STORE_COLUMNS_FILE, allow_pickle=False) as columns:
+        norms = columns["norms"]
+
+        index = None
+        if quantized and len(embeddings):
+            # Quantized matrix is memory-mapped from store as well
+            if distance_metric == "euclidean":
+                codes, scales = read_quantized_matrix(store_dir, "embeddings", embeddings)
+            else:
+                codes, scales = read_quantized_matrix(store_dir, "normalized", embeddings, norms)
+            index = Int8Index(embeddings, index_settings, codes=codes, scales=scales)
+
+        gallery = FaceGallery(
+            embeddings=embeddings,
+            normalized=normalized,
+            norms=norms,
+            columns=FaceColumns.from_arrays(columns),
+            distance_metric=distance_metric,
+            index_settings=index_settings,
+            index=index,
+        )
+
+    gallery.metadata = metadata
+    gallery.store_dir = store_dir
+    return gallery
+
+
+def read_quantized_matrix(
+    store_dir: Path,
+    name: str,
+    embeddings: np.ndarray,
+    norms: np.ndarray | None = None,
+) -> tuple[np.ndarray, np.ndarray]:
+    """Memory-map int8 quantized search matrix of store, quantizing it on first use.
+
+    Quantized matrix is saved in store, so it is computed once per store and shared by
+    all processes that open it.
+
+    Args:
+        store_dir (Path): Path to store directory.
+        name (str): Name of quantized matrix ("embeddings" or "normalized").
+        embeddings (np.ndarray): Embeddings matrix (memory-mapped from store).
+        norms (np.ndarray | None): Norms of embeddings, matrix is normalized if passed.
+
+    Returns:
+        tuple[np.ndarray, np.ndarray]: Quantized matrix and per-row scales
+            (see `quantize_matrix`).
+    """
+    codes_path = store_dir / f"{name}-int8.npy"
+    scales_path = store_dir / f"{name}-int8-scales.npy"
+
+    if not codes_path.exists():
+        codes, scales = quantize_matrix(embeddings, norms)
+
+        # Scales are written first: codes file marks complete quantized matrix
+        _save_array(scales_path, scales)
+        _save_array(codes_path, codes)
+
+    return np.load(codes_path, mmap_mode="r"), np.load(scales_path)
+
+
+def _save_array(path: Path, array: np.ndarray) -> None:
+    """Save array to `.npy` file (replaced atomically)."""
+    tmp_path = path.with_name(f".{path.name}.{os.getpid()}.tmp")
+    with open(tmp_path, "wb") as f:
+        np.save(f, array)
+    os.replace(tmp_path, path)
+
+
+def _check_metadata(
+    metadata: GalleryMetadata,
+    path: str | Path,
+    model_name: str | None = None,
+    detector_backend: str | None = None,
+) -> None:
+    """Check that gallery is supported and was built with expected model/detector."""
+    if metadata.version != GALLERY_VERSION:
+        raise ValueError(
+            f"Unsupported gallery version {metadata.version} (expected {GALLERY_VERSION})",
+        )
+
+    for name, expected, actual in (
+        ("model", model_name, metadata.model_name),
+        ("detector backend", detector_backend, metadata.detector_backend),
+    ):
+        if expected is not None and expected != actual:
+            raise ValueError(f"Gallery {path} was built with {name} {actual}, not {expected}")
+
+
+def intern_strings(values: Sequence[str] | np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+    """Get unique values and int32 code of every value in the sequence."""
+    if not len(values):
+        return np.array([], dtype=str), np.array([], dtype=np.int32)
+
+    unique, codes = np.unique(np.asarray(values, dtype=str), return_inverse=True)
+    return unique, codes.astype(np.int32)
+
+
+def encode_facial_area(facial_area: dict) -> list[int]:
+    """Pack facial area dict into fixed-width list of ints (missing eyes are marked)."""
+    values = [int(facial_area[key]) for key in FACIAL_AREA_BOX]
+    for key in FACIAL_AREA_EYES:
+        point = facial_area.get(key)
+        if point is None:
+            values.extend((MISSING_COORDINATE, MISSING_COORDINATE))
+        else:
+            values.extend((int(point[0]), int(point[1])))
+    return values
+
+
+def decode_facial_area(row: np.ndarray) -> dict:
+    """Unpack facial area dict from fixed-width row of ints."""
+    facial_area: dict = {key: int(value) for key, value in zip(FACIAL_AREA_BOX, row)}
+    for i, key in enumerate(FACIAL_AREA_EYES):
+        x, y = row[len(FACIAL_AREA_BOX) + 2 * i : len(FACIAL_AREA_BOX) + 2 * i + 2]
+        facial_area[key] = None if x == MISSING_COORDINATE else (int(x), int(y))
+    return facial_area
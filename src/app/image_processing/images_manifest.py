@@ -0,0 +1,67 @@
+from pathlib import (
+    Path,
+    PurePosixPath,
+)
+from typing import Iterable
+
+from .resources import (
+    DEFAULT_EMBEDDING_EXT,
+    IMAGE_EXTENSIONS,
+)
+
+
+class ImagesManifest:
+    """Filenames of images available in both original and resized prefixes.
+
+    Manifest is built from embedding files (only images with faces can be found) and
+    stored as a single text file with one filename per line in embeddings prefix, so it
+    is loaded with one request instead of listing all images. Filenames are paths
+    relative to images prefixes (with extension), the same ones image URLs of found
+    faces are built from, so image of any found face is checked in O(1).
+    """
+
+    def __init__(self, filenames: Iterable[str]) -> None:
+        """Initialize class instance."""
+        self.filenames = frozenset(filenames)
+
+    def __contains__(self, filename: str) -> bool:
+        return filename in self.filenames
+
+    def __len__(self) -> int:
+        return len(self.filenames)
+
+    def __repr__(self) -> str:
+        return f"<{self.__class__.__name__} ({len(self)} images)>"
+
+    @classmethod
+    def read(cls, path: str | Path) -> "ImagesManifest":
+        return cls(filename for filename in Path(path).read_text().split("\n") if filename)
+
+    def write(self, path: str | Path) -> None:
+        Path(path).write_text("".join(f"{filename}\n" for filename in sorted(self.filenames)))
+
+    @classmethod
+    def from_keys(
+        cls,
+        embedding_keys: Iterable[str],
+        original_keys: Iterable[str],
+        resized_keys: Iterable[str],
+    ) -> "ImagesManifest":
+        """Build manifest of embedded images existing in both original and resized images.
+
+        Keys are paths relative to their prefixes. Embedding file of image has the same
+        path with embeddings extension, e.g. `2025/a.parq` for `2025/a.jpg`.
+        """
+        embedded = {
+            str(PurePosixPath(key).with_suffix(""))
+            for key in embedding_keys
+            if key.endswith(DEFAULT_EMBEDDING_EXT)
+        }
+        resized = set(resized_keys)
+        return cls(
+            key
+            for key in original_keys
+            if PurePosixPath(key).suffix.lower() in IMAGE_EXTENSIONS
+            and key in resized
+            and str(PurePosixPath(key).with_suffix("")) in embedded
+        )
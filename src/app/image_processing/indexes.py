@@ -0,0 +1,344 @@
+from abc import (
+    ABC,
+    abstractmethod,
+)
+
+import numpy as np
+
+from .resources import IndexSettings
+
+KMEANS_ITERATIONS = 20
+KMEANS_MAX_TRAIN_SIZE = 100_000
+ASSIGN_CHUNK_SIZE = 65_536
+SCAN_CHUNK_SIZE = 65_536
+# Values of quantized matrix converted to float32 at once (8MB) during scan
+QUANTIZED_SCAN_CHUNK_VALUES = 2**21
+
+INT8_MAX = 127
+
+
+class FaceIndex(ABC):
+    """Abstract nearest-neighbour index over gallery embeddings.
+
+    Index is built on the matrix the gallery searches in (pre-normalized embeddings
+    for cosine/euclidean_l2 metrics, raw ones for euclidean), so L2 order in that
+    matrix always matches the configured distance metric. Indexes only select
+    candidate rows, final distances are computed exactly by the gallery.
+    """
+
+    name: str
+
+    @abstractmethod
+    def __init__(self, matrix: np.ndarray, settings: IndexSettings) -> None:
+        """Initialize class instance."""
+
+    @abstractmethod
+    def candidates(self, queries: np.ndarray, top_k: int | None = None) -> list[np.ndarray] | None:
+        """Get sorted candidate row indices for every query (None means all rows)."""
+
+    def __repr__(self) -> str:
+        return f"<{self.__class__.__name__}>"
+
+    @property
+    def nbytes(self) -> int:
+        """Size of index arrays in bytes (0 if unknown)."""
+        return 0
+
+
+class ExactIndex(FaceIndex):
+    """Brute-force index: every gallery face is a candidate."""
+
+    name = "exact"
+
+    def __init__(self, matrix: np.ndarray, settings: IndexSettings) -> None:
+        """Initialize class instance."""
+
+    def candidates(self, queries: np.ndarray, top_k: int | None = None) -> list[np.ndarray] | None:
+        return None
+
+
+class IVFIndex(FaceIndex):
+    """Inverted file index with k-means coarse quantizer written in NumPy.
+
+    Gallery rows are split into `nlist` clusters, a query is compared only against
+    rows of `nprobe` closest clusters. Higher `nprobe` means better recall and
+    higher latency, `nprobe == nlist` is equivalent to exact search.
+    """
+
+    name = "ivf"
+
+    def __init__(self, matrix: np.ndarray, settings: IndexSettings) -> None:
+        """Initialize class instance."""
+        size = matrix.shape[0]
+        nlist = settings.nlist or int(4 * np.sqrt(size))
+        self.nlist = max(1, min(nlist, size))
+        self.nprobe = max(1, min(settings.nprobe, self.nlist))
+
+        self.centroids = train_kmeans(matrix, self.nlist, seed=settings.seed)
+        self.nlist = self.centroids.shape[0]
+        self.nprobe = min(self.nprobe, self.nlist)
+        assignments = assign_to_centroids(matrix, self.centroids)
+
+        # Rows grouped by cluster: rows of cluster C are order[offsets[C]:offsets[C + 1]]
+        counts = np.bincount(assignments, minlength=self.nlist)
+        self.order = np.argsort(assignments, kind="stable")
+        self.offsets = np.concatenate(([0], np.cumsum(counts)))
+
+    def __repr__(self) -> str:
+        return f"<{self.__class__.__name__} nlist={self.nlist} nprobe={self.nprobe}>"
+
+    @property
+    def nbytes(self) -> int:
+        return self.centroids.nbytes + self.order.nbytes + self.offsets.nbytes
+
+    def candidates(self, queries: np.ndarray, top_k: int | None = None) -> list[np.ndarray] | None:
+        distances = squared_distances(queries, self.centroids)
+        if self.nprobe < self.nlist:
+            probes = np.argpartition(distances, self.nprobe - 1, axis=1)[:, : self.nprobe]
+        else:
+            probes = np.broadcast_to(np.arange(self.nlist), distances.shape)
+
+        return [
+            np.sort(
+                np.concatenate(
+                    [self.order[self.offsets[c] : self.offsets[c + 1]] for c in query_probes],
+                ),
+            )
+            for query_probes in probes
+        ]
+
+
+class HNSWIndex(FaceIndex):
+    """Hierarchical navigable small world graph index (requires `hnswlib` package).
+
+    Graph is tuned by `hnsw_m` and `hnsw_ef_construction` at build time and by
+    `hnsw_ef_search` at query time. Every query returns `candidates` nearest rows
+    (or `top_k`, if it is larger), farther matches are never returned.
+    """
+
+    name = "hnsw"
+
+    def __init__(self, matrix: np.ndarray, settings: IndexSettings) -> None:
+        """Initialize class instance."""
+        try:
+            import hnswlib
+        except ImportError as e:
+            raise ImportError(
+                "Package 'hnswlib' is required for 'hnsw' index backend: pip install hnswlib",
+            ) from e
+
+        size, dim = matrix.shape
+        self.size = size
+        self.ef_search = settings.hnsw_ef_search
+        self.default_k = settings.candidates
+
+        self.index = hnswlib.Index(space="l2", dim=dim)
+        self.index.init_index(
+            max_elements=max(size, 1),
+            ef_construction=settings.hnsw_ef_construction,
+            M=settings.hnsw_m,
+            random_seed=settings.seed,
+        )
+        if size:
+            self.index.add_items(matrix, np.arange(size))
+
+    def __repr__(self) -> str:
+        return f"<{self.__class__.__name__} ef_search={self.ef_search} k={self.default_k}>"
+
+    def candidates(self, queries: np.ndarray, top_k: int | None = None) -> list[np.ndarray] | None:
+        k = min(max(self.default_k, top_k or 0), self.size)
+        if not k:
+            return [np.empty(0, dtype=np.int64) for _ in queries]
+
+        self.index.set_ef(max(self.ef_search, k))
+        labels, _ = self.index.knn_query(queries, k=k)
+        return [np.sort(row.astype(np.int64)) for row in labels]
+
+
+class Int8Index(FaceIndex):
+    """Gallery matrix quantized to int8 (with per-row scale) scanned to select candidates.
+
+    Quantized matrix is the only copy of gallery matrix kept in memory for search (4x
+    smaller than float32 one). Every query is compared with all its rows and
+    `candidates` closest rows (or `top_k`, if it is larger) are re-ranked by the
+    gallery with exact float32 distances of these rows only, farther matches are never
+    returned. So returned distances are always exact, only recall
+    may be affected by quantization error. Rows are converted to float32 chunk by chunk
+    on every query, so scan is slower than exact search (single BLAS call on float32
+    matrix): the index saves memory, not latency.
+    """
+
+    name = "int8"
+
+    def __init__(
+        self,
+        matrix: np.ndarray,
+        settings: IndexSettings,
+        codes: np.ndarray | None = None,
+        scales: np.ndarray | None = None,
+        norms: np.ndarray | None = None,
+    ) -> None:
+        """Initialize class instance.
+
+        Already quantized `codes` and `scales` (see `quantize_matrix`) may be passed
+        (e.g. memory-mapped from gallery store) instead of quantizing matrix again.
+        If `norms` are passed, matrix rows are divided by them before quantization (so
+        index of normalized matrix is built without normalizing the whole matrix).
+        """
+        if codes is None or scales is None:
+            codes, scales = quantize_matrix(matrix, norms)
+
+        self.codes = codes
+        self.scales = scales
+        self.default_k = settings.candidates
+
+        # Squared norms of dequantized rows, so candidates are ranked by L2 distance
+        self.squared_norms = np.empty(len(codes), dtype=np.float32)
+        for start in range(0, len(codes), SCAN_CHUNK_SIZE):
+            chunk = self._dequantize(start, start + SCAN_CHUNK_SIZE)
+            self.squared_norms[start : start + len(chunk)] = np.square(chunk).sum(axis=1)
+
+    def __repr__(self) -> str:
+        return f"<{self.__class__.__name__} k={self.default_k}>"
+
+    @property
+    def nbytes(self) -> int:
+        return self.codes.nbytes + self.scales.nbytes + self.squared_norms.nbytes
+
+    def candidates(self, queries: np.ndarray, top_k: int | None = None) -> list[np.ndarray] | None:
+        size = len(self.codes)
+        k = min(max(self.default_k, top_k or 0), size)
+        if not k:
+            return [np.empty(0, dtype=np.int64) for _ in queries]
+        if k == size:
+            return None  # every row is a candidate anyway
+
+        # K closest rows found so far are merged with K closest rows of every chunk, so
+        # scores are never allocated for the whole matrix. Chunk is large enough for
+        # merging to be cheap compared to scanning.
+        chunk_size = max(QUANTIZED_SCAN_CHUNK_VALUES // max(1, self.codes.shape[1]), 4 * k)
+        best_scores = np.empty((len(queries), 0), dtype=np.float32)
+        best_rows = np.empty((len(queries), 0), dtype=np.int64)
+        for start in range(0, size, chunk_size):
+            stop = min(start + chunk_size, size)
+
+            # Squared L2 distance without query norm (same for all rows of a query).
+            # Scales are applied to products, not to (larger) converted chunk of codes.
+            products = queries @ self.codes[start:stop].astype(np.float32).T
+            products *= self.scales[None, start:stop]
+            scores = np.concatenate(
+                [best_scores, self.squared_norms[None, start:stop] - 2 * products],
+                axis=1,
+            )
+            rows = np.concatenate(
+                [best_rows, np.broadcast_to(np.arange(start, stop), products.shape)],
+                axis=1,
+            )
+            if scores.shape[1] > k:
+                closest = np.argpartition(scores, k - 1, axis=1)[:, :k]
+                scores = np.take_along_axis(scores, closest, axis=1)
+                rows = np.take_along_axis(rows, closest, axis=1)
+            best_scores, best_rows = scores, rows
+
+        return [np.sort(row) for row in best_rows]
+
+    def _dequantize(self, start: int, stop: int) -> np.ndarray:
+        """Get float32 approximation of matrix rows `start:stop`."""
+        chunk = self.codes[start:stop].astype(np.float32)
+        chunk *= self.scales[start:stop, None]
+        return chunk
+
+
+INDEX_BACKENDS: dict[str, type[FaceIndex]] = {
+    index_cls.name: index_cls for index_cls in (ExactIndex, IVFIndex, HNSWIndex, Int8Index)
+}
+
+
+def get_index_class(backend: str) -> type[FaceIndex]:
+    """Get face index class of configured backend."""
+    try:
+        return INDEX_BACKENDS[backend]
+    except KeyError:
+        raise ValueError(
+            f"Unknown index backend '{backend}'. "
+            f"Supported backends are: {', '.join(INDEX_BACKENDS)}",
+        )
+
+
+def build_index(matrix: np.ndarray, settings: IndexSettings) -> FaceIndex:
+    """Build face index for embeddings matrix using configured backend."""
+    return get_index_class(settings.backend)(matrix, settings)
+
+
+def quantize_matrix(
+    matrix: np.ndarray,
+    norms: np.ndarray | None = None,
+) -> tuple[np.ndarray, np.ndarray]:
+    """Quantize float32 matrix to int8 with per-row scale (processed in chunks to bound memory).
+
+    Args:
+        matrix (np.ndarray): Matrix of shape (N, D).
+        norms (np.ndarray | None): Norms of matrix rows, rows are normalized before
+            quantization if passed.
+
+    Returns:
+        tuple[np.ndarray, np.ndarray]: Quantized matrix and per-row scales, row is
+            restored as `codes[i] * scales[i]`.
+    """
+    codes = np.empty(matrix.shape, dtype=np.int8)
+    scales = np.empty(matrix.shape[0], dtype=np.float32)
+    for start in range(0, matrix.shape[0], SCAN_CHUNK_SIZE):
+        chunk = np.asarray(matrix[start : start + SCAN_CHUNK_SIZE], dtype=np.float32)
+        stop = start + len(chunk)
+        if norms is not None:
+            chunk = chunk / np.maximum(norms[start:stop], np.finfo(np.float32).tiny)[:, None]
+
+        chunk_scales = np.abs(chunk).max(axis=1, initial=0) / INT8_MAX
+        chunk_scales[chunk_scales == 0] = 1  # zero rows stay zero
+        scales[start:stop] = chunk_scales
+        codes[start:stop] = np.rint(chunk / chunk_scales[:, None])
+
+    return codes, scales
+
+
+def squared_distances(vectors: np.ndarray, centroids: np.ndarray) -> np.ndarray:
+    """Get squared L2 distances between every vector and every centroid."""
+    distances: np.ndarray = (
+        np.square(vectors).sum(axis=1, keepdims=True)
+        + np.square(centroids).sum(axis=1)[None, :]
+        - 2 * (vectors @ centroids.T)
+    )
+    return distances
+
+
+def assign_to_centroids(matrix: np.ndarray, centroids: np.ndarray) -> np.ndarray:
+    """Get index of closest centroid for every row (processed in chunks to bound memory)."""
+    assignments = np.empty(matrix.shape[0], dtype=np.int64)
+    for start in range(0, matrix.shape[0], ASSIGN_CHUNK_SIZE):
+        chunk = matrix[start : start + ASSIGN_CHUNK_SIZE]
+        distances = squared_distances(chunk, centroids)
+        assignments[start : start + len(chunk)] = distances.argmin(axis=1)
+    return assignments
+
+
+def train_kmeans(matrix: np.ndarray, n_clusters: int, seed: int = 0) -> np.ndarray:
+    """Train k-means centroids on (a sample of) embeddings matrix."""
+    rng = np.random.default_rng(seed)
+    sample = matrix
+    if matrix.shape[0] > KMEANS_MAX_TRAIN_SIZE:
+        sample = matrix[np.sort(rng.choice(matrix.shape[0], KMEANS_MAX_TRAIN_SIZE, replace=False))]
+
+    n_clusters = min(n_clusters, sample.shape[0])
+    centroids = sample[rng.choice(sample.shape[0], n_clusters, replace=False)].copy()
+    for _ in range(KMEANS_ITERATIONS):
+        assignments = assign_to_centroids(sample, centroids)
+        order = np.argsort(assignments, kind="stable")
+        counts = np.bincount(assignments, minlength=n_clusters)
+
+        # Empty clusters keep their previous centroid
+        filled = np.flatnonzero(counts)
+        starts = np.concatenate(([0], np.cumsum(counts)))[filled]
+        sums = np.add.reduceat(sample[order], starts, axis=0)
+        centroids[filled] = sums / counts[filled, None]
+
+    return centroids
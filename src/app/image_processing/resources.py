@@ -1,20 +1,84 @@
-from typing import Any
+import hashlib
+import re
+from pathlib import Path
+from typing import (
+    Any,
+    NamedTuple,
+)
 
 import numpy as np
-from pydantic import BaseModel
+from pydantic import (
+    BaseModel,
+    model_validator,
+)
 
 from app.core.utils import LowercaseKeyMixin
 
+DEFAULT_GALLERY = "default"
 DEFAULT_EMBEDDING_EXT = ".parq"
+DEFAULT_GALLERY_EXT = ".npz"
+IMAGES_MANIFEST_FILENAME = "images.txt"
 IMAGE_EXTENSIONS = {".jpg", ".jpeg", ".png", ".bmp", ".heic"}
 IMAGE_MIMETYPES = {f"image/{ext.lstrip('.')}" for ext in IMAGE_EXTENSIONS}
+# Formats of resized images (renditions) and their extensions
+RENDITION_FORMATS = {"jpeg": ".jpg", "png": ".png", "webp": ".webp", "avif": ".avif"}
+RENDITION_EXTENSIONS = IMAGE_EXTENSIONS | set(RENDITION_FORMATS.values())
+
+
+class IndexSettings(LowercaseKeyMixin, BaseModel):
+    """Nearest-neighbour index settings (see app.image_processing.indexes)."""
+
+    backend: str = "exact"  # exact/ivf/hnsw/int8
+    seed: int = 0
+    # Max candidates returned by hnsw/int8 index per face (re-ranked with exact distances).
+    # It also caps results of these backends when `max_similar_faces` is not set:
+    # matches beyond the closest `candidates` faces are not returned
+    candidates: int = 1000
+    # IVF: number of clusters (default 4 * sqrt(faces)) and clusters probed per query
+    nlist: int | None = None
+    nprobe: int = 8
+    # HNSW: graph degree and build/search beam width
+    hnsw_m: int = 16
+    hnsw_ef_construction: int = 200
+    hnsw_ef_search: int = 128
 
 
 class DeepfaceSettings(LowercaseKeyMixin, BaseModel):
     model_name: str = "Facenet"
     detector_backend: str = "yolov8"
     min_detector_face_size: int = 100
+    detection_max_size: int = 0  # longer side of uploads passed to detector, 0 = full size
     min_embeddings_face_size: int = 20
+    distance_metric: str = "cosine"
+    max_similar_faces: int | None = None
+    inference_workers: int = 1  # threads running detection/recognition
+    inference_queue_size: int = 8  # requests waiting for inference thread before 503
+    batch_max_size: int = 16  # faces of concurrent requests in one recognition model call
+    batch_max_wait_ms: float = 5.0  # how long first item waits for others to join batch
+    search_workers: int = 0  # processes searching gallery shards, 0 searches in-process
+    index: IndexSettings = IndexSettings()
+
+    @model_validator(mode="after")
+    def check_search_workers(self) -> "DeepfaceSettings":
+        # Shards are always searched exactly, index would be built and never used
+        if self.search_workers > 1 and self.index.backend != "exact":
+            raise ValueError(
+                f"Index backend '{self.index.backend}' is not supported by sharded search "
+                f"(search_workers = {self.search_workers}), use 'exact' backend",
+            )
+        return self
+
+
+class EventSettings(LowercaseKeyMixin, BaseModel):
+    """Prefixes of a single event (named gallery) in images bucket."""
+
+    original: str
+    resized: str
+    embeddings: str
+    thumbnails: str = ""  # small images for results grid, resized images are used if empty
+    thumbnails_ext: str = ""  # e.g. ".webp" if thumbnails format differs from original
+    preload: bool = False  # load gallery at startup instead of first upload
+    idle_ttl: int = 0  # seconds without uploads before gallery is unloaded, 0 keeps it
 
 
 class ImagesSettings(LowercaseKeyMixin, BaseModel):
@@ -22,6 +86,32 @@ class ImagesSettings(LowercaseKeyMixin, BaseModel):
     original: str
     resized: str
     embeddings: str
+    thumbnails: str = ""
+    thumbnails_ext: str = ""
+    sync_interval: int = 0  # seconds between embeddings syncs with S3, 0 disables
+    preload: bool = True  # load default gallery at startup instead of first upload
+    max_memory_mb: int = 0  # least recently used galleries are unloaded above it, 0 disables
+    events: dict[str, EventSettings] = {}
+
+    def get_events(self) -> dict[str, EventSettings]:
+        """Get settings of all galleries: default one (top-level prefixes) and events."""
+        events = {
+            DEFAULT_GALLERY: EventSettings(
+                original=self.original,
+                resized=self.resized,
+                embeddings=self.embeddings,
+                thumbnails=self.thumbnails,
+                thumbnails_ext=self.thumbnails_ext,
+                preload=self.preload,
+            ),
+        }
+        for name, event in self.events.items():
+            name = name.lower()
+            if name in events or not re.fullmatch(r"[a-z0-9_-]+", name):
+                raise ValueError(f"Invalid event name '{name}'")
+            events[name] = event
+
+        return events
 
 
 class Face(BaseModel):
@@ -35,6 +125,23 @@ class Face(BaseModel):
         return f"<Face ({self.confidence:.2f})>"
 
 
+class ScaledImage(NamedTuple):
+    """Image downscaled for detection and its scale (original size / downscaled size)."""
+
+    image: np.ndarray
+    scale: float = 1.0
+
+
+class ImageRendition(NamedTuple):
+    """Resized copy of images saved to its own directory (see `resize_image_renditions`)."""
+
+    dst_dir: Path
+    max_width: int
+    max_height: int
+    format: str | None = None  # one of RENDITION_FORMATS, None keeps format of original
+    quality: int | None = None  # default quality of format if None
+
+
 class FaceDetection(BaseModel):
     filename: str
     model_name: str
@@ -63,6 +170,27 @@ class FaceEmbedding(FaceDetection):
     embedding: list[float]
 
 
+class GalleryMetadata(BaseModel):
+    """Metadata of prebuilt gallery file."""
+
+    version: int
+    model_name: str
+    detector_backend: str
+    faces: int
+    dimension: int
+    created_at: float
+
+    @property
+    def fingerprint(self) -> str:
+        return get_gallery_fingerprint(self.model_name, self.detector_backend, self.version)
+
+
+def get_gallery_fingerprint(model_name: str, detector_backend: str, version: int) -> str:
+    """Get short hash identifying embeddings compatible with each other."""
+    key = f"{version}:{model_name}:{detector_backend}".lower()
+    return hashlib.sha256(key.encode()).hexdigest()[:12]
+
+
 class SimilarFace(FaceDetection):
     threshold: float
     distance: float
@@ -0,0 +1,282 @@
+import multiprocessing
+import weakref
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing.shared_memory import SharedMemory
+from pathlib import Path
+from typing import NamedTuple
+
+import numpy as np
+
+from .gallery import (
+    STORE_COLUMNS_FILE,
+    STORE_EMBEDDINGS_FILE,
+    STORE_NORMALIZED_FILE,
+    FaceColumns,
+    FaceGallery,
+    compute_distances,
+    select_matches,
+)
+from .resources import (
+    GalleryMetadata,
+    SimilarFace,
+)
+
+# How many galleries (shared memory blocks or mapped stores) stay open in a worker process
+ATTACHED_BLOCKS_PER_WORKER = 2
+
+# Shared memory blocks attached in current worker process
+_attached: OrderedDict[str, SharedMemory] = OrderedDict()
+
+# Search matrices (and squared norms) of gallery stores mapped in current worker process
+_mapped: OrderedDict[tuple[str, str], tuple[np.ndarray, np.ndarray | None]] = OrderedDict()
+
+
+class ShardSource(NamedTuple):
+    """Where workers read gallery search matrix: gallery store or shared memory block."""
+
+    store_dir: str | None = None
+    shm_name: str | None = None
+
+
+class ShardPool:
+    """Pool of worker processes searching gallery shards in parallel.
+
+    Workers are spawned (not forked) once and reused by all galleries, every call
+    gets a shard to search as a range of rows of a shared memory block.
+    """
+
+    def __init__(self, workers: int) -> None:
+        """Initialize class instance."""
+        self.workers = max(1, workers)
+        self.pool = ProcessPoolExecutor(
+            max_workers=self.workers,
+            mp_context=multiprocessing.get_context("spawn"),
+        )
+
+    def __repr__(self) -> str:
+        return f"<{self.__class__.__name__} workers={self.workers}>"
+
+    def shutdown(self) -> None:
+        self.pool.shutdown(wait=False, cancel_futures=True)
+
+
+class ShardedGallery:
+    """Gallery searched by a pool of worker processes, each one scanning its own shard.
+
+    Gallery opened from store is memory-mapped by workers from the same store files,
+    so all processes share one copy of it in page cache. Otherwise search matrix (and
+    squared norms for euclidean metric) is copied once into shared memory, so workers
+    read it without copying or pickling. Every query batch is sent to all shards and
+    the closest matches of shards are merged here, so search latency goes down with
+    number of CPU cores. Shards are searched exactly, so only exact index is supported
+    (see `DeepfaceSettings.search_workers`).
+
+    Shared memory is released when the sharded gallery is garbage collected (i.e. when
+    it is replaced and the last search on it is finished).
+    """
+
+    def __init__(self, gallery: FaceGallery, pool: ShardPool, shards: int | None = None) -> None:
+        """Initialize class instance."""
+        if gallery.index.name != "exact":
+            raise ValueError(f"Sharded search doesn't support '{gallery.index.name}' index")
+
+        self.gallery = gallery
+        self.pool = pool
+
+        size, dimension = gallery.embeddings.shape
+        self.shape = (size, dimension)
+
+        self.shm: SharedMemory | None = None
+        self._finalizer: weakref.finalize | None = None
+        if gallery.store_dir is not None:
+            self.source = ShardSource(store_dir=str(gallery.store_dir))
+        else:
+            self.shm = SharedMemory(create=True, size=max(1, size * (dimension + 1) * 4))
+            self._finalizer = weakref.finalize(self, _release_shared_memory, self.shm)
+            self.source = ShardSource(shm_name=self.shm.name)
+
+            shared_matrix, shared_norms = _get_shared_arrays(self.shm, self.shape)
+            shared_matrix[:] = gallery.search_matrix
+            shared_norms[:] = gallery.squared_norms
+
+        bounds = np.linspace(0, size, min(shards or pool.workers, max(1, size)) + 1)
+        self.shards = [
+            (int(start), int(stop)) for start, stop in zip(bounds[:-1], bounds[1:]) if stop > start
+        ]
+
+    def __len__(self) -> int:
+        return len(self.gallery)
+
+    def __repr__(self) -> str:
+        return f"<{self.__class__.__name__} ({len(self.shards)} shards, {self.gallery!r})>"
+
+    @property
+    def revision(self) -> str:
+        return self.gallery.revision
+
+    @property
+    def distance_metric(self) -> str:
+        return self.gallery.distance_metric
+
+    @property
+    def columns(self) -> FaceColumns:
+        return self.gallery.columns
+
+    @property
+    def metadata(self) -> GalleryMetadata | None:
+        return self.gallery.metadata
+
+    @property
+    def nbytes(self) -> int:
+        """Size of gallery arrays in bytes (shared memory copy included)."""
+        return self.gallery.nbytes + (self.shm.size if self.shm is not None else 0)
+
+    def close(self) -> None:
+        """Release shared memory at once (searches in progress may fail)."""
+        if self._finalizer is not None:
+            self._finalizer()
+
+    def search(
+        self,
+        queries: np.ndarray,
+        threshold: float,
+        top_k: int | None = None,
+    ) -> list[tuple[np.ndarray, np.ndarray]]:
+        """Find gallery faces within threshold for each query embedding.
+
+        Same as `FaceGallery.search`, but every shard is searched in worker process.
+        """
+        queries = self.gallery._prepare_queries(queries)
+        if self.distance_metric != "euclidean":
+            queries = self.gallery._normalize_queries(queries)
+
+        futures = [
+            self.pool.pool.submit(
+                search_shard,
+                self.source,
+                self.shape,
+                start,
+                stop,
+                queries,
+                self.distance_metric,
+                threshold,
+                top_k,
+            )
+            for start, stop in self.shards
+        ]
+        shard_results = [future.result() for future in futures]
+
+        results = []
+        for query in range(len(queries)):
+            indices = np.concatenate([result[query][0] for result in shard_results])
+            distances = np.concatenate([result[query][1] for result in shard_results])
+
+            # Shards are already sorted, stable sort keeps row order for equal distances
+            order = np.argsort(distances, kind="stable")[:top_k]
+            results.append((indices[order], distances[order]))
+
+        return results
+
+    def get_similar_face(self, index: int, threshold: float, distance: float) -> SimilarFace:
+        return self.gallery.get_similar_face(index, threshold, distance)
+
+
+def search_shard(
+    source: ShardSource,
+    shape: tuple[int, int],
+    start: int,
+    stop: int,
+    queries: np.ndarray,
+    distance_metric: str,
+    threshold: float,
+    top_k: int | None,
+) -> list[tuple[np.ndarray, np.ndarray]]:
+    """Search rows `start:stop` of shared gallery matrix (runs inside worker)."""
+    if source.store_dir is not None:
+        matrix, squared_norms = _open_store(source.store_dir, distance_metric)
+    else:
+        matrix, squared_norms = _get_shared_arrays(
+            _attach_shared_memory(str(source.shm_name)),
+            shape,
+        )
+
+    distances = compute_distances(
+        queries,
+        matrix[start:stop],
+        distance_metric,
+        squared_norms[start:stop] if squared_norms is not None else None,
+    )
+
+    results = []
+    for row in distances:
+        order = select_matches(row, threshold, top_k)
+        results.append((order + start, row[order]))
+
+    return results
+
+
+def _get_shared_arrays(
+    shm: SharedMemory,
+    shape: tuple[int, int],
+) -> tuple[np.ndarray, np.ndarray]:
+    """Get search matrix and squared norms stored in shared memory block."""
+    size, dimension = shape
+    matrix = np.ndarray((size, dimension), dtype=np.float32, buffer=shm.buf)
+    squared_norms = np.ndarray(
+        (size,),
+        dtype=np.float32,
+        buffer=shm.buf,
+        offset=size * dimension * 4,
+    )
+    return matrix, squared_norms
+
+
+def _attach_shared_memory(name: str) -> SharedMemory:
+    """Attach shared memory block in worker process (recently used blocks are kept)."""
+    shm = _attached.get(name)
+    if shm is not None:
+        _attached.move_to_end(name)
+        return shm
+
+    # Spawned workers share resource tracker of main process, so block is still
+    # unlinked only once by its owner
+    shm = SharedMemory(name=name)
+    _attached[name] = shm
+
+    while len(_attached) > ATTACHED_BLOCKS_PER_WORKER:
+        _, old = _attached.popitem(last=False)
+        old.close()
+
+    return shm
+
+
+def _open_store(store_dir: str, distance_metric: str) -> tuple[np.ndarray, np.ndarray | None]:
+    """Memory-map search matrix of gallery store in worker process (recently used are kept).
+
+    Squared norms are loaded only for euclidean metric (other metrics don't need them).
+    """
+    key = (store_dir, distance_metric)
+    arrays = _mapped.get(key)
+    if arrays is not None:
+        _mapped.move_to_end(key)
+        return arrays
+
+    path = Path(store_dir)
+    if distance_metric == "euclidean":
+        with np.load(path / STORE_COLUMNS_FILE, allow_pickle=False) as columns:
+            squared_norms = np.square(columns["norms"])
+        arrays = (np.load(path / STORE_EMBEDDINGS_FILE, mmap_mode="r"), squared_norms)
+    else:
+        arrays = (np.load(path / STORE_NORMALIZED_FILE, mmap_mode="r"), None)
+
+    _mapped[key] = arrays
+    while len(_mapped) > ATTACHED_BLOCKS_PER_WORKER:
+        _mapped.popitem(last=False)
+
+    return arrays
+
+
+def _release_shared_memory(shm: SharedMemory) -> None:
+    shm.close()
+    shm.unlink()
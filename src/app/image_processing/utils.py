@@ -1,45 +1,174 @@
 from io import BytesIO
 from pathlib import Path
+from typing import Sequence
 
 import cv2
 import numpy as np
-from PIL import Image
-from pillow_heif import register_heif_opener
+import pillow_heif
+from PIL import (
+    Image,
+    ImageOps,
+)
+from pillow_heif import (
+    HeifImage,
+    HeifThumbnail,
+    register_heif_opener,
+)
+
+from .resources import (
+    RENDITION_FORMATS,
+    ImageRendition,
+    ScaledImage,
+)
 
 register_heif_opener()
 
+# Number of first bytes of file enough to detect its format
+IMAGE_HEADER_SIZE = 12
+
+# Major brands of ISO BMFF files (`ftyp` box) decoded by pillow-heif
+HEIF_BRANDS = {b"heic", b"heix", b"hevc", b"hevx", b"heim", b"heis", b"mif1", b"msf1"}
+
+# Scale factors of reduced JPEG decoding (largest first) and their imread flags
+JPEG_REDUCED_FLAGS = (
+    (8, cv2.IMREAD_REDUCED_COLOR_8),
+    (4, cv2.IMREAD_REDUCED_COLOR_4),
+    (2, cv2.IMREAD_REDUCED_COLOR_2),
+)
+
+
+def get_image_format(header: bytes) -> str | None:
+    """Detect supported image format by first bytes of file (see `IMAGE_HEADER_SIZE`).
+
+    Returns:
+        str | None: One of "jpeg", "png", "bmp", "heif" or None if format is not supported.
+    """
+    if header.startswith(b"\xff\xd8\xff"):
+        return "jpeg"
+    if header.startswith(b"\x89PNG\r\n\x1a\n"):
+        return "png"
+    if header.startswith(b"BM"):
+        return "bmp"
+    if header[4:8] == b"ftyp" and header[8:12] in HEIF_BRANDS:
+        return "heif"
+    return None
+
 
 def get_image_content(image_path: str | Path) -> np.ndarray:
     """Get image content as numpy array in BGR format."""
     image_path = Path(image_path)
 
-    with Image.open(image_path) as img:
-        if img.format in ("HEIC", "HEIF"):
-            # Convert HEIC to RGB
-            rgb_img = img.convert("RGB")
-            # Convert PIL RGB to numpy array
-            rgb_array = np.array(rgb_img)
-            # Convert RGB to BGR
-            bgr_array = cv2.cvtColor(rgb_array, cv2.COLOR_RGB2BGR)
-            return bgr_array
+    with open(image_path, "rb") as f:
+        image_format = get_image_format(f.read(IMAGE_HEADER_SIZE))
+
+    if image_format == "heif":
+        return decode_heif(image_path).image
 
     # Use OpenCV to read directly as BGR
     return cv2.imread(str(image_path))  # type:ignore
 
 
 def get_image_content_from_bytes(file_content: bytes) -> np.ndarray:
-    """Get image content as numpy array in BGR format from file descriptor."""
-    # Convert to numpy array for cv2.imdecode
-    nparr = np.frombuffer(file_content, np.uint8)
+    """Get image content as numpy array in BGR format from file content.
+
+    Format is detected by header, so content is decoded exactly once: HEIF images by
+    libheif, others by OpenCV directly from content buffer (without copying it).
+    """
+    return decode_image(file_content).image
+
+
+def decode_image(file_content: bytes, max_size: int = 0) -> ScaledImage:
+    """Decode image in BGR format with its longer side reduced to at most `max_size`.
+
+    JPEG images are decoded by libjpeg at 1/2, 1/4 or 1/8 scale (which is much faster
+    than decoding all pixels) and HEIF images are replaced by embedded thumbnail if it's
+    large enough, then images are resized to exact size. Other formats are decoded at
+    full size and resized.
+
+    Args:
+        file_content (bytes): Image file content.
+        max_size (int): Max size of longer side in pixels, 0 keeps original size.
+
+    Returns:
+        ScaledImage: Decoded image and its scale (original size / decoded size).
+    """
+    image_format = get_image_format(file_content[:IMAGE_HEADER_SIZE])
+    if image_format is None:
+        raise ValueError("Unsupported image format")
+
+    if image_format == "heif":
+        image, scale = decode_heif(BytesIO(file_content), max_size)
+    else:
+        flags = cv2.IMREAD_COLOR
+        original_size = 0
+        if max_size and image_format == "jpeg":
+            # Only header is parsed to get size of image
+            with Image.open(BytesIO(file_content)) as img:
+                original_size = max(img.size)
+
+            for factor, reduced_flags in JPEG_REDUCED_FLAGS:
+                if original_size // factor >= max_size:
+                    flags = reduced_flags
+                    break
+
+        decoded = cv2.imdecode(np.frombuffer(file_content, np.uint8), flags)
+        if decoded is None:
+            raise ValueError(f"Failed to decode {image_format} image")
+
+        image = decoded
+        scale = original_size / max(image.shape[:2]) if original_size else 1.0
+
+    size = max(image.shape[:2])
+    if max_size and size > max_size:
+        image = resize_to_max_size(image, max_size)
+        scale *= size / max(image.shape[:2])
+
+    return ScaledImage(image, scale)
+
+
+def decode_heif(fp: str | Path | BytesIO, max_size: int = 0) -> ScaledImage:
+    """Decode HEIF image to BGR array without intermediate copies.
+
+    libheif decodes pixels in BGR order, so there is no RGB image to copy to array and swap
+    channels of. Returned array is a read-only view of decoded buffer, unless rows of the
+    buffer are padded (then array is copied once to be contiguous).
+
+    Args:
+        fp (str | Path | BytesIO): Path to image file or its content.
+        max_size (int): When set, the smallest embedded thumbnail which longer side is at
+            least `max_size` pixels is decoded instead of full image (if there is one).
+
+    Returns:
+        ScaledImage: Decoded image and its scale (original size / decoded size).
+    """
+    heif_file = pillow_heif.open_heif(fp, bgr_mode=True)
+    primary = heif_file[heif_file.primary_index]
+    image: HeifImage | HeifThumbnail = primary
+
+    # Thumbnails are listed by size of their longer side
+    boxes: list[int] = primary.info["thumbnails"]  # type:ignore
+    if max_size and (large_boxes := [box for box in boxes if box >= max_size]):
+        image = primary.get_thumbnail(boxes.index(min(large_boxes)))
 
-    with Image.open(BytesIO(file_content)) as img:
-        if img.format in ("HEIC", "HEIF"):
-            rgb_img = img.convert("RGB")
-            rgb_array = np.array(rgb_img)
-            bgr_array = cv2.cvtColor(rgb_array, cv2.COLOR_RGB2BGR)
-            return bgr_array
+    # Rows of decoded image may be padded up to stride, models expect contiguous arrays
+    array = np.asarray(image)
+    if array.shape[1] != image.size[0]:
+        array = np.ascontiguousarray(array[:, : image.size[0]])
+    if image.mode == "BGRA":
+        array = cv2.cvtColor(array, cv2.COLOR_BGRA2BGR)
 
-    return cv2.imdecode(nparr, cv2.IMREAD_COLOR)  # type:ignore
+    return ScaledImage(array, max(primary.size) / max(image.size))
+
+
+def resize_to_max_size(image: np.ndarray, max_size: int) -> np.ndarray:
+    """Downscale image (keeping aspect ratio) so its longer side is `max_size` pixels."""
+    height, width = image.shape[:2]
+    ratio = max_size / max(height, width)
+    return cv2.resize(
+        image,
+        (max(1, round(width * ratio)), max(1, round(height * ratio))),
+        interpolation=cv2.INTER_AREA,
+    )
 
 
 def resize_image(
@@ -66,3 +195,84 @@ def resize_image(
         dst_path.parent.mkdir(parents=True, exist_ok=True)
 
         img.save(dst_path, optimize=True)
+
+
+def resize_image_renditions(
+    src: str | Path,
+    base_dir: str | Path,
+    renditions: Sequence[ImageRendition],
+    skip_newer: bool = True,
+) -> int:
+    """Decode image once and save all its renditions (resized copies).
+
+    JPEG is decoded at reduced scale that is still larger than every rendition, which
+    is several times faster for large photos. Rendition file newer than the image is
+    skipped (image is not opened at all if every rendition is up to date).
+
+    Args:
+        src (str | Path): Source image path.
+        base_dir (str | Path): Source directory, renditions keep image path relative to it.
+        renditions (Sequence[ImageRendition]): Renditions to save.
+        skip_newer (bool): Skip renditions which files are newer than source image.
+
+    Returns:
+        int: Number of saved renditions.
+    """
+    src_path = Path(src)
+    relative_path = src_path.relative_to(base_dir)
+    src_mtime = src_path.stat().st_mtime
+
+    targets: list[tuple[ImageRendition, Path]] = []
+    for rendition in renditions:
+        dst_path = get_rendition_path(relative_path, rendition)
+        if skip_newer and dst_path.exists() and dst_path.stat().st_mtime >= src_mtime:
+            continue
+        targets.append((rendition, dst_path))
+
+    if not targets:
+        return 0
+
+    max_size = max(max(rendition.max_width, rendition.max_height) for rendition, _ in targets)
+    with Image.open(src_path) as img:
+        src_format = str(img.format)
+        img.draft(None, (max_size, max_size))
+        # Rotated by EXIF orientation (as browsers show original), since EXIF is not saved
+        image = ImageOps.exif_transpose(img)
+
+    for rendition, dst_path in targets:
+        resized = image.copy()
+        resized.thumbnail((rendition.max_width, rendition.max_height), Image.Resampling.LANCZOS)
+        save_image(resized, dst_path, rendition.format or src_format, rendition.quality)
+
+    return len(targets)
+
+
+def get_rendition_path(relative_path: str | Path, rendition: ImageRendition) -> Path:
+    """Get path of image rendition (extension is changed if rendition has its own format)."""
+    dst_path = Path(rendition.dst_dir) / relative_path
+    if rendition.format:
+        dst_path = dst_path.with_suffix(RENDITION_FORMATS[rendition.format])
+    return dst_path
+
+
+def save_image(
+    image: Image.Image,
+    dst_path: Path,
+    image_format: str,
+    quality: int | None = None,
+) -> None:
+    """Save image through temporary file, so interrupted saving never leaves partial file."""
+    if image_format.lower() == "jpeg" and image.mode not in ("RGB", "L"):
+        image = image.convert("RGB")
+
+    params: dict = {"optimize": True}
+    if quality is not None:
+        params["quality"] = quality
+
+    dst_path.parent.mkdir(parents=True, exist_ok=True)
+    tmp_path = dst_path.with_name(f".{dst_path.name}.tmp")
+    try:
+        image.save(tmp_path, format=image_format, **params)
+        tmp_path.replace(dst_path)
+    finally:
+        tmp_path.unlink(missing_ok=True)
@@ -1,9 +1,27 @@
+import asyncio
+from contextlib import asynccontextmanager
+from functools import partial
 from pathlib import Path
+from typing import AsyncIterator
 
+from fastapi import FastAPI
+
+from app.core.batching import MicroBatcher
+from app.core.cache import LRUCache
+from app.core.executor import InferenceExecutor
 from app.core.fastapi import init_fastapi_app
+from app.core.galleries import (
+    EventGallery,
+    GalleryRegistry,
+)
 from app.core.logging import Logger
 from app.core.settings import get_settings
-from app.image_processing.face_embeddings import read_embeddings_dir
+from app.core.startup import Startup
+from app.image_processing.face_detection import (
+    represent_faces,
+    warm_up_models,
+)
+from app.image_processing.sharding import ShardPool
 from app.storages import (
     S3Client,
     S3Proxy,
@@ -27,48 +45,126 @@ s3_proxy = S3Proxy(
 )
 app.s3_proxy = s3_proxy  # type:ignore
 
+inference = InferenceExecutor(
+    workers=settings.deepface.inference_workers,
+    max_queue=settings.deepface.inference_queue_size,
+)
+app.inference = inference  # type:ignore
+
+# Faces of concurrent requests are recognized in batched model calls. Detectors accept
+# one image at a time, so every image is detected in its own call instead
+app.representation_batcher = MicroBatcher(  # type:ignore
+    partial(represent_faces, model_name=settings.deepface.model_name),
+    executor=inference,
+    max_batch=settings.deepface.batch_max_size,
+    max_wait=settings.deepface.batch_max_wait_ms / 1000,
+)
 
-def load_files_lists() -> None:
-    """Load lists of image and embedding files from S3."""
-    for attr in ("original", "resized", "embeddings"):
-        try:
-            objects = s3_client.list_files_in_s3_prefix(
-                bucket_name=settings.images.bucket,
-                s3_prefix=getattr(settings.images, attr),
-            )
-        except Exception as e:
-            raise RuntimeError(f"Failed to list {attr} files: {e}")
+# Gallery is split between worker processes (searched in parallel) when configured
+shard_pool = (
+    ShardPool(workers=settings.deepface.search_workers)
+    if settings.deepface.search_workers > 1
+    else None
+)
 
-        if not objects:
-            raise ValueError(f"No {attr} objects found")
+# Results of repeated uploads of the same files, bound to gallery they were searched in
+result_cache: LRUCache = LRUCache(
+    max_entries=settings.cache.max_entries,
+    max_bytes=settings.cache.max_mb * 2**20,
+    ttl=settings.cache.ttl,
+    sizeof=lambda result: result.nbytes,
+)
+app.result_cache = result_cache  # type:ignore
 
-        setattr(app, f"{attr}_list", objects)
+EMBEDDINGS_DIR = Path("/tmp/embeddings")
 
 
-def load_embeddings() -> None:
-    """Load face embeddings for all configured projects."""
-    embeddings_list: list[str] = app.embeddings_list  # type:ignore
-    if not embeddings_list:
-        raise ValueError("No embedding files found")
+def evict_outdated_results(name: str) -> None:
+    """Free cached results of gallery searched before it was updated or unloaded.
 
-    embeddings_dir = Path("/tmp/embeddings")
-    embeddings_dir.mkdir(parents=True, exist_ok=True)
+    Results are keyed by gallery name and revision, so outdated ones are never returned
+    anyway, and results of other galleries are kept.
+    """
+    gallery = galleries[name].gallery
+    revision = gallery.revision if gallery is not None else None
+    result_cache.remove_if(lambda key: key[0] == name and key[1] != revision)  # type:ignore
 
-    for filename in embeddings_list:
-        local_path = embeddings_dir / Path(filename).name
-        if local_path.exists():
-            logger.info(f"Embedding already exists: {local_path}")
-            continue
 
-        s3_client.download_file_from_s3(
+# Galleries of all events share loaded models, each one is synced to its own directory
+galleries = GalleryRegistry(
+    [
+        EventGallery(
+            name=name,
+            event=event,
             bucket_name=settings.images.bucket,
-            s3_key=filename,
-            local_path=local_path,
+            deepface=settings.deepface,
+            s3_client=s3_client,
+            logger=logger,
+            local_dir=EMBEDDINGS_DIR / name,
+            shard_pool=shard_pool,
+            on_update=evict_outdated_results,
+            # Unloaded gallery is loaded again from disk without S3 requests if it was
+            # synced less than sync interval ago
+            listing_ttl=settings.images.sync_interval,
         )
-        logger.info(f"Downloaded embedding: {local_path}")
+        for name, event in settings.images.get_events().items()
+    ],
+    max_bytes=settings.images.max_memory_mb * 2**20 or None,
+)
+app.galleries = galleries  # type:ignore
+
+
+async def sync_embeddings_periodically(interval: int) -> None:
+    """Sync embeddings with S3 every `interval` seconds."""
+    while True:
+        await asyncio.sleep(interval)
+        await asyncio.to_thread(galleries.unload_idle)
+
+        # Galleries are synced one by one, failure of one doesn't stop others
+        for name in list(galleries.galleries):
+            try:
+                await asyncio.to_thread(galleries.reload, name)
+            except Exception as e:
+                logger.exception("Failed to sync embeddings", e, gallery=name)
+
+
+# Heavy loading runs in background after server is started, so probes are answered
+# meanwhile (see `/health/live` and `/health/ready`)
+startup = Startup(logger)
+app.startup = startup  # type:ignore
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI) -> AsyncIterator[None]:
+    """Start loading galleries and models concurrently, stop all on shutdown."""
+    startup.start(
+        {
+            "galleries": partial(asyncio.to_thread, galleries.preload),
+            # Models are built and warmed up in inference thread, same as used by requests
+            "models": partial(
+                inference.run,
+                warm_up_models,
+                model_name=settings.deepface.model_name,
+                detector_backend=settings.deepface.detector_backend,
+            ),
+        },
+    )
+
+    if settings.images.sync_interval > 0:
+        app.embeddings_sync_task = asyncio.create_task(  # type:ignore
+            sync_embeddings_periodically(settings.images.sync_interval),
+        )
+
+    try:
+        yield
+    finally:
+        if settings.images.sync_interval > 0:
+            app.embeddings_sync_task.cancel()  # type:ignore
 
-    app.embeddings = read_embeddings_dir(embeddings_dir)  # type:ignore
+        await startup.stop()
+        inference.shutdown()
+        if shard_pool is not None:
+            shard_pool.shutdown()
 
 
-load_files_lists()
-load_embeddings()
+app.router.lifespan_context = lifespan
@@ -1,6 +1,12 @@
 from .proxy import S3Proxy
 from .resources import (
     ProxySettings,
+    S3Object,
     S3Settings,
+    TransferStats,
 )
 from .s3 import S3Client
+from .sync import (
+    S3DirSync,
+    SyncResult,
+)
@@ -1,3 +1,5 @@
+from datetime import datetime
+
 from pydantic import BaseModel
 
 from app.core.utils import LowercaseKeyMixin
@@ -8,7 +10,52 @@ class S3Settings(LowercaseKeyMixin, BaseModel):
     endpoint: str
     key: str
     secret: str
+    max_workers: int = 16  # parallel transfers (and pooled connections)
+    max_attempts: int = 5  # attempts of a single file transfer
 
 
 class ProxySettings(LowercaseKeyMixin, BaseModel):
     url: str
+
+
+class TransferStats(BaseModel):
+    """Aggregate statistics of many file transfers."""
+
+    files: int = 0
+    bytes: int = 0
+    failed: int = 0
+    retries: int = 0
+    elapsed: float = 0.0
+    errors: dict[str, str] = {}
+
+    @property
+    def files_per_second(self) -> float:
+        return self.files / self.elapsed if self.elapsed else 0.0
+
+    @property
+    def megabytes_per_second(self) -> float:
+        return self.bytes / 2**20 / self.elapsed if self.elapsed else 0.0
+
+    def __str__(self) -> str:
+        return (
+            f"{self.files} files ({self.bytes / 2**20:.1f} MB) in {self.elapsed:.1f}s, "
+            f"{self.files_per_second:.1f} files/s, {self.megabytes_per_second:.1f} MB/s, "
+            f"{self.retries} retries, {self.failed} failed"
+        )
+
+
+class S3Object(BaseModel):
+    """Object listed in S3 bucket."""
+
+    key: str
+    etag: str
+    size: int
+    last_modified: datetime
+
+    def is_same(self, other: "S3Object") -> bool:
+        """Check if object content was not changed (same ETag, size and modification time)."""
+        return (
+            self.etag == other.etag
+            and self.size == other.size
+            and self.last_modified == other.last_modified
+        )
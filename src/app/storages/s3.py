@@ -1,13 +1,54 @@
+import random
+import time
+from concurrent.futures import (
+    FIRST_COMPLETED,
+    Future,
+    ThreadPoolExecutor,
+    wait,
+)
 from pathlib import Path
-from typing import Any
+from typing import (
+    Any,
+    Callable,
+    Iterable,
+    TypeVar,
+)
 
 import boto3
+from boto3.s3.transfer import TransferConfig
+from botocore.config import Config
+from botocore.exceptions import (
+    BotoCoreError,
+    ClientError,
+)
 
-from .resources import S3Settings
+from .resources import (
+    S3Object,
+    S3Settings,
+    TransferStats,
+)
+
+# Delay before retry of failed transfer: BACKOFF_BASE * 2^attempt (with jitter), seconds
+BACKOFF_BASE = 0.5
+BACKOFF_MAX = 20.0
+
+RETRYABLE_ERROR_CODES = {"SlowDown", "Throttling", "ThrottlingException", "RequestTimeout"}
+
+TransferCallback = Callable[[str, Exception | None, TransferStats], None]
+
+T = TypeVar("T")
 
 
 class S3Client:
-    """Wrapper around Boto3 S3 client."""
+    """Wrapper around Boto3 S3 client.
+
+    Single Boto3 client (which is thread-safe) is shared by all transfer threads,
+    its connection pool is sized to number of parallel transfers.
+
+    Transient errors are retried only by this class (up to `max_attempts` attempts),
+    retries of Boto3 client and its transfer manager are disabled, so they don't
+    multiply with each other.
+    """
 
     def __init__(
         self,
@@ -15,15 +56,28 @@ class S3Client:
         endpoint: str,
         key: str,
         secret: str,
+        max_workers: int = 16,
+        max_attempts: int = 5,
         **kwargs: Any,
     ) -> None:
         """Initialize class instance."""
+        self.max_workers = max(1, max_workers)
+        self.max_attempts = max(1, max_attempts)
+
+        config = Config(
+            max_pool_connections=self.max_workers,
+            retries={"total_max_attempts": 1, "mode": "standard"},
+        )
+        if "config" in kwargs:
+            config = kwargs.pop("config").merge(config)
+
         self.client = boto3.client(
             "s3",
             region_name=region,
             endpoint_url=endpoint,
             aws_access_key_id=key,
             aws_secret_access_key=secret,
+            config=config,
             **kwargs,
         )
 
@@ -49,11 +103,7 @@ class S3Client:
         if not src_path.exists() or not src_path.is_file():
             raise ValueError(f"File '{src_path}' does not exist or is not a file")
 
-        self.client.upload_file(
-            Filename=str(src_path),
-            Bucket=bucket_name,
-            Key=str(dst_path),
-        )
+        self._with_retries(self._upload_file, src_path, dst_path, bucket_name)
 
     def list_files_in_s3_prefix(
         self,
@@ -67,9 +117,55 @@ class S3Client:
             bucket_name (str): S3 bucket name
             s3_prefix (str): S3 prefix to list files from
         """
+        return [obj.key for obj in self.list_objects_in_s3_prefix(bucket_name, s3_prefix)]
+
+    def list_objects_in_s3_prefix(
+        self,
+        bucket_name: str,
+        s3_prefix: str,
+    ) -> list[S3Object]:
+        """List all objects with their ETag, size and modification time in a specific S3 prefix.
+
+        Args:
+            bucket_name (str): S3 bucket name
+            s3_prefix (str): S3 prefix to list objects from
+        """
         paginator = self.client.get_paginator("list_objects_v2")
         pages = paginator.paginate(Bucket=bucket_name, Prefix=s3_prefix)
-        return [obj["Key"] for page in pages for obj in page.get("Contents", [])]
+        # On transient error listing is started again from the first page
+        listed: list[dict[str, Any]] = self._with_retries(list, pages)[0]
+        objects: list[S3Object] = []
+        for page in listed:
+            objects.extend(
+                S3Object(
+                    key=obj["Key"],
+                    etag=obj.get("ETag", "").strip('"'),
+                    size=obj.get("Size", 0),
+                    last_modified=obj["LastModified"],
+                )
+                for obj in page.get("Contents", [])
+            )
+        return objects
+
+    def file_exists_in_s3(
+        self,
+        bucket_name: str,
+        s3_key: str,
+    ) -> bool:
+        """Check if a single file exists in S3 bucket.
+
+        Args:
+            bucket_name (str): S3 bucket name
+            s3_key (str): S3 key of the file to check
+        """
+        try:
+            self._with_retries(self.client.head_object, Bucket=bucket_name, Key=s3_key)
+        except ClientError as e:
+            if e.response.get("Error", {}).get("Code") in ("404", "NoSuchKey", "NotFound"):
+                return False
+            raise
+
+        return True
 
     def download_file_from_s3(
         self,
@@ -88,41 +184,182 @@ class S3Client:
         local_dir = Path(local_path).parent
         local_dir.mkdir(parents=True, exist_ok=True)
 
-        self.client.download_file(
-            Bucket=bucket_name,
-            Key=s3_key,
-            Filename=str(local_path),
-        )
+        self._with_retries(self._download_file, bucket_name, s3_key, local_path)
 
     def download_dir_from_s3(
         self,
         bucket_name: str,
         s3_prefix: str,
         local_dir: str | Path,
-    ) -> None:
+        workers: int | None = None,
+    ) -> TransferStats:
         """Download all files from a specific S3 prefix to a local directory.
 
         Args:
-            s3_client (BaseClient): Boto3 S3 client
             bucket_name (str): S3 bucket name
             s3_prefix (str): S3 prefix to download files from
             local_dir (str | Path): Local directory to save the downloaded files
+            workers (int | None): Number of parallel downloads (max_workers by default)
         """
         local_dir = Path(local_dir)
         local_dir.mkdir(parents=True, exist_ok=True)
 
-        paginator = self.client.get_paginator("list_objects_v2")
-        pages = paginator.paginate(Bucket=bucket_name, Prefix=s3_prefix)
+        return self.download_files_from_s3(
+            bucket_name=bucket_name,
+            files=[
+                (key, local_dir / Path(key).relative_to(s3_prefix))
+                for key in self.list_files_in_s3_prefix(bucket_name, s3_prefix)
+            ],
+            workers=workers,
+        )
 
-        for page in pages:
-            for obj in page.get("Contents", []):
-                s3_key = obj["Key"]
-                relative_path = Path(s3_key).relative_to(s3_prefix)
-                local_file_path = local_dir / relative_path
-                local_file_path.parent.mkdir(parents=True, exist_ok=True)
-
-                self.client.download_file(
-                    Bucket=bucket_name,
-                    Key=s3_key,
-                    Filename=str(local_file_path),
-                )
+    def download_files_from_s3(
+        self,
+        bucket_name: str,
+        files: Iterable[tuple[str, str | Path]],
+        workers: int | None = None,
+        callback: TransferCallback | None = None,
+    ) -> TransferStats:
+        """Download many files from S3 bucket in parallel.
+
+        Failed downloads are retried with exponential backoff. Failure of a single
+        file does not stop others, failed files are reported in returned stats.
+
+        Args:
+            bucket_name (str): S3 bucket name
+            files (Iterable[tuple[str, str | Path]]): Pairs of S3 key and local path
+            workers (int | None): Number of parallel downloads (max_workers by default)
+            callback (TransferCallback | None): Called in calling thread after every
+                file with S3 key, error (None on success) and current stats
+        """
+
+        def download(s3_key: str, local_path: str | Path) -> int:
+            Path(local_path).parent.mkdir(parents=True, exist_ok=True)
+            self._download_file(bucket_name, s3_key, local_path)
+            return Path(local_path).stat().st_size
+
+        return self._transfer_files(
+            download,
+            ((s3_key, (s3_key, local_path)) for s3_key, local_path in files),
+            workers=workers,
+            callback=callback,
+        )
+
+    def upload_files_to_s3(
+        self,
+        bucket_name: str,
+        files: Iterable[tuple[str | Path, str]],
+        workers: int | None = None,
+        callback: TransferCallback | None = None,
+    ) -> TransferStats:
+        """Upload many files to S3 bucket in parallel.
+
+        Failed uploads are retried with exponential backoff. Failure of a single
+        file does not stop others, failed files are reported in returned stats.
+
+        Args:
+            bucket_name (str): S3 bucket name
+            files (Iterable[tuple[str | Path, str]]): Pairs of local path and S3 key
+            workers (int | None): Number of parallel uploads (max_workers by default)
+            callback (TransferCallback | None): Called in calling thread after every
+                file with S3 key, error (None on success) and current stats
+        """
+
+        def upload(src_path: str | Path, s3_key: str) -> int:
+            self._upload_file(src_path, s3_key, bucket_name)
+            return Path(src_path).stat().st_size
+
+        return self._transfer_files(
+            upload,
+            ((s3_key, (src_path, s3_key)) for src_path, s3_key in files),
+            workers=workers,
+            callback=callback,
+        )
+
+    def _upload_file(self, src_path: str | Path, dst_path: str | Path, bucket_name: str) -> None:
+        """Upload a single file in one attempt."""
+        self.client.upload_file(
+            Filename=str(src_path),
+            Bucket=bucket_name,
+            Key=str(dst_path),
+        )
+
+    def _download_file(self, bucket_name: str, s3_key: str, local_path: str | Path) -> None:
+        """Download a single file in one attempt (transfer manager doesn't retry it either)."""
+        self.client.download_file(
+            Bucket=bucket_name,
+            Key=s3_key,
+            Filename=str(local_path),
+            Config=TransferConfig(num_download_attempts=1),
+        )
+
+    def _transfer_files(
+        self,
+        transfer: Callable[..., int],
+        tasks: Iterable[tuple[str, tuple]],
+        workers: int | None,
+        callback: TransferCallback | None,
+    ) -> TransferStats:
+        """Run transfer function for every task in bounded thread pool."""
+        workers = max(1, workers or self.max_workers)
+        stats = TransferStats()
+        started = time.perf_counter()
+
+        def on_done(s3_key: str, future: Future) -> None:
+            try:
+                size, retries = future.result()
+            except Exception as e:
+                stats.failed += 1
+                stats.errors[s3_key] = str(e)
+                error: Exception | None = e
+            else:
+                stats.files += 1
+                stats.bytes += size
+                stats.retries += retries
+                error = None
+
+            stats.elapsed = time.perf_counter() - started
+            if callback is not None:
+                callback(s3_key, error, stats)
+
+        # Only a bounded number of tasks is submitted ahead, so huge file lists
+        # don't create as many futures at once
+        pending: dict[Future, str] = {}
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            for s3_key, args in tasks:
+                if len(pending) >= 2 * workers:
+                    done, _ = wait(pending, return_when=FIRST_COMPLETED)
+                    for future in done:
+                        on_done(pending.pop(future), future)
+
+                pending[pool.submit(self._with_retries, transfer, *args)] = s3_key
+
+            for future, s3_key in pending.items():
+                on_done(s3_key, future)
+
+        stats.elapsed = time.perf_counter() - started
+        return stats
+
+    def _with_retries(self, func: Callable[..., T], *args: Any, **kwargs: Any) -> tuple[T, int]:
+        """Call function retrying transient errors, return its result and number of retries."""
+        attempt = 0
+        while True:
+            try:
+                return func(*args, **kwargs), attempt
+            except Exception as e:
+                attempt += 1
+                if attempt >= self.max_attempts or not is_retryable_error(e):
+                    raise
+
+                delay = min(BACKOFF_MAX, BACKOFF_BASE * 2 ** (attempt - 1))
+                time.sleep(delay * random.uniform(0.5, 1.0))
+
+
+def is_retryable_error(e: Exception) -> bool:
+    """Check if S3 error is transient (network errors, throttling and server errors)."""
+    if isinstance(e, ClientError):
+        code = e.response.get("Error", {}).get("Code", "")
+        status = e.response.get("ResponseMetadata", {}).get("HTTPStatusCode", 0)
+        return code in RETRYABLE_ERROR_CODES or status >= 500 or status == 429
+
+    return isinstance(e, (BotoCoreError, ConnectionError, TimeoutError))
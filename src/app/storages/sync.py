@@ -0,0 +1,191 @@
+import fcntl
+import json
+import os
+from contextlib import contextmanager
+from pathlib import (
+    Path,
+    PurePosixPath,
+)
+from typing import (
+    Callable,
+    Iterator,
+)
+
+from pydantic import BaseModel
+
+from .resources import (
+    S3Object,
+    TransferStats,
+)
+from .s3 import S3Client
+
+LOCK_FILENAME = ".sync.lock"
+
+
+class SyncResult(BaseModel):
+    """Changes of local directory made by a single sync."""
+
+    added: list[Path] = []
+    changed: list[Path] = []
+    removed: list[Path] = []
+    unchanged: int = 0
+    stats: TransferStats = TransferStats()
+
+    @property
+    def has_changes(self) -> bool:
+        return bool(self.added or self.changed or self.removed)
+
+
+class SyncManifest:
+    """Local JSON manifest of S3 objects downloaded to a directory.
+
+    Manifest remembers ETag, size and modification time of every downloaded object,
+    so on next sync only new and changed objects are downloaded again.
+    """
+
+    def __init__(self, path: str | Path) -> None:
+        """Initialize class instance."""
+        self.path = Path(path)
+        self.objects: dict[str, S3Object] = {}
+
+        if self.path.exists():
+            try:
+                with open(self.path, "r") as f:
+                    data = json.load(f)
+            except ValueError:
+                data = {}  # broken manifest means everything is downloaded again
+
+            self.objects = {key: S3Object(**obj) for key, obj in data.items()}
+
+    def save(self) -> None:
+        """Save manifest to file (replaced atomically)."""
+        tmp_path = self.path.with_name(f".{self.path.name}.{os.getpid()}.tmp")
+        with open(tmp_path, "w") as f:
+            json.dump({key: obj.model_dump(mode="json") for key, obj in self.objects.items()}, f)
+        os.replace(tmp_path, self.path)
+
+
+class S3DirSync:
+    """Incremental one-way sync of S3 prefix to a local directory.
+
+    Objects are compared with local manifest by ETag, size and last modified time:
+    new and changed objects are downloaded, local files of deleted objects are removed.
+    Prefix is listed only once per sync. Subdirectories of prefix are kept, so objects
+    with the same name in different subdirectories don't overwrite each other.
+
+    Directory may be shared by several processes (e.g. uvicorn workers): sync holds
+    exclusive file lock of directory, so only one process downloads at a time and the
+    others find files already downloaded.
+    """
+
+    def __init__(
+        self,
+        s3_client: S3Client,
+        bucket_name: str,
+        s3_prefix: str,
+        local_dir: str | Path,
+        manifest_path: str | Path | None = None,
+        key_filter: Callable[[str], bool] | None = None,
+    ) -> None:
+        """Initialize class instance."""
+        self.s3_client = s3_client
+        self.bucket_name = bucket_name
+        self.s3_prefix = s3_prefix
+        self.local_dir = Path(local_dir)
+        self.manifest_path = Path(manifest_path or self.local_dir / "manifest.json")
+        self.key_filter = key_filter
+
+    def get_local_path(self, key: str) -> Path:
+        """Get local path of object by its key relative to synced prefix."""
+        if key.startswith(self.s3_prefix):
+            key = key[len(self.s3_prefix) :]
+
+        parts = [part for part in PurePosixPath(key).parts if part != "/"]
+        if not parts or ".." in parts:
+            raise ValueError(f"Invalid S3 key: {key}")
+
+        return self.local_dir.joinpath(*parts)
+
+    def list_objects(self) -> list[S3Object]:
+        """List objects of synced prefix (matching key filter)."""
+        objects = self.s3_client.list_objects_in_s3_prefix(
+            bucket_name=self.bucket_name,
+            s3_prefix=self.s3_prefix,
+        )
+        return [obj for obj in objects if self.key_filter is None or self.key_filter(obj.key)]
+
+    def sync(self, objects: list[S3Object] | None = None) -> SyncResult:
+        """Download new and changed objects and remove local files of deleted ones.
+
+        Args:
+            objects (list[S3Object] | None): Already listed objects of synced prefix.
+                Prefix is listed when not passed.
+
+        Returns:
+            SyncResult: Local paths of added, changed and removed files. Objects failed
+                to download are not recorded in manifest (see `stats.errors`), so they
+                are downloaded again on next sync.
+        """
+        if objects is None:
+            objects = self.list_objects()
+
+        self.local_dir.mkdir(parents=True, exist_ok=True)
+        with lock_dir(self.local_dir):
+            return self._sync(objects)
+
+    def _sync(self, objects: list[S3Object]) -> SyncResult:
+        manifest = SyncManifest(self.manifest_path)
+        result = SyncResult()
+
+        try:
+            remote = {obj.key: obj for obj in objects}
+            for key in list(manifest.objects):
+                if key not in remote:
+                    local_path = self.get_local_path(key)
+                    local_path.unlink(missing_ok=True)
+                    del manifest.objects[key]
+                    result.removed.append(local_path)
+
+            downloads = []
+            for key, obj in remote.items():
+                local_path = self.get_local_path(key)
+                known = manifest.objects.get(key)
+                if known is not None and known.is_same(obj) and local_path.exists():
+                    result.unchanged += 1
+                else:
+                    downloads.append((key, local_path))
+
+            def on_downloaded(key: str, error: Exception | None, stats: TransferStats) -> None:
+                if error is not None:
+                    return
+
+                local_path = self.get_local_path(key)
+                new = key not in manifest.objects
+                manifest.objects[key] = remote[key]
+                (result.added if new else result.changed).append(local_path)
+
+            stats = self.s3_client.download_files_from_s3(
+                bucket_name=self.bucket_name,
+                files=downloads,
+                callback=on_downloaded,
+            )
+        finally:
+            # Progress is saved even if sync failed in the middle
+            manifest.save()
+
+        result.stats = stats
+        return result
+
+
+@contextmanager
+def lock_dir(path: Path) -> Iterator[None]:
+    """Hold exclusive lock of directory (waits for other processes holding it).
+
+    Lock is released when the block is left or when process holding it exits.
+    """
+    with open(path / LOCK_FILENAME, "a") as f:
+        fcntl.flock(f, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(f, fcntl.LOCK_UN)
@@ -0,0 +1,86 @@
+import asyncio
+import secrets
+import time
+
+from fastapi import (
+    APIRouter,
+    Header,
+    Request,
+)
+from fastapi.responses import JSONResponse
+
+from app.core.cache import LRUCache
+from app.core.fastapi import error_response
+from app.core.galleries import GalleryRegistry
+from app.core.logging import Logger
+from app.core.settings import Settings
+from app.core.utils import get_memory_usage
+
+router = APIRouter(prefix="/admin")
+
+
+def check_admin_token(request: Request, authorization: str | None) -> None:
+    """Check `Authorization: Bearer <token>` header against configured admin token."""
+    settings: Settings = request.app.settings  # type:ignore
+    if not settings.admin.token:
+        error_response("Not Found", status_code=404)
+
+    if not secrets.compare_digest(authorization or "", f"Bearer {settings.admin.token}"):
+        error_response("Invalid admin token", status_code=401)
+
+
+@router.post("/reload")
+async def reload_gallery_view(
+    request: Request,
+    gallery: str | None = None,
+    full: bool = False,
+    authorization: str | None = Header(default=None),
+) -> JSONResponse:
+    """Sync embeddings with S3 and swap in new galleries if anything changed.
+
+    All loaded galleries are reloaded unless `gallery` name is passed.
+    """
+    check_admin_token(request, authorization)
+
+    galleries: GalleryRegistry = request.app.galleries  # type:ignore
+    if gallery is not None and gallery not in galleries:
+        return error_response(f"Gallery {gallery} not found", status_code=404)
+
+    logger: Logger = request.app.logger  # type:ignore
+    started = time.perf_counter()
+    try:
+        # Gallery is built in a thread, so other requests are served meanwhile
+        reloaded = await asyncio.to_thread(galleries.reload, gallery, full)
+    except Exception as e:
+        logger.exception("Error during gallery reload", e, gallery=gallery)
+        return error_response(f"Error during gallery reload: {e}", status_code=500)
+
+    return JSONResponse(
+        content={
+            "success": True,
+            "reloaded": reloaded,
+            "galleries": galleries.stats()["galleries"],
+            "elapsed": round(time.perf_counter() - started, 3),
+        },
+        status_code=200,
+    )
+
+
+@router.get("/stats")
+async def stats_view(
+    request: Request,
+    authorization: str | None = Header(default=None),
+) -> JSONResponse:
+    """Memory usage of galleries and result cache stats."""
+    check_admin_token(request, authorization)
+
+    galleries: GalleryRegistry = request.app.galleries  # type:ignore
+    result_cache: LRUCache = request.app.result_cache  # type:ignore
+    return JSONResponse(
+        content={
+            "memory_mb": round(get_memory_usage() / 2**20, 1),
+            **galleries.stats(),
+            "cache": result_cache.stats(),
+        },
+        status_code=200,
+    )
@@ -0,0 +1,29 @@
+from fastapi import (
+    APIRouter,
+    Request,
+)
+from fastapi.responses import JSONResponse
+
+from app.core.startup import Startup
+
+router = APIRouter(prefix="/health")
+
+
+@router.get("/live")
+async def liveness_view(request: Request) -> JSONResponse:
+    """Process is serving requests (fails only when startup failed, so it is restarted)."""
+    startup: Startup = request.app.startup  # type:ignore
+    return JSONResponse(
+        content={"success": not startup.is_failed},
+        status_code=500 if startup.is_failed else 200,
+    )
+
+
+@router.get("/ready")
+async def readiness_view(request: Request) -> JSONResponse:
+    """Models are loaded and default galleries are ready to search."""
+    startup: Startup = request.app.startup  # type:ignore
+    return JSONResponse(
+        content={"success": startup.is_ready, **startup.stats()},
+        status_code=200 if startup.is_ready else 503,
+    )
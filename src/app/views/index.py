@@ -1,5 +1,13 @@
-from typing import Any
+import asyncio
+import hashlib
+from pathlib import Path
+from typing import (
+    Any,
+    NamedTuple,
+    NoReturn,
+)
 
+import numpy as np
 from fastapi import (
     APIRouter,
     File,
@@ -9,24 +17,66 @@ from fastapi import (
 from fastapi.responses import JSONResponse
 from starlette.responses import Response
 
+from app.core.batching import MicroBatcher
+from app.core.cache import LRUCache
+from app.core.executor import (
+    ClientDisconnectedError,
+    ExecutorBusyError,
+    InferenceExecutor,
+)
 from app.core.fastapi import error_response
+from app.core.galleries import (
+    GalleryRegistry,
+    SearchGallery,
+)
 from app.core.i18n import _
 from app.core.logging import Logger
 from app.core.settings import Settings
+from app.core.startup import Startup
 from app.core.templates import render_template
+from app.core.utils import measure_time
 from app.image_processing.face_detection import (
-    find_similar_faces,
     get_faces,
+    search_similar_faces,
 )
 from app.image_processing.resources import (
+    DEFAULT_GALLERY,
     IMAGE_MIMETYPES,
+    EventSettings,
     Face,
+    ScaledImage,
+    SimilarFace,
+)
+from app.image_processing.utils import (
+    IMAGE_HEADER_SIZE,
+    decode_image,
+    get_image_format,
 )
 from app.storages import S3Proxy
 
 router = APIRouter()
 
 MAX_FILES: int = 5
+MAX_FILE_SIZE: int = 10 * 2**20  # 10MB
+UPLOAD_CHUNK_SIZE: int = 2**18
+# Approximate size of similar face model in memory (without its filename)
+SIMILAR_FACE_NBYTES: int = 1024
+
+
+class UploadResult(NamedTuple):
+    """Processing result of uploaded files (cached by their content)."""
+
+    faces: list[Face]
+    query_embeddings: np.ndarray
+    similar_faces: list[SimilarFace]
+
+    @property
+    def nbytes(self) -> int:
+        return (
+            sum(face.face.nbytes for face in self.faces)
+            + self.query_embeddings.nbytes
+            + sum(SIMILAR_FACE_NBYTES + len(sf.filename) for sf in self.similar_faces)
+        )
 
 
 @router.get("/")
@@ -37,8 +87,18 @@ async def index_view(request: Request) -> Response:
 @router.post("/")
 async def upload_files(
     files: list[UploadFile] = File(default=...),  # noqa
+    gallery: str = DEFAULT_GALLERY,
     request: Request = None,  # type:ignore
 ) -> JSONResponse:
+    # Models and galleries are loaded in background after server is started
+    startup: Startup = request.app.startup  # type:ignore
+    if not startup.is_ready:
+        return error_response(_("Service is starting, please try again later"), status_code=503)
+
+    galleries: GalleryRegistry = request.app.galleries  # type:ignore
+    if gallery not in galleries:
+        return error_response(_("Gallery {} not found").format(gallery), status_code=404)
+
     # Validate number of files
     if len(files) > MAX_FILES:
         return error_response(_("Maximum {} files allowed").format(MAX_FILES))
@@ -48,42 +108,70 @@ async def upload_files(
 
     settings: Settings = request.app.settings  # type:ignore
     logger: Logger = request.app.logger  # type:ignore
+    inference: InferenceExecutor = request.app.inference  # type:ignore
+    result_cache: LRUCache[UploadResult] = request.app.result_cache  # type:ignore
 
     try:
-        user_faces = await extract_faces_from_files(
-            files=files,
-            detector_backend=settings.deepface.detector_backend,
-            min_face_size=settings.deepface.min_detector_face_size,
-        )
+        contents = await read_uploaded_files(files)
     except Exception as e:
         logger.exception("Error during processing uploaded files", e)
         return error_response(_("Error during processing uploaded files: {}").format(e))
 
+    # Same gallery is used for the whole request, even if it is reloaded meanwhile.
+    # Gallery of event is loaded on first upload
     try:
-        similar_faces = find_similar_faces(
-            faces=user_faces,
-            embeddings=request.app.embeddings,
-            model_name=settings.deepface.model_name,
-        )
+        search_gallery = await asyncio.to_thread(galleries.get_gallery, gallery)
     except Exception as e:
-        logger.exception("Error during finding similar photos", e)
-        return error_response(_("Error during finding similar photos: {}").format(e))
+        logger.exception("Error during loading gallery", e, gallery=gallery)
+        return error_response(_("Gallery {} is not available").format(gallery), status_code=503)
+
+    # Gallery name and revision are the first items, see `evict_outdated_results`
+    cache_key = (
+        gallery,
+        search_gallery.revision,
+        get_contents_hash(contents),
+        settings.deepface.max_similar_faces,
+    )
+
+    # Every stage of pipeline (decode -> detect -> represent query -> search) is timed
+    timings: dict[str, float] = {}
+
+    result = result_cache.get(cache_key)
+    cached = result is not None
+    if result is None:
+        # Reject at once instead of queueing behind other uploads
+        if inference.is_busy:
+            return inference_error_response(ExecutorBusyError())
+
+        result = await process_uploaded_files(request, files, contents, search_gallery, timings)
+        result_cache.set(cache_key, result)
+
+    # Faces which images are not uploaded (according to images manifest) are skipped
+    event_gallery = galleries[gallery]
+    similar_faces = [sf for sf in result.similar_faces if event_gallery.has_images(sf.filename)]
 
     logger.info(
         "Processing result",
+        gallery=gallery,
         files=[str(f.filename) for f in files],
         similar_faces=len(similar_faces),
-        user_faces=len(user_faces),
+        missing_images=len(result.similar_faces) - len(similar_faces),
+        user_faces=len(result.faces),
+        timings=timings,
+        cached=cached,
+        cache=result_cache.stats(),
         **request.headers,
     )
 
     s3_proxy: S3Proxy = request.app.s3_proxy  # type:ignore
+    event = event_gallery.event
     result_files = [
         {
             "filename": sf.filename,
             "distance": sf.distance,
-            "resized": s3_proxy.get_proxy_path(sf.filename, prefix=settings.images.resized),
-            "original": s3_proxy.get_proxy_path(sf.filename, prefix=settings.images.original),
+            "resized": s3_proxy.get_proxy_path(sf.filename, prefix=event.resized),
+            "original": s3_proxy.get_proxy_path(sf.filename, prefix=event.original),
+            "thumbnail": get_thumbnail_path(s3_proxy, sf.filename, event),
         }
         for sf in similar_faces
     ]
@@ -97,8 +185,116 @@ async def upload_files(
     )
 
 
-async def extract_faces_from_files(files: list[UploadFile], **kwargs: Any) -> list[Face]:
-    user_faces: list[Face] = []
+async def process_uploaded_files(
+    request: Request,
+    files: list[UploadFile],
+    contents: list[bytes],
+    gallery: SearchGallery,
+    timings: dict[str, float],
+) -> UploadResult:
+    """Detect faces in uploaded files and search for them in gallery.
+
+    Responds with error (raises HTTP exception) if processing failed.
+    """
+    settings: Settings = request.app.settings  # type:ignore
+    logger: Logger = request.app.logger  # type:ignore
+    inference: InferenceExecutor = request.app.inference  # type:ignore
+
+    try:
+        with measure_time(timings, "decode"):
+            images = await decode_uploaded_files(
+                contents=contents,
+                max_size=settings.deepface.detection_max_size,
+            )
+
+        with measure_time(timings, "detect"):
+            user_faces = await extract_faces_from_images(
+                filenames=[str(file.filename) for file in files],
+                images=images,
+                inference=inference,
+                request=request,
+                detector_backend=settings.deepface.detector_backend,
+                min_face_size=settings.deepface.min_detector_face_size,
+            )
+    except (ExecutorBusyError, ClientDisconnectedError) as e:
+        inference_error_response(e)
+    except Exception as e:
+        logger.exception("Error during processing uploaded files", e)
+        error_response(_("Error during processing uploaded files: {}").format(e))
+
+    try:
+        with measure_time(timings, "represent"):
+            query_embeddings = await represent_query_faces(
+                faces=user_faces,
+                representation=request.app.representation_batcher,  # type:ignore
+                request=request,
+            )
+
+        with measure_time(timings, "search"):
+            similar_faces = await inference.run(
+                search_similar_faces,
+                request=request,
+                query_embeddings=query_embeddings,
+                gallery=gallery,
+                model_name=settings.deepface.model_name,
+                max_results=settings.deepface.max_similar_faces,
+            )
+    except (ExecutorBusyError, ClientDisconnectedError) as e:
+        inference_error_response(e)
+    except Exception as e:
+        logger.exception("Error during finding similar photos", e)
+        error_response(_("Error during finding similar photos: {}").format(e))
+
+    return UploadResult(user_faces, query_embeddings, similar_faces)
+
+
+def get_thumbnail_path(s3_proxy: S3Proxy, filename: str, event: EventSettings) -> str:
+    """Get URL of image shown in results grid (resized image if event has no thumbnails)."""
+    if not event.thumbnails:
+        return s3_proxy.get_proxy_path(filename, prefix=event.resized)
+
+    if event.thumbnails_ext:
+        filename = str(Path(filename).with_suffix(event.thumbnails_ext))
+    return s3_proxy.get_proxy_path(filename, prefix=event.thumbnails)
+
+
+def get_contents_hash(contents: list[bytes]) -> str:
+    """Get hash of uploaded files contents (order of files matters)."""
+    digest = hashlib.sha256()
+    for content in contents:
+        digest.update(len(content).to_bytes(8, "little"))
+        digest.update(content)
+    return digest.hexdigest()
+
+
+async def represent_query_faces(
+    faces: list[Face],
+    representation: MicroBatcher,
+    request: Request | None = None,
+) -> np.ndarray:
+    embeddings = await representation.submit_many(faces, request=request)
+    for embedding in embeddings:
+        if isinstance(embedding, BaseException):
+            raise embedding
+
+    return np.stack(embeddings)  # type:ignore
+
+
+def inference_error_response(e: Exception) -> NoReturn:
+    if isinstance(e, ExecutorBusyError):
+        error_response(_("Server is busy, please try again later"), status_code=503)
+
+    # Client will not see it, response is returned only to finish request
+    error_response("Client disconnected", status_code=499)
+
+
+async def read_uploaded_files(files: list[UploadFile]) -> list[bytes]:
+    """Validate uploaded files and read their contents.
+
+    Files are read by chunks: reading stops as soon as size limit is exceeded, and
+    format is checked by header of the first chunk.
+    """
+    contents: list[bytes] = []
 
     for file in files:
         filename = file.filename
@@ -107,12 +303,70 @@ async def extract_faces_from_files(files: list[UploadFile], **kwargs: Any) -> li
         if file.content_type not in IMAGE_MIMETYPES:
             raise ValueError(_("File {} is not a supported image format").format(filename))
 
-        # Check file size (10MB limit per file)
-        content = await file.read()
-        if len(content) > 10 * 1024 * 1024:  # 10MB
+        # Check file size (size of multipart file is known when it's received)
+        if file.size is not None and file.size > MAX_FILE_SIZE:
             raise ValueError(_("File {} is too large (max 10MB)").format(filename))
 
-        faces = get_faces(content, **kwargs)
+        chunks: list[bytes] = []
+        size = 0
+        while chunk := await file.read(UPLOAD_CHUNK_SIZE):
+            if not chunks and get_image_format(chunk[:IMAGE_HEADER_SIZE]) is None:
+                raise ValueError(_("File {} is not a supported image format").format(filename))
+
+            size += len(chunk)
+            if size > MAX_FILE_SIZE:
+                raise ValueError(_("File {} is too large (max 10MB)").format(filename))
+
+            chunks.append(chunk)
+
+        if not chunks:
+            raise ValueError(_("File {} is not a supported image format").format(filename))
+
+        # Single chunk is used as is, otherwise chunks are copied once
+        contents.append(chunks[0] if len(chunks) == 1 else b"".join(chunks))
+
+        # Reset file position for potential future reads
+        await file.seek(0)
+
+    return contents
+
+
+async def decode_uploaded_files(
+    contents: list[bytes],
+    max_size: int = 0,
+) -> list[ScaledImage | BaseException]:
+    """Decode all files concurrently (downscaled to `max_size` for faster detection).
+
+    Decoding error of a file is returned in place of its image, so errors are reported
+    in order of files.
+    """
+    return await asyncio.gather(
+        *(asyncio.to_thread(decode_image, content, max_size) for content in contents),
+        return_exceptions=True,
+    )
+
+
+async def extract_faces_from_images(
+    filenames: list[str],
+    images: list[ScaledImage | BaseException],
+    inference: InferenceExecutor,
+    request: Request | None = None,
+    **kwargs: Any,
+) -> list[Face]:
+    # Request fails on any decoding error, so no file is detected in vain
+    for image in images:
+        if isinstance(image, BaseException):
+            raise image
+
+    # Every image is a separate call, so with several inference workers images are
+    # searched for faces in parallel
+    results = await inference.map(get_faces, images, request=request, **kwargs)
+
+    user_faces: list[Face] = []
+    for filename, faces in zip(filenames, results):
+        if isinstance(faces, BaseException):
+            raise faces
+
         if not faces:
             raise ValueError(_("No faces detected in file {}").format(filename))
 
@@ -126,7 +380,4 @@ async def extract_faces_from_files(files: list[UploadFile], **kwargs: Any) -> li
 
         user_faces.extend(faces)
 
-        # Reset file position for potential future reads
-        await file.seek(0)
-
     return user_faces
@@ -0,0 +1,213 @@
+"""
+Compare latency and results of face detection on full-size and downscaled uploads.
+
+Every image is decoded and searched for faces same way as uploads are (see
+`deepface.detection_max_size` setting), faces are compared with faces detected on
+full-size images by intersection over union of their facial areas.
+
+Faces of downscaled images are cropped from downscaled images, so matched faces are
+also compared by distance between their embeddings and embeddings of full-size
+crops (`max_dist` is the largest one, compare it with printed threshold of model).
+
+Example:
+
+PYTHONPATH=src py src/scripts/benchmark_detection.py \
+    --src exports/samples \
+    --config config/test.toml \
+    --limit 100 \
+    --max-size 2400 1600 1024
+"""
+
+import os
+
+# Benchmark is run on CPU, must be set before tensorflow is imported
+os.environ.setdefault("CUDA_VISIBLE_DEVICES", "-1")
+
+import time  # noqa: E402
+from pathlib import Path  # noqa: E402
+
+from app.core.settings import get_settings  # noqa: E402
+from app.image_processing.face_detection import (  # noqa: E402
+    get_faces,
+    represent_faces,
+)
+from app.image_processing.face_embeddings import build_models  # noqa: E402
+from app.image_processing.resources import (  # noqa: E402
+    IMAGE_EXTENSIONS,
+    Face,
+)
+from app.image_processing.utils import decode_image  # noqa: E402
+
+# Faces with smaller intersection over union are considered different
+MIN_IOU = 0.5
+
+
+def get_iou(a: dict, b: dict) -> float:
+    """Intersection over union of two facial areas."""
+    width = min(a["x"] + a["w"], b["x"] + b["w"]) - max(a["x"], b["x"])
+    height = min(a["y"] + a["h"], b["y"] + b["h"]) - max(a["y"], b["y"])
+    if width <= 0 or height <= 0:
+        return 0.0
+
+    intersection = width * height
+    return float(intersection / (a["w"] * a["h"] + b["w"] * b["h"] - intersection))
+
+
+def match_faces(expected: list[Face], actual: list[Face]) -> list[tuple[float, int, int]]:
+    """Match faces greedily by best IoU, returns IoU and indices of every matched pair."""
+    pairs = sorted(
+        (
+            (get_iou(e.facial_area, a.facial_area), i, j)
+            for i, e in enumerate(expected)
+            for j, a in enumerate(actual)
+        ),
+        reverse=True,
+    )
+
+    matched_expected, matched_actual, matched = set(), set(), []
+    for iou, i, j in pairs:
+        if iou < MIN_IOU or i in matched_expected or j in matched_actual:
+            continue
+        matched_expected.add(i)
+        matched_actual.add(j)
+        matched.append((iou, i, j))
+
+    return matched
+
+
+def get_distances(
+    pairs: list[tuple[Face, Face]],
+    model_name: str,
+    distance_metric: str,
+) -> list[float]:
+    """Distances between embeddings of full-size and downscaled crops of the same faces."""
+    if not pairs:
+        return []
+
+    from deepface.modules.verification import find_distance
+
+    expected = represent_faces([e for e, _ in pairs], model_name)
+    actual = represent_faces([a for _, a in pairs], model_name)
+    return [float(find_distance(e, a, distance_metric)) for e, a in zip(expected, actual)]
+
+
+def detect(
+    contents: list[bytes],
+    detector_backend: str,
+    min_face_size: int,
+    max_size: int,
+) -> tuple[list[list[Face]], float, float]:
+    """Detect faces in all images, returns faces, decoding and detection time."""
+    decode_elapsed = detect_elapsed = 0.0
+    results = []
+    for content in contents:
+        started = time.perf_counter()
+        image = decode_image(content, max_size)
+        decoded = time.perf_counter()
+        results.append(get_faces(image, detector_backend, min_face_size))
+        decode_elapsed += decoded - started
+        detect_elapsed += time.perf_counter() - decoded
+
+    return results, decode_elapsed, detect_elapsed
+
+
+def print_row(
+    label: str,
+    images: int,
+    faces: int,
+    decode_elapsed: float,
+    detect_elapsed: float,
+    expected_faces: int,
+    ious: list[float],
+    distances: list[float],
+) -> None:
+    recall = len(ious) / expected_faces if expected_faces else 1.0
+    mean_iou = sum(ious) / len(ious) if ious else 0.0
+    mean_distance = sum(distances) / len(distances) if distances else 0.0
+    print(
+        f"{label:<12} decode={1000 * decode_elapsed / images:7.1f}ms"
+        f"  detect={1000 * detect_elapsed / images:7.1f}ms"
+        f"  faces={faces:5d}  matched={recall:6.1%}  mean_iou={mean_iou:.3f}"
+        f"  mean_dist={mean_distance:.4f}  max_dist={max(distances, default=0.0):.4f}",
+    )
+
+
+def main(config_path: str, src_dir: str, limit: int, max_sizes: list[int]) -> None:
+    settings = get_settings(config_path)
+    detector_backend = settings.deepface.detector_backend
+    min_face_size = settings.deepface.min_detector_face_size
+    model_name = settings.deepface.model_name
+    distance_metric = settings.deepface.distance_metric
+
+    paths = [p for p in sorted(Path(src_dir).rglob("*")) if p.suffix.lower() in IMAGE_EXTENSIONS]
+    contents = [path.read_bytes() for path in paths[:limit]]
+    if not contents:
+        raise ValueError(f"No images found in {src_dir}")
+
+    from deepface.modules.verification import find_threshold
+
+    print(f"Images: {len(contents)}, detector: {detector_backend}, min face: {min_face_size}")
+    print(f"Model: {model_name}, threshold: {find_threshold(model_name, distance_metric)}")
+
+    # Models are loaded (and warmed up) before any measurement
+    build_models(model_name, detector_backend)
+    detect(contents[:1], detector_backend, min_face_size, 0)
+
+    expected, decode_elapsed, detect_elapsed = detect(contents, detector_backend, min_face_size, 0)
+    expected_faces = sum(len(faces) for faces in expected)
+    print_row(
+        "full",
+        len(contents),
+        expected_faces,
+        decode_elapsed,
+        detect_elapsed,
+        expected_faces,
+        [1.0] * expected_faces,
+        [0.0] * expected_faces,
+    )
+
+    for max_size in max_sizes:
+        actual, decode_elapsed, detect_elapsed = detect(
+            contents,
+            detector_backend,
+            min_face_size,
+            max_size,
+        )
+        matched = [
+            (iou, e[i], a[j]) for e, a in zip(expected, actual) for iou, i, j in match_faces(e, a)
+        ]
+        distances = get_distances([(e, a) for _, e, a in matched], model_name, distance_metric)
+        print_row(
+            f"max={max_size}",
+            len(contents),
+            sum(len(faces) for faces in actual),
+            decode_elapsed,
+            detect_elapsed,
+            expected_faces,
+            [iou for iou, _, _ in matched],
+            distances,
+        )
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Benchmark detection on downscaled images")
+    parser.add_argument("--config", help="Path to config file")
+    parser.add_argument("--src", help="Source directory with images")
+    parser.add_argument("--limit", type=int, default=100, help="Max number of images")
+    parser.add_argument(
+        "--max-size",
+        type=int,
+        nargs="+",
+        default=[2400, 1600, 1024],
+        help="Max sizes of longer side to measure",
+    )
+
+    args = parser.parse_args()
+    main(
+        config_path=args.config,
+        src_dir=args.src,
+        limit=args.limit,
+        max_sizes=args.max_size,
+    )
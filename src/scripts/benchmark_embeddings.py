@@ -0,0 +1,121 @@
+"""
+Compare throughput of per-image and batched embeddings extraction on CPU.
+
+Example:
+
+PYTHONPATH=src py src/scripts/benchmark_embeddings.py \
+    --src exports/samples \
+    --config config/test.toml \
+    --limit 200 \
+    --batch-size 1 8 32 64
+"""
+
+import os
+
+# Benchmark is run on CPU, must be set before tensorflow is imported
+os.environ.setdefault("CUDA_VISIBLE_DEVICES", "-1")
+
+import time  # noqa: E402
+from pathlib import Path  # noqa: E402
+
+import numpy as np  # noqa: E402
+
+from app.core.settings import get_settings  # noqa: E402
+from app.image_processing.face_embeddings import (  # noqa: E402
+    build_models,
+    get_embeddings,
+    get_embeddings_batched,
+)
+from app.image_processing.resources import (  # noqa: E402
+    IMAGE_EXTENSIONS,
+    FaceEmbedding,
+)
+
+
+def to_matrix(results: dict[Path, list[FaceEmbedding]]) -> np.ndarray:
+    """Stack embeddings of all images in order of paths."""
+    rows = [emb.embedding for path in sorted(results) for emb in results[path]]
+    return np.array(rows, dtype=np.float64).reshape(len(rows), -1)
+
+
+def print_row(label: str, images: int, faces: int, elapsed: float, max_diff: float) -> None:
+    print(
+        f"{label:<16} images/s={images / elapsed:8.2f}  faces/s={faces / elapsed:8.2f}"
+        f"  total={elapsed:.2f}s  max_diff={max_diff:.2e}",
+    )
+
+
+def main(
+    config_path: str,
+    src_dir: str,
+    limit: int,
+    batch_sizes: list[int],
+    decode_workers: int,
+) -> None:
+    settings = get_settings(config_path)
+    model_name = settings.deepface.model_name
+    detector_backend = settings.deepface.detector_backend
+    min_face_size = settings.deepface.min_embeddings_face_size
+
+    paths = [p for p in sorted(Path(src_dir).rglob("*")) if p.suffix.lower() in IMAGE_EXTENSIONS]
+    paths = paths[:limit]
+    print(f"Images: {len(paths)}, model: {model_name}, detector: {detector_backend}")
+
+    # Models are loaded (and warmed up) before any measurement
+    build_models(model_name, detector_backend)
+    if paths:
+        get_embeddings(paths[0], model_name, detector_backend, min_face_size)
+
+    started = time.perf_counter()
+    baseline = {
+        path: get_embeddings(path, model_name, detector_backend, min_face_size) for path in paths
+    }
+    elapsed = time.perf_counter() - started
+    expected = to_matrix(baseline)
+    print_row("per-image", len(paths), len(expected), elapsed, 0.0)
+
+    for batch_size in batch_sizes:
+        started = time.perf_counter()
+        results = {}
+        for path, embeddings in get_embeddings_batched(
+            paths,
+            model_name=model_name,
+            detector_backend=detector_backend,
+            min_face_size=min_face_size,
+            batch_size=batch_size,
+            decode_workers=decode_workers,
+        ):
+            results[path] = [] if isinstance(embeddings, Exception) else embeddings
+        elapsed = time.perf_counter() - started
+
+        actual = to_matrix(results)
+        max_diff = np.inf
+        if actual.shape == expected.shape:
+            max_diff = float(np.abs(actual - expected).max(initial=0))
+        print_row(f"batch={batch_size}", len(paths), len(actual), elapsed, max_diff)
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Benchmark batched embeddings extraction")
+    parser.add_argument("--config", help="Path to config file")
+    parser.add_argument("--src", help="Source directory with images")
+    parser.add_argument("--limit", type=int, default=100, help="Max number of images")
+    parser.add_argument(
+        "--batch-size",
+        type=int,
+        nargs="+",
+        default=[1, 8, 32, 64],
+        help="Batch sizes to measure",
+    )
+    parser.add_argument("--decode-workers", type=int, default=4, help="Image decoding threads")
+
+    args = parser.parse_args()
+    main(
+        config_path=args.config,
+        src_dir=args.src,
+        limit=args.limit,
+        batch_sizes=args.batch_size,
+        decode_workers=args.decode_workers,
+    )
@@ -0,0 +1,221 @@
+"""
+Compare approximate nearest-neighbour index with exact search (recall vs latency).
+
+Queries are faces held out of the gallery (as uploaded faces are not in it), so a
+query is never found as its own exact match.
+
+Quantized int8 backend is compared the same way: memory of index and gallery
+matrices is printed for every backend, `max_err` is the largest difference of
+returned distances from exact ones (0 as quantized candidates are re-ranked).
+
+Example:
+
+PYTHONPATH=src py src/scripts/evaluate_index.py \
+    --embeddings exports/samples_embeddings \
+    --config config/test.toml \
+    --backend ivf \
+    --nprobe 1 4 8 16 32
+
+PYTHONPATH=src py src/scripts/evaluate_index.py \
+    --synthetic 200000 --dimension 512 --threshold 0.3 \
+    --backend int8 \
+    --candidates 100 1000
+"""
+
+import time
+
+import numpy as np
+import pandas as pd
+
+from app.core.settings import get_settings
+from app.image_processing.gallery import FaceGallery
+from app.image_processing.indexes import (
+    HNSWIndex,
+    Int8Index,
+    IVFIndex,
+)
+from app.image_processing.resources import DeepfaceSettings
+
+
+def measure(
+    gallery: FaceGallery,
+    exact: list[tuple[np.ndarray, np.ndarray]],
+    queries: np.ndarray,
+    threshold: float,
+    top_k: int,
+) -> dict:
+    """Measure recall against exact results and per-query latency."""
+    latencies = []
+    recalls_at_k = []
+    recalls_threshold = []
+    max_error = 0.0
+
+    for query, (exact_indices, exact_distances) in zip(queries, exact):
+        started = time.perf_counter()
+        [(indices, distances)] = gallery.search(query[None, :], threshold=threshold)
+        latencies.append(time.perf_counter() - started)
+
+        if len(exact_indices):
+            found = np.isin(exact_indices, indices)
+            recalls_threshold.append(found.mean())
+            recalls_at_k.append(found[:top_k].mean())
+
+        # Distances of faces found by both searches must be the same
+        _, exact_pos, pos = np.intersect1d(exact_indices, indices, return_indices=True)
+        if len(pos):
+            error = np.abs(exact_distances[exact_pos] - distances[pos]).max()
+            max_error = max(max_error, float(error))
+
+    return {
+        "mean_ms": 1000 * float(np.mean(latencies)),
+        "p95_ms": 1000 * float(np.percentile(latencies, 95)),
+        f"recall@{top_k}": float(np.mean(recalls_at_k)) if recalls_at_k else 1.0,
+        "recall": float(np.mean(recalls_threshold)) if recalls_threshold else 1.0,
+        "max_err": max_error,
+    }
+
+
+def get_memory(gallery: FaceGallery) -> str:
+    """Describe memory of gallery matrices and index."""
+    normalized = gallery.normalized.nbytes if gallery.normalized is not None else 0
+    return (
+        f"embeddings={gallery.embeddings.nbytes / 2**20:.1f}MB "
+        f"normalized={normalized / 2**20:.1f}MB "
+        f"index={gallery.index.nbytes / 2**20:.1f}MB"
+    )
+
+
+def print_row(label: str, build_s: float, metrics: dict, memory: str = "") -> None:
+    values = "  ".join(f"{k}={v:.4f}" for k, v in metrics.items())
+    print(f"{label:<24} build={build_s:.2f}s  {memory}  {values}")
+
+
+def make_synthetic_frame(size: int, dimension: int, seed: int = 0) -> pd.DataFrame:
+    """Make embeddings frame with several similar faces per person."""
+    rng = np.random.default_rng(seed)
+    people = rng.normal(size=(max(1, size // 5), dimension)).astype(np.float32)
+    person = rng.integers(0, len(people), size)
+    embeddings = people[person] + 0.5 * rng.normal(size=(size, dimension)).astype(np.float32)
+    return pd.DataFrame(
+        {
+            "filename": [f"{i}.jpg" for i in range(size)],
+            "model_name": "synthetic",
+            "facial_area": [{"x": 0, "y": 0, "w": 1, "h": 1}] * size,
+            "face_confidence": 1.0,
+            "embedding": list(embeddings),
+        },
+    )
+
+
+def main(
+    config_path: str | None,
+    embeddings_dir: str | None,
+    synthetic: int,
+    dimension: int,
+    backend: str,
+    num_queries: int,
+    top_k: int,
+    threshold: float | None,
+    nprobe: list[int],
+    ef_search: list[int],
+    candidates: list[int],
+) -> None:
+    deepface = get_settings(config_path).deepface if config_path else DeepfaceSettings()
+    distance_metric = deepface.distance_metric
+    index_settings = deepface.index.model_copy(update={"backend": backend})
+
+    if embeddings_dir:
+        from app.image_processing.face_embeddings import read_embeddings_frame
+
+        embeddings = read_embeddings_frame(embeddings_dir)
+    else:
+        embeddings = make_synthetic_frame(synthetic, dimension, seed=index_settings.seed)
+    print(f"Loaded {len(embeddings)} embeddings")
+
+    if threshold is None:
+        from deepface.modules.verification import find_threshold
+
+        threshold = find_threshold(deepface.model_name, distance_metric)
+
+    rng = np.random.default_rng(index_settings.seed)
+    sample = rng.choice(len(embeddings), min(num_queries, len(embeddings) - 1), replace=False)
+    queries = np.stack(embeddings["embedding"].iloc[sample].to_list()).astype(np.float32)
+    embeddings = embeddings.drop(embeddings.index[sample]).reset_index(drop=True)
+    print(f"Held out {len(queries)} queries, {len(embeddings)} embeddings in gallery")
+
+    exact_gallery = FaceGallery.from_frame(embeddings, distance_metric=distance_metric)
+    exact = [exact_gallery.search(query[None, :], threshold=threshold)[0] for query in queries]
+    metrics = measure(exact_gallery, exact, queries, threshold, top_k)
+    print_row("exact", 0, metrics, get_memory(exact_gallery))
+
+    started = time.perf_counter()
+    gallery = FaceGallery.from_frame(
+        embeddings,
+        distance_metric=distance_metric,
+        index_settings=index_settings,
+    )
+    build_s = time.perf_counter() - started
+
+    # Query-time knobs are changed in place, so index is built only once
+    index = gallery.index
+    memory = get_memory(gallery)
+    if isinstance(index, IVFIndex):
+        for value in nprobe or [index.nprobe]:
+            index.nprobe = max(1, min(value, index.nlist))
+            metrics = measure(gallery, exact, queries, threshold, top_k)
+            print_row(f"ivf nlist={index.nlist} nprobe={index.nprobe}", build_s, metrics, memory)
+    elif isinstance(index, HNSWIndex):
+        for value in ef_search or [index.ef_search]:
+            index.ef_search = value
+            metrics = measure(gallery, exact, queries, threshold, top_k)
+            print_row(f"hnsw ef_search={value}", build_s, metrics, memory)
+    elif isinstance(index, Int8Index):
+        for value in candidates or [index.default_k]:
+            index.default_k = value
+            metrics = measure(gallery, exact, queries, threshold, top_k)
+            print_row(f"{index.name} candidates={value}", build_s, metrics, memory)
+    else:
+        metrics = measure(gallery, exact, queries, threshold, top_k)
+        print_row(repr(index), build_s, metrics, memory)
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Evaluate recall/latency of face index")
+    parser.add_argument("--config", help="Path to config file")
+    parser.add_argument("--embeddings", help="Directory with embeddings files")
+    parser.add_argument("--synthetic", type=int, default=100_000, help="Synthetic gallery size")
+    parser.add_argument("--dimension", type=int, default=512, help="Synthetic embeddings size")
+    parser.add_argument(
+        "--backend",
+        default="ivf",
+        help="Index backend (ivf, hnsw, int8)",
+    )
+    parser.add_argument("--queries", type=int, default=200, help="Number of sampled queries")
+    parser.add_argument("--top-k", type=int, default=10, help="K for recall@K")
+    parser.add_argument("--threshold", type=float, help="Distance threshold override")
+    parser.add_argument("--nprobe", type=int, nargs="*", default=[], help="IVF nprobe values")
+    parser.add_argument("--ef-search", type=int, nargs="*", default=[], help="HNSW ef values")
+    parser.add_argument(
+        "--candidates",
+        type=int,
+        nargs="*",
+        default=[],
+        help="Quantized index candidates values",
+    )
+
+    args = parser.parse_args()
+    main(
+        config_path=args.config,
+        embeddings_dir=args.embeddings,
+        synthetic=args.synthetic,
+        dimension=args.dimension,
+        backend=args.backend,
+        num_queries=args.queries,
+        top_k=args.top_k,
+        threshold=args.threshold,
+        nprobe=args.nprobe,
+        ef_search=args.ef_search,
+        candidates=args.candidates,
+    )
@@ -1,5 +1,5 @@
 """
-Resize images in a directory and save them to a new directory.
+Create embeddings files for images in a directory and pack them into a prebuilt gallery file.
 
 Example:
 
@@ -7,13 +7,90 @@ PYTHONPATH=src py src/scripts/prepare_embeddings.py \
     --src exports/samples \
     --dst exports/samples_embeddings \
     --config config/test.toml
+
+With --batch-size images are processed in a single process: images are decoded in
+threads and faces of several images are passed to recognition model in one batch.
 """
 
 from pathlib import Path
 
-from app.core.settings import get_settings
-from app.image_processing.batch import batch_processing
-from app.image_processing.face_embeddings import create_embeddings_file
+from app.core.settings import (
+    Settings,
+    get_settings,
+)
+from app.image_processing.batch import (
+    BatchManifest,
+    batch_processing,
+    get_task_key,
+)
+from app.image_processing.face_embeddings import (
+    build_models,
+    create_embeddings_file,
+    create_embeddings_files,
+    read_embeddings_frame,
+)
+from app.image_processing.gallery import (
+    FaceGallery,
+    create_gallery_file,
+    get_gallery_filename,
+)
+from app.image_processing.resources import IMAGE_EXTENSIONS
+
+
+def create_embeddings_batched(
+    settings: Settings,
+    src_dir: Path,
+    dst_dir: Path,
+    batch_size: int,
+    decode_workers: int,
+    manifest_path: str | None = None,
+) -> int:
+    """Create embeddings files for all images in directory with batched inference."""
+    manifest = BatchManifest(manifest_path) if manifest_path else None
+    keys: dict[Path, str] = {}
+
+    for src_path in sorted(src_dir.rglob("*")):
+        if src_path.suffix.lower() not in IMAGE_EXTENSIONS:
+            continue
+
+        dst_path = dst_dir / src_path.relative_to(src_dir)
+        key = get_task_key(src_path, dst_path)
+        if manifest is not None and key in manifest:
+            print(f"Already processed {src_path}")
+            continue
+
+        keys[src_path] = key
+
+    build_models(settings.deepface.model_name, settings.deepface.detector_backend)
+    results = create_embeddings_files(
+        ((src_path, dst_dir / src_path.relative_to(src_dir)) for src_path in keys),
+        model_name=settings.deepface.model_name,
+        detector_backend=settings.deepface.detector_backend,
+        min_face_size=settings.deepface.min_embeddings_face_size,
+        batch_size=batch_size,
+        decode_workers=decode_workers,
+    )
+
+    processed = 0
+    try:
+        for number, (src_path, result) in enumerate(results, start=1):
+            if isinstance(result, Exception):
+                print(f"[{number}/{len(keys)}] Error processing {src_path}: {result}")
+                if manifest is not None:
+                    manifest.record(keys[src_path], "error", str(result))
+                continue
+
+            processed += 1
+            print(f"[{number}/{len(keys)}] create_embeddings_files {src_path}: {result!r}")
+            if manifest is not None:
+                manifest.record(keys[src_path], "ok", result)
+    finally:
+        if manifest is not None:
+            manifest.close()
+
+    print(f"Total images processed: {processed}")
+    return processed
+
 
 if __name__ == "__main__":
     import argparse
@@ -22,22 +99,69 @@ if __name__ == "__main__":
     parser.add_argument("--config", help="Path to config file")
     parser.add_argument("--src", help="Source directory with images")
     parser.add_argument("--dst", help="Destination directory for embeddings")
+    parser.add_argument(
+        "--workers",
+        type=int,
+        default=1,
+        help="Number of worker processes (can't be combined with --batch-size)",
+    )
+    parser.add_argument("--manifest", help="Manifest file to resume interrupted processing")
+    parser.add_argument(
+        "--batch-size",
+        type=int,
+        default=0,
+        help="Faces per model call, images are processed in a single process",
+    )
+    parser.add_argument("--decode-workers", type=int, default=4, help="Image decoding threads")
+    parser.add_argument(
+        "--gallery-only",
+        action="store_true",
+        help="Only pack existing embeddings files into gallery file",
+    )
 
     args = parser.parse_args()
+    if args.batch_size > 0 and args.workers > 1:
+        parser.error("--workers can't be combined with --batch-size")
 
     settings = get_settings(args.config)
-    src_dir = Path(args.src)
     dst_dir = Path(args.dst)
     dst_dir.mkdir(parents=True, exist_ok=True)
 
-    batch_processing(
-        processing_func=create_embeddings_file,
-        src_dir=src_dir,
-        dst_dir=dst_dir,
-        display_progress=True,
-        raise_errors=False,
-        # Function params
+    if not args.gallery_only and args.batch_size > 0:
+        create_embeddings_batched(
+            settings=settings,
+            src_dir=Path(args.src),
+            dst_dir=dst_dir,
+            batch_size=args.batch_size,
+            decode_workers=args.decode_workers,
+            manifest_path=args.manifest,
+        )
+    elif not args.gallery_only:
+        batch_processing(
+            processing_func=create_embeddings_file,
+            src_dir=Path(args.src),
+            dst_dir=dst_dir,
+            display_progress=True,
+            raise_errors=False,
+            workers=args.workers,
+            executor="process",
+            initializer=build_models,
+            initargs=(settings.deepface.model_name, settings.deepface.detector_backend),
+            manifest_path=args.manifest,
+            # Function params
+            model_name=settings.deepface.model_name,
+            detector_backend=settings.deepface.detector_backend,
+            min_face_size=settings.deepface.min_embeddings_face_size,
+        )
+
+    gallery_path = dst_dir / get_gallery_filename(
+        model_name=settings.deepface.model_name,
+        detector_backend=settings.deepface.detector_backend,
+    )
+    metadata = create_gallery_file(
+        FaceGallery.from_frame(read_embeddings_frame(dst_dir, recursive=True)),
+        gallery_path=gallery_path,
         model_name=settings.deepface.model_name,
         detector_backend=settings.deepface.detector_backend,
-        min_face_size=settings.deepface.min_embeddings_face_size,
     )
+    print(f"Gallery file {gallery_path}: {metadata.faces} faces ({metadata.fingerprint})")
@@ -1,34 +1,94 @@
 """
 Resize images in a directory and save them to a new directory.
 
+Every image is decoded once and saved in all renditions (e.g. resized images and
+thumbnails for results grid), rendition files newer than their images are skipped.
+
 Example:
 
 PYTHONPATH=src py src/scripts/prepare_images.py \
     --src exports/samples \
-    --dst exports/samples_resized
+    --dst exports/samples_resized \
+    --rendition exports/samples_thumbnails:400x300:webp:80
 """
 
+import os
 from pathlib import Path
 
+from PIL import features
+
 from app.image_processing.batch import batch_processing
-from app.image_processing.utils import resize_image
+from app.image_processing.resources import (
+    RENDITION_FORMATS,
+    ImageRendition,
+)
+from app.image_processing.utils import resize_image_renditions
+
+
+def parse_rendition(spec: str) -> ImageRendition:
+    """Parse rendition from string like `DIR:WIDTHxHEIGHT[:FORMAT[:QUALITY]]`."""
+    dst_dir, size, *options = spec.split(":")
+    if len(options) > 2:
+        raise ValueError(f"Invalid rendition '{spec}'")
+
+    max_width, max_height = (int(value) for value in size.lower().split("x"))
+    image_format = options[0].lower() if options else None
+    if image_format is not None and image_format not in RENDITION_FORMATS:
+        formats = ", ".join(RENDITION_FORMATS)
+        raise ValueError(f"Unknown format '{image_format}'. Choose from: {formats}")
+
+    if image_format == "avif" and not features.check("avif"):
+        raise ValueError("AVIF format is not supported by installed Pillow")
+
+    return ImageRendition(
+        dst_dir=Path(dst_dir),
+        max_width=max_width,
+        max_height=max_height,
+        format=image_format,
+        quality=int(options[1]) if len(options) > 1 else None,
+    )
+
 
 if __name__ == "__main__":
     import argparse
 
     parser = argparse.ArgumentParser(description="Resize images in a directory")
     parser.add_argument("--src", help="Source directory with images")
-    parser.add_argument("--dst", help="Destinaction directory for resized images")
+    parser.add_argument("--dst", help="Destinaction directory for resized images (1200x900)")
+    parser.add_argument(
+        "--rendition",
+        action="append",
+        type=parse_rendition,
+        default=[],
+        help="Additional rendition as DIR:WIDTHxHEIGHT[:FORMAT[:QUALITY]] (can be repeated)",
+    )
+    parser.add_argument(
+        "--workers",
+        type=int,
+        default=os.cpu_count() or 1,
+        help="Number of worker processes (default is number of CPUs)",
+    )
+    parser.add_argument("--force", action="store_true", help="Overwrite up to date renditions")
+    parser.add_argument("--manifest", help="Manifest file to resume interrupted processing")
 
     args = parser.parse_args()
-    src_dir = Path(args.src)
-    dst_dir = Path(args.dst)
-    dst_dir.mkdir(parents=True, exist_ok=True)
+    renditions: list[ImageRendition] = args.rendition
+    if args.dst:
+        renditions.insert(0, ImageRendition(dst_dir=Path(args.dst), max_width=1200, max_height=900))
+
+    if not renditions:
+        parser.error("At least one of --dst or --rendition is required")
 
+    src_dir = Path(args.src)
     batch_processing(
-        processing_func=resize_image,
+        processing_func=resize_image_renditions,
         src_dir=src_dir,
-        dst_dir=dst_dir,
         display_progress=True,
         raise_errors=False,
+        workers=args.workers,
+        executor="process",
+        manifest_path=args.manifest,
+        base_dir=src_dir,
+        renditions=renditions,
+        skip_newer=not args.force,
     )
@@ -1,5 +1,10 @@
 """
-Upload original images, resized images and embeddings files to S3.
+Upload original images, resized images, thumbnails, embeddings and gallery files to S3.
+
+Images manifest (images with embeddings uploaded to both original and resized
+prefixes) is uploaded last, service uses it to skip faces of missing images.
+Manifest of every gallery (default one and events) is built from listing of its
+prefixes in S3, so it never lists images which failed to upload.
 
 Example:
 
@@ -7,13 +12,122 @@ PYTHONPATH=src py src/scripts/upload_to_s3.py \
     --config config/test.toml \
     --original exports/samples \
     --resized exports/samples_resized \
+    --thumbnails exports/samples_thumbnails \
     --embeddings exports/samples_embeddings
 """
 
+import tempfile
+from pathlib import Path
+
 from app.core.settings import get_settings
-from app.image_processing.batch import batch_processing
-from app.image_processing.face_embeddings import DEFAULT_EMBEDDING_EXT
-from app.storages import S3Client
+from app.image_processing.batch import (
+    BatchManifest,
+    get_task_key,
+)
+from app.image_processing.images_manifest import ImagesManifest
+from app.image_processing.resources import (
+    DEFAULT_EMBEDDING_EXT,
+    DEFAULT_GALLERY_EXT,
+    IMAGE_EXTENSIONS,
+    IMAGES_MANIFEST_FILENAME,
+    RENDITION_EXTENSIONS,
+    EventSettings,
+)
+from app.storages import (
+    S3Client,
+    TransferStats,
+)
+
+
+def upload_dir(
+    s3_client: S3Client,
+    src_dir: str | Path,
+    dst_prefix: str,
+    bucket_name: str,
+    allowed_extensions: set[str] = IMAGE_EXTENSIONS,
+    workers: int | None = None,
+    manifest: BatchManifest | None = None,
+) -> TransferStats:
+    """Upload all files of directory to S3 prefix in parallel (keeping directory structure)."""
+    src_dir = Path(src_dir)
+    if not src_dir.is_dir():
+        raise ValueError(f"Source directory '{src_dir}' does not exist or is not a directory.")
+
+    keys: dict[str, str] = {}
+    files = []
+    skipped = 0
+    for src_path in sorted(src_dir.rglob("*")):
+        if not src_path.is_file() or src_path.suffix.lower() not in allowed_extensions:
+            continue
+
+        s3_key = str(Path(dst_prefix) / src_path.relative_to(src_dir))
+        task_key = get_task_key(src_path, Path(s3_key))
+        if manifest is not None and task_key in manifest:
+            skipped += 1
+            continue
+
+        keys[s3_key] = task_key
+        files.append((src_path, s3_key))
+
+    def on_uploaded(s3_key: str, error: Exception | None, stats: TransferStats) -> None:
+        number = stats.files + stats.failed
+        if error is not None:
+            print(f"[{number}/{len(files)}] Error uploading {s3_key}: {error}")
+        else:
+            print(f"[{number}/{len(files)}] Uploaded {s3_key}")
+
+        if manifest is not None:
+            manifest.record(keys[s3_key], "ok" if error is None else "error", str(error or ""))
+
+    print(f"Uploading {len(files)} files from {src_dir} (already uploaded {skipped})")
+    stats = s3_client.upload_files_to_s3(
+        bucket_name=bucket_name,
+        files=files,
+        workers=workers,
+        callback=on_uploaded,
+    )
+    print(f"Uploaded {stats}")
+    return stats
+
+
+def list_relative_keys(s3_client: S3Client, bucket_name: str, prefix: str) -> list[str]:
+    """List keys of S3 prefix relative to it."""
+    prefix = f"{prefix.rstrip('/')}/"
+    return [key[len(prefix) :] for key in s3_client.list_files_in_s3_prefix(bucket_name, prefix)]
+
+
+def upload_images_manifests(
+    s3_client: S3Client,
+    events: dict[str, EventSettings],
+    bucket_name: str,
+) -> None:
+    """Build images manifest of every gallery and upload it to its embeddings prefix.
+
+    Galleries without embedding files are skipped.
+    """
+    for name, event in events.items():
+        embedding_keys = list_relative_keys(s3_client, bucket_name, event.embeddings)
+        if not any(key.endswith(DEFAULT_EMBEDDING_EXT) for key in embedding_keys):
+            print(f"Images manifest of {name} is not uploaded: no embedding files")
+            continue
+
+        images = ImagesManifest.from_keys(
+            embedding_keys=embedding_keys,
+            original_keys=list_relative_keys(s3_client, bucket_name, event.original),
+            resized_keys=list_relative_keys(s3_client, bucket_name, event.resized),
+        )
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            manifest_path = Path(tmp_dir) / IMAGES_MANIFEST_FILENAME
+            images.write(manifest_path)
+            stats = s3_client.upload_files_to_s3(
+                bucket_name=bucket_name,
+                files=[(manifest_path, str(Path(event.embeddings) / IMAGES_MANIFEST_FILENAME))],
+            )
+
+        if stats.failed:
+            raise RuntimeError(f"Failed to upload images manifest of {name}: {stats.errors}")
+
+        print(f"Uploaded images manifest of {name} ({len(images)} images)")
 
 
 def main(
@@ -21,38 +135,58 @@ def main(
     original_dir: str = "exports/samples",
     resized_dir: str = "exports/samples_resized",
     embeddings_dir: str = "exports/samples_embeddings",
+    thumbnails_dir: str | None = None,
+    workers: int | None = None,
+    manifest_path: str | None = None,
 ) -> None:
     settings = get_settings(config_path)
     s3_client = S3Client.from_config(settings.s3)
-
-    print("Uploading original images")
-
-    batch_processing(
-        s3_client.upload_file_to_s3,
-        src_dir=original_dir,
-        dst_dir=settings.images.original,
-        # Upload params
-        bucket_name=settings.images.bucket,
-    )
-
-    print("Uploading resized images")
-
-    batch_processing(
-        s3_client.upload_file_to_s3,
-        src_dir=resized_dir,
-        dst_dir=settings.images.resized,
-        # Upload params
-        bucket_name=settings.images.bucket,
-    )
-
-    print("Uploading embeddings")
-
-    batch_processing(
-        s3_client.upload_file_to_s3,
-        src_dir=embeddings_dir,
-        dst_dir=settings.images.embeddings,
-        allowed_extensions={DEFAULT_EMBEDDING_EXT},
-        # Upload params
+    manifest = BatchManifest(manifest_path) if manifest_path else None
+
+    # Single Boto3 client is shared by all upload threads
+    stages = [
+        ("original images", original_dir, settings.images.original, IMAGE_EXTENSIONS),
+        ("resized images", resized_dir, settings.images.resized, IMAGE_EXTENSIONS),
+        (
+            "embeddings and gallery files",
+            embeddings_dir,
+            settings.images.embeddings,
+            {DEFAULT_EMBEDDING_EXT, DEFAULT_GALLERY_EXT},
+        ),
+    ]
+
+    if thumbnails_dir:
+        if not settings.images.thumbnails:
+            raise ValueError("Thumbnails prefix is not set in images.thumbnails setting")
+        stages.append(
+            ("thumbnails", thumbnails_dir, settings.images.thumbnails, RENDITION_EXTENSIONS),
+        )
+
+    failed = 0
+    try:
+        for name, src_dir, dst_prefix, allowed_extensions in stages:
+            print(f"Uploading {name}")
+            stats = upload_dir(
+                s3_client=s3_client,
+                src_dir=src_dir,
+                dst_prefix=dst_prefix,
+                bucket_name=settings.images.bucket,
+                allowed_extensions=allowed_extensions,
+                workers=workers,
+                manifest=manifest,
+            )
+            failed += stats.failed
+    finally:
+        if manifest is not None:
+            manifest.close()
+
+    if failed:
+        print(f"{failed} files failed to upload, run again to upload them")
+
+    # Manifests are built from S3, so images which failed to upload are not listed
+    upload_images_manifests(
+        s3_client=s3_client,
+        events=settings.images.get_events(),
         bucket_name=settings.images.bucket,
     )
 
@@ -74,11 +208,18 @@ if __name__ == "__main__":
         default="exports/samples_resized",
         help="Directory with resized images",
     )
+    parser.add_argument("--thumbnails", help="Directory with thumbnails (optional)")
     parser.add_argument(
         "--embeddings",
         default="exports/samples_embeddings",
         help="Directory with embeddings files",
     )
+    parser.add_argument(
+        "--workers",
+        type=int,
+        help="Number of parallel uploads (default is s3.max_workers setting)",
+    )
+    parser.add_argument("--manifest", help="Manifest file to resume interrupted upload")
 
     args = parser.parse_args()
     main(
@@ -86,4 +227,7 @@ if __name__ == "__main__":
         original_dir=args.original,
         resized_dir=args.resized,
         embeddings_dir=args.embeddings,
+        thumbnails_dir=args.thumbnails,
+        workers=args.workers,
+        manifest_path=args.manifest,
     )
@@ -195,7 +195,7 @@ class FileUploader {
     });
 
     try {
-      const response = await fetch("/", {
+      const response = await fetch("/" + window.location.search, {
         method: "POST",
         body: formData,
       });
@@ -278,7 +278,7 @@ class FileUploader {
       const card = document.createElement("div");
       card.className = "image-card";
       card.innerHTML = `
-        <img src="${item.resized}" alt="Result ${
+        <img src="${item.thumbnail || item.resized}" loading="lazy" alt="Result ${
         index + 1
       }" data-index="${index}">
         <div class="image-card-info">
@@ -291,6 +291,15 @@ class FileUploader {
 
       // Add click event to image for modal preview
       const img = card.querySelector("img");
+
+      // Fallback to resized image if thumbnail is not uploaded
+      img.addEventListener(
+        "error",
+        () => {
+          img.src = item.resized;
+        },
+        { once: true }
+      );
       img.addEventListener("click", () => this.openModal(index));
 
       this.imageGrid.appendChild(card);
@@ -0,0 +1,99 @@
+import os
+from pathlib import Path
+
+import pytest
+
+from app.image_processing.batch import (
+    BatchManifest,
+    batch_processing,
+)
+
+
+def test_manifest_resume(tmp_path: Path) -> None:
+    path = tmp_path / "manifest" / "batch.jsonl"
+    manifest = BatchManifest(path)
+    manifest.record("a", "ok", {"faces": 1})
+    manifest.record("b", "error", "broken file")
+    manifest.record("c", "ok")
+    manifest.record("c", "error", "failed on retry")
+    manifest.close()
+
+    # Partially written line of interrupted run is ignored
+    with open(path, "a") as f:
+        f.write('{"key": "d", "sta')
+
+    manifest = BatchManifest(path)
+    assert manifest.done == {"a"}
+    assert "a" in manifest
+    assert "b" not in manifest
+
+    # Failed file processed successfully on next run
+    manifest.record("b", "ok")
+    manifest.close()
+    assert BatchManifest(path).done == {"a", "b"}
+
+
+@pytest.fixture
+def src_dir(tmp_path: Path) -> Path:
+    src_dir = tmp_path / "src"
+    (src_dir / "nested").mkdir(parents=True)
+    for name in ("1.jpg", "2.jpg", "nested/3.png", "broken.jpg"):
+        (src_dir / name).write_text(name)
+    (src_dir / "notes.txt").write_text("not an image")
+    return src_dir
+
+
+def read_file(src_path: Path, calls: list[str]) -> str:
+    calls.append(src_path.name)
+    if src_path.read_text().startswith("broken"):
+        raise ValueError("Broken image")
+    return src_path.read_text()
+
+
+@pytest.mark.parametrize("workers", [1, 2])
+def test_batch_processing_skips_processed_files(
+    src_dir: Path,
+    tmp_path: Path,
+    workers: int,
+) -> None:
+    manifest_path = tmp_path / "manifest.jsonl"
+    kwargs = {
+        "processing_func": read_file,
+        "src_dir": src_dir,
+        "display_progress": False,
+        "workers": workers,
+        "executor": "thread",
+        "manifest_path": manifest_path,
+    }
+
+    calls: list[str] = []
+    assert batch_processing(calls=calls, **kwargs) == 3
+    assert sorted(calls) == ["1.jpg", "2.jpg", "3.png", "broken.jpg"]
+
+    # Only failed file is processed again
+    calls = []
+    assert batch_processing(calls=calls, **kwargs) == 0
+    assert calls == ["broken.jpg"]
+
+    # Fixed and changed files are processed again
+    (src_dir / "broken.jpg").write_text("fixed")
+    stat = (src_dir / "1.jpg").stat()
+    os.utime(src_dir / "1.jpg", ns=(stat.st_atime_ns, stat.st_mtime_ns + 10**9))
+    calls = []
+    assert batch_processing(calls=calls, **kwargs) == 2
+    assert sorted(calls) == ["1.jpg", "broken.jpg"]
+
+    calls = []
+    assert batch_processing(calls=calls, **kwargs) == 0
+    assert calls == []
+
+
+def test_batch_processing_raise_errors(src_dir: Path) -> None:
+    with pytest.raises(ValueError, match="Broken image"):
+        batch_processing(
+            processing_func=read_file,
+            src_dir=src_dir,
+            display_progress=False,
+            raise_errors=True,
+            calls=[],
+        )
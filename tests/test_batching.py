@@ -0,0 +1,96 @@
+import asyncio
+from typing import Iterator
+
+import pytest
+
+from app.core.batching import MicroBatcher
+from app.core.executor import (
+    ClientDisconnectedError,
+    InferenceExecutor,
+)
+
+
+class FakeRequest:
+    def __init__(self, disconnected: bool = False) -> None:
+        self.disconnected = disconnected
+
+    async def is_disconnected(self) -> bool:
+        return self.disconnected
+
+
+class DoubleBatch:
+    """Batch function doubling numbers (negative ones are errors) and recording batches."""
+
+    def __init__(self) -> None:
+        self.batches: list[list[int]] = []
+
+    def __call__(self, items: list[int]) -> list[int | Exception]:
+        self.batches.append(items)
+        return [ValueError(f"Negative {item}") if item < 0 else item * 2 for item in items]
+
+
+@pytest.fixture
+def executor() -> Iterator[InferenceExecutor]:
+    executor = InferenceExecutor(workers=1, max_queue=8)
+    yield executor
+    executor.shutdown()
+
+
+def test_concurrent_items_fan_out(executor: InferenceExecutor) -> None:
+    batch_func = DoubleBatch()
+    batcher = MicroBatcher(batch_func, executor=executor, max_batch=4, max_wait=0.05)
+
+    async def main() -> list:
+        return await asyncio.gather(
+            batcher.submit_many([1, 2]),
+            batcher.submit_many([3, -4, 5]),
+            batcher.submit(6),
+        )
+
+    first, second, third = asyncio.run(main())
+    assert first == [2, 4]
+    assert second[0] == 6 and second[2] == 10
+    assert isinstance(second[1], ValueError)
+    assert third == 12
+
+    # Queued items are started as soon as batch is full, later ones wait for `max_wait`
+    assert batch_func.batches == [[1, 2, 3, -4], [5], [6]]
+
+
+def test_submit_raises_item_error(executor: InferenceExecutor) -> None:
+    batcher = MicroBatcher(DoubleBatch(), executor=executor)
+    with pytest.raises(ValueError, match="Negative -1"):
+        asyncio.run(batcher.submit(-1))
+
+
+def test_batch_function_error(executor: InferenceExecutor) -> None:
+    def broken_batch(items: list[int]) -> list[int]:
+        return items[:1]
+
+    batcher = MicroBatcher(broken_batch, executor=executor)
+    results = asyncio.run(batcher.submit_many([1, 2]))
+    assert all(isinstance(result, RuntimeError) for result in results)
+
+
+def test_disconnected_client_items_are_dropped(executor: InferenceExecutor) -> None:
+    batch_func = DoubleBatch()
+    batcher = MicroBatcher(batch_func, executor=executor, max_batch=16, max_wait=0.05)
+
+    async def main() -> list:
+        return await asyncio.gather(
+            batcher.submit_many([1, 2], request=FakeRequest(disconnected=True)),  # type:ignore
+            batcher.submit_many([3], request=FakeRequest()),  # type:ignore
+            return_exceptions=True,
+        )
+
+    disconnected, connected = asyncio.run(main())
+    assert isinstance(disconnected, ClientDisconnectedError)
+    assert connected == [6]
+    assert batch_func.batches == [[3]]
+
+
+def test_empty_items(executor: InferenceExecutor) -> None:
+    batch_func = DoubleBatch()
+    batcher = MicroBatcher(batch_func, executor=executor)
+    assert asyncio.run(batcher.submit_many([])) == []
+    assert batch_func.batches == []
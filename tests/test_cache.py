@@ -0,0 +1,107 @@
+import pytest
+
+from app.core import cache
+from app.core.cache import LRUCache
+
+
+class FakeClock:
+    def __init__(self) -> None:
+        self.now = 1000.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch: pytest.MonkeyPatch) -> FakeClock:
+    clock = FakeClock()
+    monkeypatch.setattr(cache.time, "monotonic", clock)
+    return clock
+
+
+def test_evicts_least_recently_used() -> None:
+    lru: LRUCache[str] = LRUCache(max_entries=2)
+    lru.set("a", "1")
+    lru.set("b", "2")
+    assert lru.get("a") == "1"  # "b" is least recently used now
+
+    lru.set("c", "3")
+    assert lru.get("b") is None
+    assert lru.get("a") == "1"
+    assert lru.get("c") == "3"
+    assert len(lru) == 2
+    assert lru.stats() == {
+        "entries": 2,
+        "max_entries": 2,
+        "mb": 0.0,
+        "hits": 3,
+        "misses": 1,
+        "evictions": 1,
+        "hit_ratio": 0.75,
+    }
+
+
+def test_evicts_above_max_bytes() -> None:
+    lru: LRUCache[bytes] = LRUCache(max_entries=10, max_bytes=10, sizeof=len)
+    lru.set("a", b"x" * 4)
+    lru.set("b", b"x" * 4)
+    assert lru.nbytes == 8
+
+    lru.set("c", b"x" * 4)
+    assert lru.get("a") is None
+    assert lru.nbytes == 8
+
+    # Value larger than cache is not saved at all
+    lru.set("d", b"x" * 11)
+    assert lru.get("d") is None
+    assert len(lru) == 2
+
+    # Replaced value is counted once
+    lru.set("b", b"x")
+    assert lru.nbytes == 5
+
+
+def test_ttl(clock: FakeClock) -> None:
+    lru: LRUCache[str] = LRUCache(ttl=10)
+    lru.set("a", "1")
+    clock.now += 10
+    assert lru.get("a") == "1"
+
+    clock.now += 1
+    assert lru.get("a") is None
+    assert len(lru) == 0
+    assert lru.evictions == 1
+
+    # Updated value lives for another `ttl` seconds
+    lru.set("a", "2")
+    clock.now += 5
+    lru.set("a", "3")
+    clock.now += 6
+    assert lru.get("a") == "3"
+
+
+def test_disabled_and_clear() -> None:
+    lru: LRUCache[str] = LRUCache(max_entries=0)
+    lru.set("a", "1")
+    assert lru.get("a") is None
+
+    lru = LRUCache(sizeof=len)
+    lru.set("a", "1")
+    lru.get("a")
+    lru.clear()
+    assert len(lru) == 0
+    assert lru.nbytes == 0
+    assert lru.hits == 1
+
+
+def test_remove_if() -> None:
+    lru: LRUCache[bytes] = LRUCache(sizeof=len)
+    lru.set(("a", 1), b"xx")
+    lru.set(("a", 2), b"x")
+    lru.set(("b", 1), b"x")
+
+    assert lru.remove_if(lambda key: key[0] == "a" and key[1] != 2) == 1  # type:ignore
+    assert lru.get(("a", 1)) is None
+    assert lru.get(("a", 2)) == b"x"
+    assert lru.get(("b", 1)) == b"x"
+    assert lru.nbytes == 2
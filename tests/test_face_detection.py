@@ -0,0 +1,56 @@
+import cv2
+import numpy as np
+import pytest
+
+from app.image_processing.face_detection import scale_facial_area
+from app.image_processing.utils import decode_image
+
+
+def test_scale_facial_area() -> None:
+    facial_area = {
+        "x": 10,
+        "y": np.int64(21),
+        "w": 50,
+        "h": 60.4,
+        "left_eye": (25, np.int32(33)),
+        "right_eye": None,
+    }
+    assert scale_facial_area(facial_area, 2.5) == {
+        "x": 25,
+        "y": 52,
+        "w": 125,
+        "h": 151,
+        "left_eye": (62, 82),
+        "right_eye": None,
+    }
+
+
+@pytest.mark.parametrize(
+    ("max_size", "expected_size"),
+    [
+        (0, 2000),  # original size
+        (4000, 2000),  # never upscaled
+        (1000, 1000),  # decoded at 1/2 scale
+        (600, 600),  # decoded at 1/2 scale and resized
+    ],
+)
+def test_decode_image_max_size(max_size: int, expected_size: int) -> None:
+    image = np.zeros((1500, 2000, 3), dtype=np.uint8)
+    # Box of a "face" to map back from decoded image
+    image[300:700, 800:1200] = 255
+    _, buffer = cv2.imencode(".jpg", image)
+
+    decoded, scale = decode_image(buffer.tobytes(), max_size=max_size)
+    assert max(decoded.shape[:2]) == expected_size
+    assert scale == pytest.approx(2000 / expected_size)
+
+    rows, columns = np.nonzero(decoded[..., 0] > 127)
+    box = {
+        "x": int(columns.min()),
+        "y": int(rows.min()),
+        "w": int(np.ptp(columns)) + 1,
+        "h": int(np.ptp(rows)) + 1,
+    }
+    original_box = scale_facial_area(box, scale)
+    for key, expected in {"x": 800, "y": 300, "w": 400, "h": 400}.items():
+        assert original_box[key] == pytest.approx(expected, abs=2 * scale)
@@ -0,0 +1,186 @@
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from app.image_processing.gallery import (
+    DISTANCE_METRICS,
+    FaceColumns,
+    FaceGallery,
+    create_gallery_file,
+    create_gallery_store,
+    read_gallery_store,
+)
+from app.image_processing.resources import IndexSettings
+
+MODEL_NAME = "Facenet"
+DETECTOR_BACKEND = "yolov8"
+SIZE = 300
+DIMENSION = 32
+TOP_K = 10
+
+# Index settings under which every backend returns all rows as candidates, so search
+# results must be the same as brute force ones
+EXHAUSTIVE_SETTINGS = {
+    "exact": IndexSettings(backend="exact"),
+    "ivf": IndexSettings(backend="ivf", nlist=8, nprobe=8),
+    "hnsw": IndexSettings(backend="hnsw", candidates=SIZE, hnsw_ef_search=SIZE),
+    "int8": IndexSettings(backend="int8", candidates=SIZE),
+}
+
+
+def make_columns(size: int) -> FaceColumns:
+    return FaceColumns.from_lists(
+        filenames=[f"image_{i // 2}.jpg" for i in range(size)],
+        model_names=[MODEL_NAME] * size,
+        facial_areas=[{"x": i, "y": i, "w": 10, "h": 10} for i in range(size)],
+        face_confidences=[1.0] * size,
+    )
+
+
+def brute_force(embeddings: np.ndarray, queries: np.ndarray, metric: str) -> np.ndarray:
+    """Distances between every query and every embedding computed pair by pair."""
+    if metric != "euclidean":
+        embeddings = embeddings / np.linalg.norm(embeddings, axis=1, keepdims=True)
+        queries = queries / np.linalg.norm(queries, axis=1, keepdims=True)
+
+    if metric == "cosine":
+        return 1 - queries @ embeddings.T
+
+    return np.linalg.norm(queries[:, None, :] - embeddings[None, :, :], axis=2)
+
+
+@pytest.fixture
+def embeddings() -> np.ndarray:
+    rng = np.random.default_rng(0)
+    return rng.normal(size=(SIZE, DIMENSION)).astype(np.float32)
+
+
+@pytest.fixture
+def queries(embeddings: np.ndarray) -> np.ndarray:
+    rng = np.random.default_rng(1)
+    return embeddings[:5] + rng.normal(scale=0.3, size=(5, DIMENSION)).astype(np.float32)
+
+
+def check_search(gallery: FaceGallery, embeddings: np.ndarray, queries: np.ndarray) -> None:
+    expected = brute_force(
+        embeddings.astype(np.float64),
+        queries.astype(np.float64),
+        gallery.distance_metric,
+    )
+
+    # Top K faces regardless of distance
+    for row, (indices, distances) in zip(expected, gallery.search(queries, np.inf, TOP_K)):
+        np.testing.assert_array_equal(indices, np.argsort(row)[:TOP_K])
+        np.testing.assert_allclose(distances, row[indices], rtol=1e-4, atol=1e-4)
+
+    # All faces within threshold
+    threshold = float(np.quantile(expected, 0.1))
+    for row, (indices, distances) in zip(expected, gallery.search(queries, threshold)):
+        matched = np.flatnonzero(row <= threshold)
+        np.testing.assert_array_equal(indices, matched[np.argsort(row[matched])])
+        assert np.all(distances <= threshold)
+
+
+@pytest.mark.parametrize("backend", EXHAUSTIVE_SETTINGS)
+@pytest.mark.parametrize("metric", DISTANCE_METRICS)
+def test_search_matches_brute_force(
+    embeddings: np.ndarray,
+    queries: np.ndarray,
+    metric: str,
+    backend: str,
+) -> None:
+    gallery = FaceGallery(
+        embeddings,
+        make_columns(SIZE),
+        distance_metric=metric,
+        index_settings=EXHAUSTIVE_SETTINGS[backend],
+    )
+    assert gallery.index.name == backend
+    check_search(gallery, embeddings, queries)
+
+
+@pytest.mark.parametrize("backend", EXHAUSTIVE_SETTINGS)
+@pytest.mark.parametrize("metric", DISTANCE_METRICS)
+def test_store_search_matches_brute_force(
+    tmp_path: Path,
+    embeddings: np.ndarray,
+    queries: np.ndarray,
+    metric: str,
+    backend: str,
+) -> None:
+    gallery_path = tmp_path / "gallery.npz"
+    create_gallery_file(
+        FaceGallery(embeddings, make_columns(SIZE)),
+        gallery_path=gallery_path,
+        model_name=MODEL_NAME,
+        detector_backend=DETECTOR_BACKEND,
+    )
+    gallery = read_gallery_store(
+        create_gallery_store(gallery_path, tmp_path / "stores"),
+        model_name=MODEL_NAME,
+        detector_backend=DETECTOR_BACKEND,
+        distance_metric=metric,
+        index_settings=EXHAUSTIVE_SETTINGS[backend],
+    )
+    assert gallery.index.name == backend
+    check_search(gallery, embeddings, queries)
+
+
+@pytest.mark.parametrize("metric", DISTANCE_METRICS)
+def test_int8_search_finds_near_duplicates(embeddings: np.ndarray, metric: str) -> None:
+    gallery = FaceGallery(
+        embeddings,
+        make_columns(SIZE),
+        distance_metric=metric,
+        index_settings=IndexSettings(backend="int8", candidates=20),
+    )
+    assert gallery.normalized is None
+
+    rng = np.random.default_rng(2)
+    queries = embeddings + rng.normal(scale=0.01, size=embeddings.shape).astype(np.float32)
+    for i, (indices, _) in enumerate(gallery.search(queries, np.inf, top_k=1)):
+        assert indices.tolist() == [i]
+
+
+def test_empty_gallery_search() -> None:
+    gallery = FaceGallery(np.empty((0, DIMENSION), dtype=np.float32), make_columns(0))
+    [(indices, distances)] = gallery.search(np.ones(DIMENSION), np.inf)
+    assert len(indices) == len(distances) == 0
+
+
+def test_query_dimension_mismatch(embeddings: np.ndarray) -> None:
+    gallery = FaceGallery(embeddings, make_columns(SIZE))
+    with pytest.raises(ValueError, match="Query dimension"):
+        gallery.search(np.ones(DIMENSION + 1), np.inf)
+
+
+def test_updated_removes_faces_by_filename(embeddings: np.ndarray) -> None:
+    def make_frame(filenames: list[str], rows: np.ndarray) -> pd.DataFrame:
+        return pd.DataFrame(
+            {
+                "filename": filenames,
+                "model_name": MODEL_NAME,
+                "facial_area": [{"x": 0, "y": 0, "w": 10, "h": 10}] * len(filenames),
+                "face_confidence": 1.0,
+                "embedding": list(rows),
+            },
+        )
+
+    gallery = FaceGallery.from_frame(
+        make_frame(["IMG_1.jpg", "IMG_1.heic", "IMG_1.jpg", "IMG_2.jpg"], embeddings[:4]),
+    )
+    updated = gallery.updated(
+        added=make_frame(["IMG_1.jpg"], embeddings[4:5]),
+        removed_filenames={"IMG_1.jpg"},
+    )
+
+    # Image with the same stem and other extension is kept
+    assert [updated.columns.filename(i) for i in range(len(updated))] == [
+        "IMG_1.heic",
+        "IMG_2.jpg",
+        "IMG_1.jpg",
+    ]
+    np.testing.assert_array_equal(updated.embeddings, embeddings[[1, 3, 4]])
+    assert len(gallery) == 4
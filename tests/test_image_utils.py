@@ -0,0 +1,58 @@
+from io import BytesIO
+
+import cv2
+import numpy as np
+import pytest
+from PIL import Image
+
+from app.image_processing.utils import (
+    IMAGE_HEADER_SIZE,
+    get_image_content_from_bytes,
+    get_image_format,
+)
+
+IMAGE = np.zeros((30, 40, 3), dtype=np.uint8)
+IMAGE[:, :20] = (255, 0, 0)  # blue left half in BGR
+
+
+def encode_cv2(ext: str) -> bytes:
+    _, buffer = cv2.imencode(ext, IMAGE)
+    return buffer.tobytes()
+
+
+def encode_pillow(image_format: str) -> bytes:
+    buffer = BytesIO()
+    Image.fromarray(cv2.cvtColor(IMAGE, cv2.COLOR_BGR2RGB)).save(buffer, format=image_format)
+    return buffer.getvalue()
+
+
+@pytest.mark.parametrize(
+    ("content", "expected"),
+    [
+        (encode_cv2(".jpg"), "jpeg"),
+        (encode_cv2(".png"), "png"),
+        (encode_cv2(".bmp"), "bmp"),
+        (encode_pillow("HEIF"), "heif"),
+        (encode_pillow("GIF"), None),
+        (encode_pillow("WEBP"), None),
+        (b"\x00\x00\x00\x18ftypmp42", None),  # video in ISO BMFF container
+        (b"<svg></svg>", None),
+        (b"", None),
+    ],
+)
+def test_get_image_format(content: bytes, expected: str | None) -> None:
+    assert get_image_format(content[:IMAGE_HEADER_SIZE]) == expected
+
+
+@pytest.mark.parametrize("content", [encode_cv2(".png"), encode_pillow("HEIF")])
+def test_get_image_content_from_bytes(content: bytes) -> None:
+    image = get_image_content_from_bytes(content)
+    assert image.shape == IMAGE.shape
+    # Lossy HEIF compression changes colors slightly, but they stay in BGR order
+    np.testing.assert_allclose(image[15, 10], (255, 0, 0), atol=10)
+    np.testing.assert_allclose(image[15, 30], (0, 0, 0), atol=10)
+
+
+def test_unsupported_content() -> None:
+    with pytest.raises(ValueError, match="Unsupported image format"):
+        get_image_content_from_bytes(encode_pillow("GIF"))
@@ -0,0 +1,32 @@
+from pathlib import Path
+
+from app.image_processing.images_manifest import ImagesManifest
+
+
+def test_from_keys() -> None:
+    manifest = ImagesManifest.from_keys(
+        embedding_keys=["2025/a.parq", "2025/b.parq", "c.parq", "d.parq", "e.npz", "images.txt"],
+        original_keys=["2025/a.jpg", "2025/b.HEIC", "c.jpg", "c.heic", "e.jpg", "2024/d.jpg"],
+        resized_keys=["2025/a.jpg", "2025/b.HEIC", "c.heic", "d.jpg", "c.txt", "e.jpg"],
+    )
+    assert manifest.filenames == {"2025/a.jpg", "2025/b.HEIC", "c.heic"}
+
+
+def test_contains_and_round_trip(tmp_path: Path) -> None:
+    manifest = ImagesManifest(["b.heic", "2025/a.jpg"])
+    assert "2025/a.jpg" in manifest
+    assert "b.heic" in manifest
+    assert "a.jpg" not in manifest
+    assert "b.jpg" not in manifest
+
+    path = tmp_path / "images.txt"
+    manifest.write(path)
+    assert path.read_text() == "2025/a.jpg\nb.heic\n"
+    assert ImagesManifest.read(path).filenames == manifest.filenames
+    assert len(ImagesManifest.read(path)) == 2
+
+
+def test_read_empty(tmp_path: Path) -> None:
+    path = tmp_path / "images.txt"
+    ImagesManifest([]).write(path)
+    assert len(ImagesManifest.read(path)) == 0
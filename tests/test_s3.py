@@ -0,0 +1,152 @@
+from pathlib import Path
+from typing import Any
+
+import pytest
+from botocore.exceptions import (
+    ClientError,
+    EndpointConnectionError,
+)
+
+from app.storages import (
+    S3Client,
+    TransferStats,
+    s3,
+)
+
+BUCKET = "photos"
+
+
+def client_error(code: str, status: int) -> ClientError:
+    return ClientError(
+        {"Error": {"Code": code}, "ResponseMetadata": {"HTTPStatusCode": status}},
+        "GetObject",
+    )
+
+
+class FakeBotoClient:
+    """Boto3 client stub failing transfers of some keys with given errors (in turn)."""
+
+    def __init__(self, errors: dict[str, list[Exception]]) -> None:
+        self.errors = errors
+        self.calls: list[str] = []
+
+    def fail(self, key: str) -> None:
+        self.calls.append(key)
+        if self.errors.get(key):
+            raise self.errors[key].pop(0)
+
+    def download_file(self, Bucket: str, Key: str, Filename: str, **kwargs: Any) -> None:
+        self.fail(Key)
+        Path(Filename).write_text(Key)
+
+    def upload_file(self, Filename: str, Bucket: str, Key: str, **kwargs: Any) -> None:
+        self.fail(Key)
+
+
+@pytest.fixture
+def sleeps(monkeypatch: pytest.MonkeyPatch) -> list[float]:
+    sleeps: list[float] = []
+    monkeypatch.setattr(s3.time, "sleep", sleeps.append)
+    return sleeps
+
+
+def make_client(errors: dict[str, list[Exception]], max_attempts: int = 3) -> S3Client:
+    client = S3Client(
+        region="us-east-1",
+        endpoint="http://localhost:9000",
+        key="key",
+        secret="secret",
+        max_workers=2,
+        max_attempts=max_attempts,
+    )
+    client.client = FakeBotoClient(errors)
+    return client
+
+
+def test_client_retries_are_disabled() -> None:
+    client = S3Client(region="us-east-1", endpoint="http://localhost:9000", key="k", secret="s")
+    assert client.client.meta.config.retries["total_max_attempts"] == 1
+    assert client.client.meta.config.max_pool_connections == 16
+
+
+def test_download_files_retries(tmp_path: Path, sleeps: list[float]) -> None:
+    client = make_client(
+        {
+            "a.jpg": [client_error("SlowDown", 503), EndpointConnectionError(endpoint_url="")],
+            "b.jpg": [client_error("AccessDenied", 403)],
+            "c.jpg": [client_error("InternalError", 500)] * 3,
+        },
+    )
+    calls: list[tuple[str, bool]] = []
+
+    def callback(s3_key: str, error: Exception | None, stats: TransferStats) -> None:
+        calls.append((s3_key, error is None))
+
+    files = [(name, tmp_path / "nested" / name) for name in ("a.jpg", "b.jpg", "c.jpg", "d.jpg")]
+    stats = client.download_files_from_s3(BUCKET, files, callback=callback)
+
+    assert (stats.files, stats.failed, stats.retries) == (2, 2, 2)
+    assert stats.bytes == len("a.jpg") + len("d.jpg")
+    assert sorted(stats.errors) == ["b.jpg", "c.jpg"]
+    assert sorted(calls) == [("a.jpg", True), ("b.jpg", False), ("c.jpg", False), ("d.jpg", True)]
+    assert (tmp_path / "nested" / "a.jpg").read_text() == "a.jpg"
+
+    # Non-retryable error is not retried, retryable one is retried up to `max_attempts`
+    fake: FakeBotoClient = client.client  # type:ignore
+    assert sorted(fake.calls) == ["a.jpg"] * 3 + ["b.jpg"] + ["c.jpg"] * 3 + ["d.jpg"]
+    assert len(sleeps) == 4
+
+
+def test_upload_files_retries(tmp_path: Path, sleeps: list[float]) -> None:
+    (tmp_path / "a.jpg").write_text("a")
+    (tmp_path / "b.jpg").write_text("bb")
+    client = make_client({"a.jpg": [client_error("Throttling", 400)]})
+
+    stats = client.upload_files_to_s3(
+        BUCKET,
+        [(tmp_path / "a.jpg", "a.jpg"), (tmp_path / "b.jpg", "b.jpg")],
+        workers=1,
+    )
+    assert (stats.files, stats.failed, stats.retries, stats.bytes) == (2, 0, 1, 3)
+    assert len(sleeps) == 1
+
+
+def test_single_file_download_retries(tmp_path: Path, sleeps: list[float]) -> None:
+    client = make_client({"a.jpg": [client_error("RequestTimeout", 400)]})
+    client.download_file_from_s3(BUCKET, "a.jpg", tmp_path / "a.jpg")
+    assert (tmp_path / "a.jpg").read_text() == "a.jpg"
+
+    client = make_client({"a.jpg": [client_error("NoSuchKey", 404)]})
+    with pytest.raises(ClientError):
+        client.download_file_from_s3(BUCKET, "a.jpg", tmp_path / "a.jpg")
+    assert len(sleeps) == 1
+
+
+def test_backoff_delays(sleeps: list[float]) -> None:
+    client = make_client({"a.jpg": [client_error("SlowDown", 503)] * 10}, max_attempts=10)
+    with pytest.raises(ClientError):
+        client._with_retries(client.client.upload_file, "a.jpg", BUCKET, "a.jpg")
+
+    assert len(sleeps) == 9
+    for attempt, delay in enumerate(sleeps):
+        max_delay = min(s3.BACKOFF_MAX, s3.BACKOFF_BASE * 2**attempt)
+        assert max_delay / 2 <= delay <= max_delay
+
+
+@pytest.mark.parametrize(
+    ("error", "expected"),
+    [
+        (client_error("SlowDown", 503), True),
+        (client_error("Throttling", 400), True),
+        (client_error("InternalError", 500), True),
+        (client_error("TooManyRequests", 429), True),
+        (client_error("AccessDenied", 403), False),
+        (client_error("NoSuchKey", 404), False),
+        (EndpointConnectionError(endpoint_url="http://localhost:9000"), True),
+        (ConnectionResetError(), True),
+        (TimeoutError(), True),
+        (ValueError("Broken"), False),
+    ],
+)
+def test_is_retryable_error(error: Exception, expected: bool) -> None:
+    assert s3.is_retryable_error(error) is expected
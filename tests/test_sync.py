@@ -0,0 +1,180 @@
+from datetime import (
+    datetime,
+    timezone,
+)
+from pathlib import Path
+from typing import Iterable
+
+import pytest
+
+from app.storages import (
+    S3DirSync,
+    S3Object,
+    TransferStats,
+)
+from app.storages.s3 import TransferCallback
+from app.storages.sync import SyncManifest
+
+BUCKET = "photos"
+PREFIX = "embeddings/"
+
+
+class FakeS3Client:
+    """In-memory S3 client with objects of a single bucket."""
+
+    def __init__(self) -> None:
+        self.objects: dict[str, bytes] = {}
+        self.etags: dict[str, str] = {}
+        self.failing: set[str] = set()
+        self.downloaded: list[str] = []
+
+    def put(self, key: str, content: bytes) -> None:
+        self.objects[key] = content
+        self.etags[key] = f"etag-{hash(content)}"
+
+    def list_objects_in_s3_prefix(self, bucket_name: str, s3_prefix: str) -> list[S3Object]:
+        return [
+            S3Object(
+                key=key,
+                etag=self.etags[key],
+                size=len(content),
+                last_modified=datetime(2025, 1, 1, tzinfo=timezone.utc),
+            )
+            for key, content in self.objects.items()
+            if key.startswith(s3_prefix)
+        ]
+
+    def download_files_from_s3(
+        self,
+        bucket_name: str,
+        files: Iterable[tuple[str, str | Path]],
+        workers: int | None = None,
+        callback: TransferCallback | None = None,
+    ) -> TransferStats:
+        stats = TransferStats()
+        for key, local_path in files:
+            error = None
+            if key in self.failing:
+                error = OSError(f"Failed to download {key}")
+                stats.failed += 1
+                stats.errors[key] = str(error)
+            else:
+                Path(local_path).parent.mkdir(parents=True, exist_ok=True)
+                Path(local_path).write_bytes(self.objects[key])
+                self.downloaded.append(key)
+                stats.files += 1
+
+            if callback is not None:
+                callback(key, error, stats)
+
+        return stats
+
+
+@pytest.fixture
+def s3_client() -> FakeS3Client:
+    s3_client = FakeS3Client()
+    s3_client.put(f"{PREFIX}a.parq", b"a")
+    s3_client.put(f"{PREFIX}b.parq", b"b")
+    s3_client.put(f"{PREFIX}skipped.txt", b"c")
+    s3_client.put("other/d.parq", b"d")
+    return s3_client
+
+
+@pytest.fixture
+def dir_sync(s3_client: FakeS3Client, tmp_path: Path) -> S3DirSync:
+    return S3DirSync(
+        s3_client=s3_client,  # type:ignore
+        bucket_name=BUCKET,
+        s3_prefix=PREFIX,
+        local_dir=tmp_path / "embeddings",
+        key_filter=lambda key: key.endswith(".parq"),
+    )
+
+
+def names(paths: list[Path]) -> list[str]:
+    return sorted(path.name for path in paths)
+
+
+def test_sync_changes(s3_client: FakeS3Client, dir_sync: S3DirSync) -> None:
+    result = dir_sync.sync()
+    assert names(result.added) == ["a.parq", "b.parq"]
+    assert (dir_sync.local_dir / "a.parq").read_bytes() == b"a"
+    assert not (dir_sync.local_dir / "skipped.txt").exists()
+
+    result = dir_sync.sync()
+    assert not result.has_changes
+    assert result.unchanged == 2
+
+    s3_client.put(f"{PREFIX}a.parq", b"new a")
+    s3_client.put(f"{PREFIX}e.parq", b"e")
+    del s3_client.objects[f"{PREFIX}b.parq"]
+    s3_client.downloaded = []
+
+    result = dir_sync.sync()
+    assert names(result.added) == ["e.parq"]
+    assert names(result.changed) == ["a.parq"]
+    assert names(result.removed) == ["b.parq"]
+    assert result.unchanged == 0
+    assert sorted(s3_client.downloaded) == [f"{PREFIX}a.parq", f"{PREFIX}e.parq"]
+    assert (dir_sync.local_dir / "a.parq").read_bytes() == b"new a"
+    assert not (dir_sync.local_dir / "b.parq").exists()
+
+
+def test_sync_retries_failed_downloads(s3_client: FakeS3Client, dir_sync: S3DirSync) -> None:
+    s3_client.failing = {f"{PREFIX}b.parq"}
+    result = dir_sync.sync()
+    assert names(result.added) == ["a.parq"]
+    assert list(result.stats.errors) == [f"{PREFIX}b.parq"]
+
+    s3_client.failing = set()
+    result = dir_sync.sync()
+    assert names(result.added) == ["b.parq"]
+    assert result.unchanged == 1
+
+
+def test_sync_downloads_deleted_local_files(dir_sync: S3DirSync) -> None:
+    dir_sync.sync()
+    (dir_sync.local_dir / "a.parq").unlink()
+
+    result = dir_sync.sync()
+    assert names(result.changed) == ["a.parq"]
+    assert result.unchanged == 1
+
+
+def test_sync_keeps_subdirectories(s3_client: FakeS3Client, dir_sync: S3DirSync) -> None:
+    s3_client.put(f"{PREFIX}2024/a.parq", b"2024 a")
+    result = dir_sync.sync()
+    assert names(result.added) == ["a.parq", "a.parq", "b.parq"]
+    assert (dir_sync.local_dir / "a.parq").read_bytes() == b"a"
+    assert (dir_sync.local_dir / "2024" / "a.parq").read_bytes() == b"2024 a"
+
+    del s3_client.objects[f"{PREFIX}2024/a.parq"]
+    result = dir_sync.sync()
+    assert result.removed == [dir_sync.local_dir / "2024" / "a.parq"]
+    assert (dir_sync.local_dir / "a.parq").exists()
+
+
+def test_local_path_outside_directory(dir_sync: S3DirSync) -> None:
+    with pytest.raises(ValueError, match="Invalid S3 key"):
+        dir_sync.get_local_path(f"{PREFIX}../a.parq")
+
+
+def test_broken_manifest(s3_client: FakeS3Client, dir_sync: S3DirSync) -> None:
+    dir_sync.sync()
+    dir_sync.manifest_path.write_text('{"embeddings/a.parq": {"key"')
+    assert SyncManifest(dir_sync.manifest_path).objects == {}
+
+    s3_client.downloaded = []
+    result = dir_sync.sync()
+    assert names(result.added) == ["a.parq", "b.parq"]
+    assert len(s3_client.downloaded) == 2
+
+
+def test_manifest_save(tmp_path: Path, s3_client: FakeS3Client) -> None:
+    manifest = SyncManifest(tmp_path / "manifest.json")
+    objects = s3_client.list_objects_in_s3_prefix(BUCKET, PREFIX)
+    manifest.objects = {obj.key: obj for obj in objects}
+    manifest.save()
+
+    assert SyncManifest(tmp_path / "manifest.json").objects == manifest.objects
+    assert [path.name for path in tmp_path.iterdir()] == ["manifest.json"]